@@ -1,32 +1,42 @@
 import logging
+from functools import lru_cache
+from typing import Tuple
 from urllib.parse import quote_plus, urlparse
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from fastapi.responses import RedirectResponse
 from prisma import Prisma
-from prisma.models import User
 
 from ....core.config import get_settings
 from ....core.deps import get_db, require_roles
+from ....core.principal import Principal
+from ....core.singleflight import SingleFlight
 from ....schemas.payment import PaymentCreateRequest, PaymentCreateResponse
 from ....services.order_service import mark_order_paid
-from ....services.zarinpal_client import ZarinpalClient, ZarinpalError
+from ....services.payment_log import (
+    EVENT_CALLBACK,
+    EVENT_REQUEST,
+    EVENT_VERIFY,
+    STATUS_CANCELED,
+    STATUS_ERROR,
+    STATUS_FAILED,
+    STATUS_OK,
+    STATUS_UNAVAILABLE,
+    record_payment_event,
+)
+from ....services.zarinpal_client import ZarinpalClient, ZarinpalError, ZarinpalUnavailable
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
 
-def _get_client():
-    settings = get_settings()
-    if not settings.zarinpal_merchant_id or not settings.zarinpal_callback_url:
+def get_zarinpal_client(request: Request) -> ZarinpalClient:
+    """The gateway client built once in the application lifespan."""
+    client = getattr(request.app.state, "zarinpal", None)
+    if client is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="پیکربندی درگاه پرداخت تکمیل نیست")
-    client = ZarinpalClient(
-        merchant_id=settings.zarinpal_merchant_id,
-        sandbox=settings.zarinpal_sandbox,
-        callback_url=settings.zarinpal_callback_url,
-    )
-    return settings, client
+    return client
 
 
 def _frontend_base_url(callback_url: str, configured: str | None) -> str:
@@ -45,12 +55,12 @@ def _frontend_base_url(callback_url: str, configured: str | None) -> str:
 async def create_zarinpal_payment(
     payload: PaymentCreateRequest,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["CUSTOMER", "ADMIN"])),
+    current_user: Principal = Depends(require_roles(["CUSTOMER", "ADMIN"])),
+    client: ZarinpalClient = Depends(get_zarinpal_client),
 ):
     """
     Create a Zarinpal payment request for an order and return the StartPay URL.
     """
-    settings, client = _get_client()
 
     order = await db.order.find_unique(where={"id": payload.order_id})
     if not order:
@@ -80,8 +90,27 @@ async def create_zarinpal_payment(
             mobile=payload.mobile,
             email=payload.email,
         )
+    except ZarinpalUnavailable as exc:
+        record_payment_event(order.id, EVENT_REQUEST, STATUS_UNAVAILABLE, amount_toman, response={"message": str(exc)})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+            headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+        ) from exc
     except ZarinpalError as exc:
+        record_payment_event(
+            order.id, EVENT_REQUEST, STATUS_ERROR, amount_toman, code=exc.code, response={"message": str(exc)}
+        )
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc)) from exc
+    record_payment_event(
+        order.id,
+        EVENT_REQUEST,
+        STATUS_OK,
+        amount_toman,
+        authority=result.authority,
+        code=result.code,
+        response=result.model_dump(),
+    )
 
     await db.order.update(
         where={"id": order.id},
@@ -103,46 +132,89 @@ async def create_zarinpal_payment(
     )
 
 
-@router.get("/zarinpal/callback")
-async def zarinpal_callback(
-    Authority: str = Query(..., description="Authority code provided by Zarinpal"),  # noqa: N803
-    Status: str = Query(..., description="Payment status from Zarinpal"),  # noqa: N803
-    db: Prisma = Depends(get_db),
-):
+def _success_url(frontend_base: str, order_id: int, amount_toman: int, ref_id) -> str:
+    url = f"{frontend_base}/payment/result?status=success&orderId={order_id}&amount={amount_toman}"
+    if ref_id:
+        url += f"&refId={ref_id}"
+    return url
+
+
+async def _resolve_callback(db: Prisma, client: ZarinpalClient, authority: str, status_value: str) -> Tuple[str, bool]:
     """
-    Handle Zarinpal callback, verify payment, update order, then redirect user to the frontend result page.
+    Verify and settle the order behind a callback. Returns the redirect target
+    and whether the outcome is final (safe to replay to duplicate callbacks).
     """
-    settings, client = _get_client()
+    settings = get_settings()
     frontend_base = _frontend_base_url(settings.zarinpal_callback_url, settings.frontend_base_url)
     failure_base = f"{frontend_base}/payment/result?status=failed"
 
-    order = await db.order.find_first(where={"authority": Authority})
+    order = await db.order.find_first(where={"authority": authority})
     if not order:
         target = f"{failure_base}&message={quote_plus('سفارش یافت نشد')}"
-        return RedirectResponse(url=target)
+        return target, False
 
     amount_toman = int(round(order.paymentAmount or order.totalAmount))
-    if Status != "OK":
+    if order.paymentStatus == "PAID":
+        # settled by an earlier callback (possibly on another worker) or by reconciliation
+        return _success_url(frontend_base, order.id, amount_toman, order.refId), True
+
+    record_payment_event(
+        order.id,
+        EVENT_CALLBACK,
+        STATUS_OK if status_value == "OK" else STATUS_CANCELED,
+        amount_toman,
+        authority=authority,
+        response={"Status": status_value},
+    )
+    if status_value != "OK":
         await db.order.update(
             where={"id": order.id},
             data={"paymentStatus": "FAILED", "status": "CANCELED", "paymentMessage": "پرداخت توسط کاربر لغو شد"},
         )
         target = f"{failure_base}&orderId={order.id}&message={quote_plus('پرداخت توسط کاربر لغو شد')}"
-        return RedirectResponse(url=target)
+        return target, True
 
     try:
-        verify_result = await client.payment_verify(authority=Authority, amount_toman=amount_toman, order_id=order.id)
+        verify_result = await client.payment_verify(authority=authority, amount_toman=amount_toman, order_id=order.id)
+    except ZarinpalUnavailable as exc:
+        record_payment_event(
+            order.id, EVENT_VERIFY, STATUS_UNAVAILABLE, amount_toman, authority=authority, response={"message": str(exc)}
+        )
+        # Outcome unknown: the money may have been captured, so leave the order
+        # unresolved for the reconciliation job instead of canceling it
+        message = "وضعیت پرداخت در حال بررسی است"
+        target = f"{failure_base}&orderId={order.id}&message={quote_plus(message)}&pending=1"
+        return target, False
     except ZarinpalError as exc:
+        record_payment_event(
+            order.id,
+            EVENT_VERIFY,
+            STATUS_ERROR,
+            amount_toman,
+            authority=authority,
+            code=exc.code,
+            response={"message": str(exc)},
+        )
         await db.order.update(
             where={"id": order.id},
             data={"paymentStatus": "FAILED", "status": "CANCELED", "paymentMessage": str(exc)},
         )
         target = f"{failure_base}&orderId={order.id}&message={quote_plus(str(exc))}"
-        return RedirectResponse(url=target)
+        return target, True
 
+    record_payment_event(
+        order.id,
+        EVENT_VERIFY,
+        STATUS_OK if verify_result.success else STATUS_FAILED,
+        amount_toman,
+        authority=authority,
+        code=verify_result.status_code,
+        ref_id=verify_result.ref_id,
+        response=verify_result.model_dump(),
+    )
     if verify_result.success:
         payment_update = {
-            "authority": Authority,
+            "authority": authority,
             "refId": verify_result.ref_id,
             "cardPan": verify_result.card_pan,
             "feeType": verify_result.fee_type,
@@ -158,10 +230,7 @@ async def zarinpal_callback(
             is_admin=True,
             payment_update=payment_update,
         )
-        success_url = f"{frontend_base}/payment/result?status=success&orderId={order.id}&amount={amount_toman}"
-        if verify_result.ref_id:
-            success_url += f"&refId={verify_result.ref_id}"
-        return RedirectResponse(url=success_url)
+        return _success_url(frontend_base, order.id, amount_toman, verify_result.ref_id), True
 
     await db.order.update(
         where={"id": order.id},
@@ -174,4 +243,28 @@ async def zarinpal_callback(
     fail_url = (
         f"{failure_base}&orderId={order.id}&message={quote_plus(verify_result.message)}&code={verify_result.status_code}"
     )
-    return RedirectResponse(url=fail_url)
+    return fail_url, True
+
+
+@lru_cache
+def get_callback_flight() -> SingleFlight:
+    return SingleFlight(ttl_seconds=get_settings().payment_callback_cache_seconds)
+
+
+@router.get("/zarinpal/callback")
+async def zarinpal_callback(
+    Authority: str = Query(..., description="Authority code provided by Zarinpal"),  # noqa: N803
+    Status: str = Query(..., description="Payment status from Zarinpal"),  # noqa: N803
+    db: Prisma = Depends(get_db),
+    client: ZarinpalClient = Depends(get_zarinpal_client),
+):
+    """
+    Handle Zarinpal callback, verify payment, update order, then redirect user to the frontend result page.
+    Duplicate callbacks for the same authority share one verification and replay its redirect.
+    """
+    target, _ = await get_callback_flight().run(
+        f"{Authority}:{Status}",
+        lambda: _resolve_callback(db, client, Authority, Status),
+        cache_if=lambda outcome: outcome[1],
+    )
+    return RedirectResponse(url=target)
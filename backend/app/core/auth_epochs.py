@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional
+
+from prisma import Prisma
+
+from .principal import invalidate_principal
+
+logger = logging.getLogger(__name__)
+
+# Only users whose epoch was ever bumped need tracking; everyone else is at 0.
+_LOAD_SQL = "SELECT `id`, `authEpoch` FROM `User` WHERE `authEpoch` > 0"
+_CHANGED_SQL = "SELECT `id`, `authEpoch` FROM `User` WHERE `authEpoch` > 0 AND `updatedAt` >= ?"
+
+# Overlap between refreshes so rows committed around the boundary are not missed.
+_REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+class AuthEpochTable:
+    """
+    In-memory user id -> auth epoch map used to reject stale stateless tokens.
+    Bumps made by this process apply immediately; bumps from other workers
+    arrive with the next periodic refresh.
+    """
+
+    def __init__(self):
+        self._epochs: Dict[int, int] = {}
+        self._since: Optional[datetime] = None
+        self.ready = False
+
+    def get(self, user_id: int) -> int:
+        return self._epochs.get(user_id, 0)
+
+    def set(self, user_id: int, epoch: int) -> None:
+        if epoch > self._epochs.get(user_id, 0):
+            self._epochs[user_id] = epoch
+
+    async def refresh(self, prisma: Prisma) -> None:
+        started = datetime.utcnow()
+        if self._since is None:
+            rows = await prisma.query_raw(_LOAD_SQL)
+        else:
+            since = (self._since - _REFRESH_OVERLAP).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            rows = await prisma.query_raw(_CHANGED_SQL, since)
+        for row in rows:
+            self.set(int(row["id"]), int(row["authEpoch"]))
+        self._since = started
+        self.ready = True
+
+    async def run(self, prisma: Prisma, interval_seconds: float) -> None:
+        while True:
+            try:
+                await self.refresh(prisma)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Auth epoch refresh failed")
+            await asyncio.sleep(interval_seconds)
+
+    def metrics(self) -> dict:
+        return {"ready": self.ready, "trackedUsers": len(self._epochs)}
+
+
+@lru_cache
+def get_auth_epoch_table() -> AuthEpochTable:
+    return AuthEpochTable()
+
+
+async def bump_auth_epoch(prisma: Prisma, user_id: int) -> int:
+    """Invalidate every outstanding access token of a user."""
+    updated = await prisma.user.update(where={"id": user_id}, data={"authEpoch": {"increment": 1}})
+    epoch = updated.authEpoch if updated else 0
+    get_auth_epoch_table().set(user_id, epoch)
+    invalidate_principal(user_id)
+    return epoch
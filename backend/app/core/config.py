@@ -1,7 +1,15 @@
+import os
 from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+def _available_cores() -> int:
+    """CPUs this process may run on (respects container/affinity limits where the OS exposes them)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 class Settings(BaseSettings):
     project_name: str = "Stylino API"
     database_url: str
@@ -9,6 +17,39 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30  # Reduced from 24 hours to 30 minutes
     refresh_token_expire_days: int = 7
+    refresh_tokens_per_user: int = 10  # oldest sessions are dropped beyond this
+    refresh_token_sweep_interval_seconds: float = 3600
+    refresh_token_sweep_batch: int = 1000
+
+    # Referral code sequence numbers reserved per round trip
+    referral_code_block_size: int = 500
+
+    # bcrypt runs on a bounded thread pool; requests beyond workers + pending get a 503
+    password_hash_workers: int = 4
+    password_hash_max_pending: int = 64
+
+    # Authenticated-principal cache used by get_current_user (0 disables)
+    principal_cache_ttl_seconds: float = 30
+    principal_cache_max_entries: int = 10000
+
+    # Verified access-token claims kept until exp (0 disables)
+    token_cache_max_entries: int = 10000
+
+    # Rate limits for unauthenticated auth endpoints ("<count>/<second|minute|hour|day>")
+    rate_limit_enabled: bool = True
+    rate_limit_redis_url: str = ""  # shared backend for multi-worker setups; in-memory when empty
+    rate_limit_trust_proxy: bool = False  # key on X-Real-IP set by the proxy (only when just the proxy can reach us)
+    rate_limit_login_per_ip: str = "30/minute"
+    rate_limit_login_per_email: str = "5/minute"
+    rate_limit_register_per_ip: str = "20/hour"
+    rate_limit_email_per_ip: str = "10/hour"
+    rate_limit_email_per_address: str = "3/hour"
+    rate_limit_refresh_per_user: str = "30/minute"
+
+    # Opt-in: embed role + verification in access tokens (the auth epoch is always
+    # there) and authorize without a DB lookup
+    stateless_access_tokens: bool = False
+    auth_epoch_refresh_seconds: float = 15
     
     # CORS settings
     cors_origins: str = "http://localhost:3000,http://localhost:3001"  # Comma-separated origins
@@ -22,15 +63,90 @@ class Settings(BaseSettings):
     smtp_user: str = ""
     smtp_password: str = ""
     smtp_from_email: str = "noreply@stylino.com"
+    smtp_use_tls: bool = True  # disable for a local SMTP stand-in (e.g. `python -m aiosmtpd -n`)
+    smtp_timeout_seconds: float = 10
+
+    # Email outbox: pooled SMTP sessions, retries with exponential backoff
+    email_workers: int = 4
+    email_batch_size: int = 50
+    email_poll_interval_seconds: float = 2
+    email_max_attempts: int = 6
+    email_retry_backoff_seconds: float = 30
+    email_lease_seconds: float = 300
+    email_outbox_retention_days: int = 14
     frontend_url: str = "http://localhost:3000"
     
     # Payment gateway settings
     zarinpal_merchant_id: str = ""
     zarinpal_sandbox: bool = True
     zarinpal_callback_url: str = "http://localhost:3000/orders/callback"
+    # Override the Zarinpal hosts, e.g. http://127.0.0.1:9000 for benchmarks/zarinpal_simulator
+    zarinpal_api_base_url: str = ""
+    zarinpal_gateway_base_url: str = ""
+    # Latency budgets (seconds, including retries) and circuit breaker for gateway calls
+    zarinpal_request_budget_seconds: float = 8
+    zarinpal_verify_budget_seconds: float = 10
+    zarinpal_verify_attempts: int = 3
+    zarinpal_retry_base_delay_seconds: float = 0.2
+    zarinpal_breaker_failure_threshold: int = 5
+    zarinpal_breaker_reset_seconds: float = 30
+    # Settled callback redirects replayed to duplicate callbacks for this long
+    payment_callback_cache_seconds: float = 120
+    # Buffered writer for the append-only PaymentTransaction log
+    payment_log_batch_size: int = 100
+    payment_log_flush_seconds: float = 1
+    payment_log_max_buffer: int = 10000
+
+    # Server processes (python -m app.server); each worker has its own DB engine and pool
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 1  # 0 = one per available CPU core
+    web_graceful_shutdown_seconds: int = 30  # in-flight requests get this long to finish
+    # Per-process Prisma engine; explicit parameters in DATABASE_URL take precedence
+    db_connection_limit: int = 0  # 0 = split 2 * cores + 1 connections across the server workers
+    db_pool_processes: int = 1  # processes sharing that default; set by app.server, 1 for jobs and scripts
+    db_pool_timeout_seconds: int = 10  # wait for a free pooled connection before failing
+    db_connect_timeout_seconds: int = 5
+    db_engine_connect_timeout_seconds: float = 10  # starting the query engine process
+    db_warmup_connections: int = 4  # pooled connections opened at startup, before traffic
+
+    # Exposes per-request query count / DB time as X-DB-* response headers
+    debug: bool = False
+    # Query tracing: slow-query log and per-request N+1 detection
+    query_trace_enabled: bool = True
+    slow_query_ms: float = 250
+    query_n_plus_one_threshold: int = 5  # same-shape queries in one request before it is flagged
+
+    # Prometheus /metrics (per process) and the event-loop lag probe
+    metrics_enabled: bool = True
+    metrics_token: str = ""  # when set, scrapers must send "Authorization: Bearer <token>"
+    event_loop_lag_interval_seconds: float = 0.5
+
+    # Shared outbound HTTP client (keep-alive pool used for gateway calls)
+    http_client_max_connections: int = 50
+    http_client_max_keepalive: int = 20
+    http_client_keepalive_expiry_seconds: float = 30
+    http_client_connect_timeout_seconds: float = 5
+    http_client_timeout_seconds: float = 15
+    http_client_http2: bool = False  # needs the `h2` package (httpx[http2])
+    http_client_trust_env: bool = True  # honor HTTP(S)_PROXY / NO_PROXY for outbound calls
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
     
+    @property
+    def web_worker_count(self) -> int:
+        return self.web_workers if self.web_workers > 0 else _available_cores()
+
+    @property
+    def db_pool_size(self) -> int:
+        """
+        Connections per process; by default the server workers together get
+        Prisma's single-process default, and a job or script gets all of it.
+        """
+        if self.db_connection_limit > 0:
+            return self.db_connection_limit
+        return max(2, (2 * _available_cores() + 1) // max(1, self.db_pool_processes))
+
     @property
     def cors_origins_list(self) -> list[str]:
         """Parse comma-separated CORS origins into a list"""
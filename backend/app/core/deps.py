@@ -3,8 +3,9 @@ from typing import Optional, Sequence
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from prisma.models import User
-
+from .auth_epochs import get_auth_epoch_table
+from .config import get_settings
+from .principal import Principal, get_principal_cache
 from .security import decode_token
 from ..db import prisma
 
@@ -17,7 +18,7 @@ async def get_db():
     return prisma
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     payload = decode_token(token)
     if not payload or payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن نامعتبر است")
@@ -26,20 +27,38 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن نامعتبر است")
 
-    user = await prisma.user.find_unique(where={"id": int(user_id)})
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="کاربر یافت نشد")
-    
-    # Check if user is banned (using getattr for backward compatibility during migration)
-    is_banned = getattr(user, "isBanned", False)
-    if is_banned:
+    token_epoch = payload.get("epoch")
+    if get_settings().stateless_access_tokens and token_epoch is not None and payload.get("role"):
+        epochs = get_auth_epoch_table()
+        if epochs.ready:
+            if token_epoch < epochs.get(int(user_id)):
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن باطل شده است")
+            return Principal(
+                id=int(user_id),
+                role=payload["role"],
+                emailVerified=bool(payload.get("ev", False)),
+                authEpoch=token_epoch,
+            )
+
+    cache = get_principal_cache()
+    principal = cache.get(int(user_id))
+    if principal is None:
+        user = await prisma.user.find_unique(where={"id": int(user_id)})
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="کاربر یافت نشد")
+        principal = Principal.from_user(user)
+        cache.put(principal)
+
+    if principal.isBanned:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="حساب کاربری شما مسدود شده است")
-    
-    return user
+    if token_epoch is not None and token_epoch < principal.authEpoch:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن باطل شده است")
+
+    return principal
 
 
 def require_roles(allowed: Sequence[str]):
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_user)) -> Principal:
         if current_user.role not in allowed:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="دسترسی غیرمجاز")
         return current_user
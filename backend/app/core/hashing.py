@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .config import get_settings
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool so hashing never blocks the event loop.
+    bcrypt releases the GIL, so threads give real parallelism here.
+
+    At most `max_workers` hashes run at once; up to `max_pending` more wait in
+    line. Beyond that callers get a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._admitted = 0
+        self._running = 0
+        self._counts_lock = threading.Lock()  # _admitted and _running change on pool threads
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def _submit(self, fn: Callable[..., T], *args) -> T:
+        if self._admitted >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="سرور مشغول است، لطفا دوباره تلاش کنید",
+                headers={"Retry-After": "1"},
+            )
+        with self._counts_lock:
+            self._admitted += 1
+        enqueued = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._counts_lock:
+                self._running += 1
+            try:
+                return fn(*args), started
+            finally:
+                with self._counts_lock:
+                    self._running -= 1
+
+        try:
+            future = self._executor.submit(run)
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is freed when bcrypt finishes, not when the caller stops
+        # waiting: a cancelled request leaves its hash running on the pool.
+        future.add_done_callback(self._release)
+        result, started = await asyncio.wrap_future(future)
+        finished = time.perf_counter()
+        self.completed += 1
+        self.total_wait_seconds += started - enqueued
+        self.total_run_seconds += finished - started
+        return result
+
+    def _release(self, _future) -> None:
+        with self._counts_lock:
+            self._admitted -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(pwd_context.verify, plain_password, hashed_password)
+
+    @property
+    def queued(self) -> int:
+        return max(self._admitted - self._running, 0)
+
+    def metrics(self) -> dict:
+        completed = self.completed or 1
+        return {
+            "maxWorkers": self.max_workers,
+            "maxPending": self.max_pending,
+            "running": self._running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avgWaitMs": round(self.total_wait_seconds / completed * 1000, 2),
+            "avgRunMs": round(self.total_run_seconds / completed * 1000, 2),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        max_workers=settings.password_hash_workers,
+        max_pending=settings.password_hash_max_pending,
+    )
@@ -0,0 +1,37 @@
+import logging
+
+import httpx
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Application-scoped client for outbound calls (payment gateway). Keep-alive
+    connections are reused across requests, so the TCP+TLS handshake is paid
+    once per pooled connection rather than once per call.
+    """
+    settings = get_settings()
+    http2 = settings.http_client_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP_CLIENT_HTTP2 is set but the `h2` package is not installed; using HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.http_client_max_connections,
+            max_keepalive_connections=settings.http_client_max_keepalive,
+            keepalive_expiry=settings.http_client_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.http_client_timeout_seconds,
+            connect=settings.http_client_connect_timeout_seconds,
+            pool=settings.http_client_connect_timeout_seconds,
+        ),
+        trust_env=settings.http_client_trust_env,
+    )
@@ -0,0 +1,190 @@
+import asyncio
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import get_settings
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+UNMATCHED_ROUTE = "<unmatched>"
+# Anything else (arbitrary tokens are valid HTTP methods) is counted as OTHER
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+OTHER_METHOD = "OTHER"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing is a bisect and two additions."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str, out: List[str]) -> None:
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        out.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{suffix} {self.sum}")
+        out.append(f"{name}_count{suffix} {cumulative}")
+
+
+class RouteStats:
+    __slots__ = ("labels", "duration", "statuses", "response_bytes")
+
+    def __init__(self, method: str, route: str):
+        self.labels = f'method="{method}",route="{_escape(route)}"'
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.response_bytes = 0
+
+
+class HttpMetrics:
+    """
+    Per-process request metrics keyed by (method, route template), so path
+    parameters never multiply series. Everything is plain ints/floats updated
+    on the event loop thread; the per-route entry is created once and reused.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, response_bytes: int) -> None:
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats(method, route)
+        stats.duration.observe(seconds)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.response_bytes += response_bytes
+
+    def render(self, out: List[str]) -> None:
+        routes = sorted(self.routes.values(), key=lambda stats: stats.labels)
+        out.append("# HELP http_requests_total Requests handled, by route template and status code.")
+        out.append("# TYPE http_requests_total counter")
+        for stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                out.append(f'http_requests_total{{{stats.labels},status="{status}"}} {count}')
+        out.append("# HELP http_request_duration_seconds Time from receiving a request to the last response byte.")
+        out.append("# TYPE http_request_duration_seconds histogram")
+        for stats in routes:
+            stats.duration.render("http_request_duration_seconds", stats.labels, out)
+        out.append("# HELP http_response_size_bytes_total Response body bytes sent.")
+        out.append("# TYPE http_response_size_bytes_total counter")
+        for stats in routes:
+            out.append(f"http_response_size_bytes_total{{{stats.labels}}} {stats.response_bytes}")
+        out.append("# HELP http_requests_in_flight Requests currently being handled by this process.")
+        out.append("# TYPE http_requests_in_flight gauge")
+        out.append(f"http_requests_in_flight {self.in_flight}")
+        out.append("# HELP process_start_time_seconds Unix time the metrics registry was created.")
+        out.append("# TYPE process_start_time_seconds gauge")
+        out.append(f"process_start_time_seconds {self.started_at}")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/queue overhead). The route
+    template is read from the scope after routing, where FastAPI stores the
+    matched route; requests that match nothing share one label.
+    """
+
+    def __init__(self, app, metrics: Optional[HttpMetrics] = None):
+        self.app = app
+        self.metrics = metrics or get_http_metrics()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500
+        response_bytes = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            metrics.observe(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status,
+                time.perf_counter() - started,
+                response_bytes,
+            )
+
+
+class LoopLagMonitor:
+    """
+    Sleeps for `interval` in a loop and records how late each wake-up is: time
+    the event loop spent running other callbacks (blocking code, long CPU work)
+    instead of serving requests.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lag = Histogram(LOOP_LAG_BUCKETS)
+        self.last = 0.0
+        self.max = 0.0
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.last = lag
+            self.max = max(self.max, lag)
+            self.lag.observe(lag)
+
+    def render(self, out: List[str]) -> None:
+        out.append("# HELP event_loop_lag_seconds Most recent event loop wake-up delay.")
+        out.append("# TYPE event_loop_lag_seconds gauge")
+        out.append(f"event_loop_lag_seconds {self.last}")
+        out.append("# HELP event_loop_lag_max_seconds Largest event loop wake-up delay since start.")
+        out.append("# TYPE event_loop_lag_max_seconds gauge")
+        out.append(f"event_loop_lag_max_seconds {self.max}")
+        out.append("# HELP event_loop_lag_distribution_seconds Event loop wake-up delays.")
+        out.append("# TYPE event_loop_lag_distribution_seconds histogram")
+        self.lag.render("event_loop_lag_distribution_seconds", "", out)
+
+
+@lru_cache
+def get_http_metrics() -> HttpMetrics:
+    return HttpMetrics()
+
+
+@lru_cache
+def get_loop_lag_monitor() -> LoopLagMonitor:
+    return LoopLagMonitor(interval=get_settings().event_loop_lag_interval_seconds)
@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+from prisma.models import User
+
+from .config import get_settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The slice of a User that authorization needs. Field names mirror the
+    Prisma model so handlers can keep using `current_user.id` / `.role`.
+    """
+
+    id: int
+    role: str
+    isBanned: bool = False
+    emailVerified: bool = False
+    authEpoch: int = 0
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            isBanned=bool(getattr(user, "isBanned", False)),
+            emailVerified=bool(getattr(user, "emailVerified", False)),
+            authEpoch=getattr(user, "authEpoch", 0) or 0,
+        )
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of principals with a short TTL.
+    Invalidation is explicit on role/ban/password changes; the TTL bounds
+    staleness for changes made by other worker processes.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, tuple[float, Principal]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        if self.ttl_seconds <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, principal: Principal) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[principal.id] = (expires_at, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache
+def get_principal_cache() -> PrincipalCache:
+    settings = get_settings()
+    return PrincipalCache(
+        ttl_seconds=settings.principal_cache_ttl_seconds,
+        max_entries=settings.principal_cache_max_entries,
+    )
+
+
+def invalidate_principal(user_id: int) -> None:
+    get_principal_cache().invalidate(user_id)
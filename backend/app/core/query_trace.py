@@ -0,0 +1,111 @@
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .config import get_settings
+
+logger = logging.getLogger("app.db.queries")
+
+_SHAPE_LIMIT = 300
+
+
+class QueryTrace:
+    """Queries issued while handling one request, grouped by shape."""
+
+    __slots__ = ("count", "seconds", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Dict[str, int] = {}
+
+    def repeated(self, threshold: int) -> List[tuple[str, int]]:
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+
+_current_trace: ContextVar[Optional[QueryTrace]] = ContextVar("query_trace", default=None)
+
+
+def _argument_shape(value: Any) -> str:
+    """Keys and nesting of a Prisma argument tree, with every value replaced by `?`."""
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{key}: {_argument_shape(item)}" for key, item in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + (_argument_shape(value[0]) if value else "") + "]"
+    return "?"
+
+
+def query_shape(method: str, model: Any, arguments: Dict[str, Any]) -> str:
+    """
+    Value-free description of a query: `User.find_unique({where: {id: ?}})`,
+    or the whitespace-normalised SQL text for raw queries (already `?`-parameterised).
+    """
+    if method in ("query_raw", "execute_raw"):
+        shape = f"{method}: " + " ".join(str(arguments.get("query", "")).split())
+    else:
+        name = getattr(model, "__name__", "")
+        shape = f"{name}.{method}({_argument_shape(arguments)})"
+    return shape if len(shape) <= _SHAPE_LIMIT else shape[: _SHAPE_LIMIT - 3] + "..."
+
+
+def record_query(method: str, model: Any, arguments: Dict[str, Any], seconds: float) -> None:
+    trace = _current_trace.get()
+    slow = seconds * 1000 >= get_settings().slow_query_ms
+    if trace is None and not slow:
+        return
+    shape = query_shape(method, model, arguments)
+    if trace is not None:
+        trace.count += 1
+        trace.seconds += seconds
+        trace.shapes[shape] = trace.shapes.get(shape, 0) + 1
+    if slow:
+        logger.warning("Slow query (%.0f ms): %s", seconds * 1000, shape)
+
+
+class QueryTraceMiddleware:
+    """
+    Opens a QueryTrace per HTTP request. Afterwards, shapes repeated at least
+    `query_n_plus_one_threshold` times are logged as likely N+1 loops; in debug
+    mode the count, DB time and number of suspects are sent as X-DB-* headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        settings = get_settings()
+        trace = QueryTrace()
+        token = _current_trace.set(trace)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                suspects = len(trace.repeated(settings.query_n_plus_one_threshold))
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-query-count", str(trace.count).encode()),
+                    (b"x-db-time-ms", f"{trace.seconds * 1000:.1f}".encode()),
+                    (b"x-db-n-plus-one", str(suspects).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if settings.debug else send)
+        finally:
+            _current_trace.reset(token)
+            suspects = trace.repeated(settings.query_n_plus_one_threshold)
+            if suspects:
+                logger.warning(
+                    "Possible N+1 in %s %s (%s queries, %.0f ms): %s",
+                    scope["method"],
+                    getattr(scope.get("route"), "path", scope["path"]),
+                    trace.count,
+                    trace.seconds * 1000,
+                    "; ".join(f"{count}x {shape}" for shape, count in suspects),
+                )
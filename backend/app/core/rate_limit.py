@@ -0,0 +1,192 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+KeyFunc = Callable[[Request], Awaitable[Optional[str]]]
+
+
+def parse_rate(rate: str) -> tuple[int, float]:
+    """Parse "5/minute" into (capacity, period_seconds)."""
+    count, _, period = rate.partition("/")
+    return int(count), float(_PERIODS[period.strip().rstrip("s")])
+
+
+class InMemoryBackend:
+    """
+    Token buckets held in a bounded LRU. Per-process only: with several
+    workers each enforces the limit independently.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    async def hit(self, key: str, capacity: int, period: float) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a token is available."""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Same token bucket, evaluated atomically inside Redis so all workers share it.
+_REDIS_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisBackend:
+    """Shared backend for multi-worker deployments (requires the `redis` package)."""
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the `redis` package is not installed") from exc
+        self._redis = redis_asyncio.from_url(url)
+        self._script = self._redis.register_script(_REDIS_BUCKET_LUA)
+
+    async def hit(self, key: str, capacity: int, period: float) -> float:
+        wait = await self._script(keys=[f"ratelimit:{key}"], args=[capacity, capacity / period, time.time()])
+        return float(wait)
+
+
+@lru_cache
+def get_rate_limit_backend():
+    settings = get_settings()
+    if settings.rate_limit_redis_url:
+        return RedisBackend(settings.rate_limit_redis_url)
+    return InMemoryBackend()
+
+
+@lru_cache
+def _fallback_backend() -> InMemoryBackend:
+    return InMemoryBackend()
+
+
+_BACKEND_ERROR_LOG_INTERVAL = 60.0
+_last_backend_error_log = 0.0
+
+
+async def _hit(key: str, capacity: int, period: float) -> float:
+    """
+    Take a token from the configured backend. If it fails (e.g. Redis is
+    down) the limit is enforced per process instead of failing the request.
+    """
+    global _last_backend_error_log
+    if not get_settings().rate_limit_redis_url:
+        return await get_rate_limit_backend().hit(key, capacity, period)
+    try:
+        # built here too, so a missing or misconfigured client is also a fallback
+        return await get_rate_limit_backend().hit(key, capacity, period)
+    except Exception:
+        now = time.monotonic()
+        if now - _last_backend_error_log >= _BACKEND_ERROR_LOG_INTERVAL:
+            _last_backend_error_log = now
+            logger.exception("Rate limit backend failed; limiting per process until it recovers")
+        return await _fallback_backend().hit(key, capacity, period)
+
+
+async def client_ip(request: Request) -> Optional[str]:
+    """
+    Peer address, or behind the trusted proxy the address it saw: X-Real-IP
+    (nginx sets it from $remote_addr), else the last X-Forwarded-For hop. The
+    leading X-Forwarded-For entries come from the client and can be forged.
+    """
+    if get_settings().rate_limit_trust_proxy:
+        real_ip = request.headers.get("x-real-ip", "").strip()
+        if real_ip:
+            return real_ip
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[-1].strip() or None
+    return request.client.host if request.client else None
+
+
+def body_field(name: str) -> KeyFunc:
+    """Key on a JSON body field (e.g. email); FastAPI caches the parsed body for the handler."""
+
+    async def key(request: Request) -> Optional[str]:
+        try:
+            body = await request.json()
+        except Exception:
+            return None
+        value = body.get(name) if isinstance(body, dict) else None
+        return str(value).strip().lower() if value else None
+
+    return key
+
+
+def token_subject(field: str) -> KeyFunc:
+    """Key on the `sub` of a JWT carried in a JSON body field, without any DB access."""
+    from .security import decode_token
+
+    async def key(request: Request) -> Optional[str]:
+        token = await body_field(field)(request)
+        payload = decode_token(token) if token else None
+        return str(payload.get("sub")) if payload and payload.get("sub") else None
+
+    return key
+
+
+def rate_limit(scope: str, rate: str, key_func: KeyFunc = client_ip):
+    """
+    Route dependency enforcing `rate` (e.g. "5/minute") per key within `scope`.
+    Raises 429 with Retry-After before the handler does any DB or bcrypt work.
+    """
+    capacity, period = parse_rate(rate)
+
+    async def limiter(request: Request) -> None:
+        if not get_settings().rate_limit_enabled:
+            return
+        key = await key_func(request)
+        if not key:
+            return
+        wait = await _hit(f"{scope}:{key}", capacity, period)
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="تعداد درخواست‌ها بیش از حد مجاز است، لطفا کمی بعد تلاش کنید",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    return limiter
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the dependency while the breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"circuit '{name}' is open")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> calls flow; `failure_threshold` failures in a row open it.
+    open      -> calls fail fast for `reset_timeout` seconds.
+    half_open -> one trial call; success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def before_call(self) -> None:
+        if self.state == "open":
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1)
+            self._trial_in_flight = True
+        self.calls += 1
+
+    def record_success(self) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable[T]], failure_on: Tuple[Type[BaseException], ...]) -> T:
+        self.before_call()
+        try:
+            result = await fn()
+        except failure_on:
+            self.record_failure()
+            raise
+        except BaseException:
+            # not a dependency failure (e.g. a business-level error); release a half-open trial
+            self._trial_in_flight = False
+            raise
+        self.record_success()
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutiveFailures": self.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "timesOpened": self.opened,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def retry_async(
+    fn: Callable[[float], Awaitable[T]],
+    attempts: int,
+    budget: float,
+    base_delay: float,
+    retry_on: Tuple[Type[BaseException], ...],
+    max_delay: float = 2.0,
+) -> T:
+    """
+    Call `fn(timeout)` up to `attempts` times within a total `budget` seconds.
+    Each attempt receives the time left in the budget as its timeout; no retry
+    is started when the jittered wait would overrun it.
+    """
+    deadline = time.monotonic() + budget
+    last_exc: Optional[BaseException] = None
+    for attempt in range(1, max(1, attempts) + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            return await fn(remaining)
+        except retry_on as exc:
+            last_exc = exc
+            if attempt >= attempts:
+                break
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if time.monotonic() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+    if last_exc is None:
+        raise asyncio.TimeoutError()
+    raise last_exc
@@ -4,12 +4,11 @@ from typing import Optional
 from secrets import token_urlsafe
 
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 from .config import get_settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .hashing import get_password_hasher, pwd_context
+from .token_cache import get_token_cache
 
 
 def validate_password_strength(password: str) -> tuple[bool, str]:
@@ -49,13 +48,35 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool; use this from request handlers."""
+    return await get_password_hasher().verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the bcrypt pool; use this from request handlers."""
+    return await get_password_hasher().hash(password)
+
+
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, claims: Optional[dict] = None) -> str:
     settings = get_settings()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode = {"sub": subject, "type": "access", "exp": expire}
+    to_encode = {**(claims or {}), "sub": subject, "type": "access", "exp": expire}
     return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
+def principal_claims(user) -> dict:
+    """
+    Every access token carries the user's auth epoch, so bumping it revokes
+    outstanding tokens in both modes; stateless mode adds role + verification.
+    """
+    claims: dict = {"epoch": getattr(user, "authEpoch", 0) or 0}
+    if get_settings().stateless_access_tokens:
+        claims["role"] = user.role
+        claims["ev"] = bool(getattr(user, "emailVerified", False))
+    return claims
+
+
 def create_refresh_token(subject: str) -> str:
     settings = get_settings()
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
@@ -64,12 +85,19 @@ def create_refresh_token(subject: str) -> str:
 
 
 def decode_token(token: str) -> Optional[dict]:
+    cache = get_token_cache()
+    cached = cache.get(token)
+    if cached is not None:
+        return cached
     settings = get_settings()
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        return payload
     except JWTError:
         return None
+    # Refresh tokens are rotated on every use, so only access tokens are worth caching
+    if payload.get("type") == "access":
+        cache.put(token, payload)
+    return payload
 
 
 def generate_verification_token() -> str:
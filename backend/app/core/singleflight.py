@@ -0,0 +1,83 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent calls for the same key into one in-flight task and
+    remembers its result for `ttl_seconds`, so duplicates arriving during or
+    shortly after the first call get the same answer without redoing the work.
+
+    The shared task is shielded: a caller that disconnects does not cancel it
+    for the others. Exceptions are shared with concurrent waiters but never
+    cached; `cache_if` can keep selected results out of the cache as well.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._results: "OrderedDict[str, tuple[float, T]]" = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def _cached(self, key: str) -> Optional[tuple[float, T]]:
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._results[key]
+            return None
+        return entry
+
+    def _remember(self, key: str, value: T) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        cache_if: Callable[[T], bool] = lambda value: True,
+    ) -> T:
+        entry = self._cached(key)
+        if entry is not None:
+            self.cache_hits += 1
+            return entry[1]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+
+            async def execute() -> T:
+                try:
+                    value = await fn()
+                    if cache_if(value):
+                        self._remember(key, value)
+                    return value
+                finally:
+                    self._in_flight.pop(key, None)
+
+            task = asyncio.create_task(execute())
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    def metrics(self) -> dict:
+        return {
+            "inFlight": len(self._in_flight),
+            "cached": len(self._results),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "cacheHits": self.cache_hits,
+        }
@@ -0,0 +1,176 @@
+import asyncio
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+from typing import List, Optional
+
+from .config import get_settings
+
+
+def build_message(from_email: str, to_email: str, subject: str, html_body: str, text_body: Optional[str] = None) -> MIMEMultipart:
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = from_email
+    msg["To"] = to_email
+    if text_body:
+        msg.attach(MIMEText(text_body, "plain", "utf-8"))
+    msg.attach(MIMEText(html_body, "html", "utf-8"))
+    return msg
+
+
+class SmtpBatchError(Exception):
+    """
+    A pipelined batch stopped part-way. Messages before `failed_index` were
+    delivered; the one at `failed_index` and everything after it were not.
+    """
+
+    def __init__(self, failed_index: int, cause: BaseException):
+        super().__init__(f"message {failed_index} failed: {cause}")
+        self.failed_index = failed_index
+        self.cause = cause
+
+    @property
+    def sent(self) -> int:
+        return self.failed_index
+
+
+class SmtpPool:
+    """
+    Keeps up to `size` authenticated SMTP sessions open and reuses them, so
+    STARTTLS + login is paid once per connection instead of once per message.
+    smtplib is blocking, so sessions are driven from a dedicated thread pool.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        size: int = 4,
+        timeout: float = 10,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[smtplib.SMTP] = []
+        self._idle_lock = threading.Lock()
+        self.connects = 0
+        self.sent = 0
+        self.errors = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            conn.starttls()
+        if self.user:
+            conn.login(self.user, self.password)
+        self.connects += 1
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP) -> None:
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def _checkout(self) -> tuple[smtplib.SMTP, bool]:
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connect(), False
+
+    def _checkin(self, conn: smtplib.SMTP) -> None:
+        with self._idle_lock:
+            self._idle.append(conn)
+
+    def _send_blocking(self, messages: List[MIMEMultipart]) -> None:
+        try:
+            conn, reused = self._checkout()
+        except Exception as exc:
+            raise SmtpBatchError(0, exc) from exc
+        index = 0
+        try:
+            for index, msg in enumerate(messages):
+                try:
+                    conn.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # the server dropped an idle session; reconnect once and carry on
+                    if not reused:
+                        raise
+                    self._close(conn)
+                    conn, reused = self._connect(), False
+                    conn.send_message(msg)
+        except Exception as exc:
+            self._close(conn)
+            raise SmtpBatchError(index, exc) from exc
+        except BaseException:
+            self._close(conn)
+            raise
+        self._checkin(conn)
+
+    async def send(self, msg: MIMEMultipart) -> None:
+        try:
+            await self.send_many([msg])
+        except SmtpBatchError as exc:
+            raise exc.cause
+
+    async def send_many(self, messages: List[MIMEMultipart]) -> None:
+        """
+        Send several messages back to back over one pooled session. On failure
+        raises SmtpBatchError telling how many were delivered, so callers retry
+        only the rest.
+        """
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, self._send_blocking, messages)
+            except SmtpBatchError as exc:
+                self.errors += 1
+                self.sent += exc.sent
+                raise
+        self.sent += len(messages)
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size,
+            "idleConnections": len(self._idle),
+            "connects": self.connects,
+            "sent": self.sent,
+            "errors": self.errors,
+        }
+
+    def close(self) -> None:
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_smtp_pool() -> Optional[SmtpPool]:
+    """Shared pool for transactional mail; None when SMTP is not configured (development)."""
+    settings = get_settings()
+    if not settings.smtp_host:
+        return None
+    return SmtpPool(
+        host=settings.smtp_host,
+        port=settings.smtp_port,
+        user=settings.smtp_user,
+        password=settings.smtp_password,
+        use_tls=settings.smtp_use_tls,
+        size=settings.email_workers,
+        timeout=settings.smtp_timeout_seconds,
+    )
@@ -0,0 +1,67 @@
+import hashlib
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+from .config import get_settings
+
+
+class TokenVerificationCache:
+    """
+    LRU of already-verified JWT claims keyed by a SHA-256 digest of the token.
+    Entries live until the token's own `exp`, so a cached token is never
+    accepted after it would have failed verification.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, tuple[float, dict]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if self.max_entries <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {"size": len(self._entries), "maxEntries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache
+def get_token_cache() -> TokenVerificationCache:
+    return TokenVerificationCache(max_entries=get_settings().token_cache_max_entries)
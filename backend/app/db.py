@@ -1,8 +1,70 @@
+import asyncio
 import os
+import time
+from datetime import timedelta
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 from prisma import Prisma
 
+from .core.config import Settings, get_settings
+from .core.query_trace import record_query
+
 # جلوگیری از استفاده از پروکسی سیستم برای اتصال به کوئری انجین محلی
 os.environ.setdefault("NO_PROXY", "localhost,127.0.0.1")
 os.environ.setdefault("no_proxy", "localhost,127.0.0.1")
 
-prisma = Prisma(http={"trust_env": False})
+
+class TracedPrisma(Prisma):
+    """
+    Prisma client that times every query it sends to the engine and reports
+    it to the query trace (per-request counts, N+1 hints, slow-query log).
+    """
+
+    __slots__ = ()  # same layout as Prisma, so transaction copies can be re-classed
+
+    async def _execute(self, method: Any, arguments: dict, model: Any = None, root_selection: Any = None) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super()._execute(
+                method=method, arguments=arguments, model=model, root_selection=root_selection
+            )
+        finally:
+            record_query(method, model, arguments, time.perf_counter() - started)
+
+    def _copy(self) -> Prisma:
+        # prisma.tx() runs on a copy built as a plain Prisma; keep tracing queries made inside it.
+        new = super()._copy()
+        new.__class__ = TracedPrisma
+        return new
+
+
+def datasource_url(settings: Settings) -> str:
+    """DATABASE_URL with this process's pool size and timeouts added as engine parameters."""
+    parts = urlsplit(settings.database_url)
+    params = dict(parse_qsl(parts.query))
+    params.setdefault("connection_limit", str(settings.db_pool_size))
+    params.setdefault("pool_timeout", str(settings.db_pool_timeout_seconds))
+    params.setdefault("connect_timeout", str(settings.db_connect_timeout_seconds))
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+async def warm_up(client: Prisma, connections: int) -> None:
+    """Open pooled connections with concurrent no-op queries so first requests skip the handshake."""
+    if connections > 0:
+        await asyncio.gather(*(client.query_raw("SELECT 1") for _ in range(connections)))
+
+
+def _create_client() -> Prisma:
+    settings = get_settings()
+    client_class = TracedPrisma if settings.query_trace_enabled else Prisma
+    return client_class(
+        datasource={"url": datasource_url(settings)},
+        connect_timeout=timedelta(seconds=settings.db_engine_connect_timeout_seconds),
+        http={"trust_env": False},
+    )
+
+
+# Created at import but connected in the app lifespan, i.e. once inside every
+# worker process; nothing is shared with the parent across a fork.
+prisma = _create_client()
@@ -0,0 +1 @@
+# Batch jobs (run with `python -m app.jobs.<name>`)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from ..core.resilience import backoff_delay
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Small JSON checkpoint file for resumable jobs.
+    Writes go through a temp file + rename so a crash never leaves a torn file.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state: Dict[str, Any] = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fh:
+                self.state = json.load(fh)
+
+    def get(self, key: str, default=None):
+        return self.state.get(key, default)
+
+    def save(self, **values) -> None:
+        self.state.update(values)
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(self.state, fh, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class Watermark:
+    """
+    Tracks the highest key below which every dispatched chunk has completed.
+    Chunks finish out of order under concurrency; only the contiguous prefix is
+    safe to persist as a resume point.
+    """
+
+    def __init__(self, start: int):
+        self.value = start
+        self._pending: List[int] = []
+        self._done: set[int] = set()
+
+    def dispatched(self, last_key: int) -> None:
+        self._pending.append(last_key)
+
+    def completed(self, last_key: int) -> int:
+        self._done.add(last_key)
+        while self._pending and self._pending[0] in self._done:
+            key = self._pending.pop(0)
+            self._done.discard(key)
+            self.value = key
+        return self.value
+
+
+async def keyset_chunks(
+    fetch: Callable[[int, int], Awaitable[list]],
+    after_id: int,
+    chunk_size: int,
+    key: Callable[[Any], int] = lambda row: row.id,
+) -> AsyncIterator[list]:
+    """Yield successive `fetch(after_id, chunk_size)` pages ordered by ascending id."""
+    while True:
+        rows = await fetch(after_id, chunk_size)
+        if not rows:
+            return
+        yield rows
+        after_id = key(rows[-1])
+        if len(rows) < chunk_size:
+            return
+
+
+async def run_chunked(
+    chunks: AsyncIterator[list],
+    handle: Callable[[list], Awaitable[None]],
+    concurrency: int,
+    checkpoint: Checkpoint,
+    start_id: int,
+    key: Callable[[Any], int] = lambda row: row.id,
+    checkpoint_key: str = "last_id",
+) -> int:
+    """
+    Process chunks with at most `concurrency` in flight, checkpointing the
+    contiguous completed watermark after each chunk. Returns the final watermark.
+    """
+    watermark = Watermark(start_id)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    in_flight: set[asyncio.Task] = set()
+    failures: List[BaseException] = []
+
+    async def process(rows: list) -> None:
+        try:
+            await handle(rows)
+            value = watermark.completed(key(rows[-1]))
+            checkpoint.save(**{checkpoint_key: value})
+        except Exception as exc:
+            failures.append(exc)
+            logger.exception("Chunk ending at %s failed", key(rows[-1]))
+        finally:
+            slots.release()
+
+    async for rows in chunks:
+        await slots.acquire()
+        if failures:
+            slots.release()
+            break
+        watermark.dispatched(key(rows[-1]))
+        task = asyncio.create_task(process(rows))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    if failures:
+        raise failures[0]
+    return watermark.value
+
+
+class Throttle:
+    """Spaces work so a whole run stays under `rate` operations per second (0 = unthrottled)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self, count: int = 1) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next - now)
+            self._next = max(now, self._next) + count * self.interval
+        if wait:
+            await asyncio.sleep(wait)
+
+
+def is_deadlock(exc: BaseException) -> bool:
+    """MySQL 1213 (deadlock, transaction rolled back) as surfaced by the query engine."""
+    text = str(exc).lower()
+    return "1213" in text or "deadlock" in text
+
+
+async def retry_on_deadlock(fn: Callable[[], Awaitable[T]], attempts: int = 5, base_delay: float = 0.05) -> T:
+    """
+    Re-run `fn` when InnoDB picks it as a deadlock victim. `fn` must be safe to
+    repeat: a single statement or a whole transaction, which MySQL rolled back.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn()
+        except Exception as exc:
+            if attempt == attempts or not is_deadlock(exc):
+                raise
+            logger.warning("Deadlock (attempt %s/%s), retrying", attempt, attempts)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, 1.0))
+    raise AssertionError("unreachable")
+
+
+def configure_logging(verbose: bool = False) -> None:
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
@@ -0,0 +1,458 @@
+"""
+Generate a production-sized synthetic dataset for performance testing.
+
+Creates sellers and customers wired into multi-level referral trees, nested
+categories, products with colour/size variants, orders spread over the last
+--days days, and for paid orders the commissions, CommissionBalance and
+ReferralStats rows the live payment path would have written.
+
+Every row is derived from --seed and its index alone (ids are assigned
+explicitly from the tables' current maximum), so chunks are generated and
+bulk-inserted in parallel and two runs with the same arguments produce the
+same data. All users share one precomputed password hash. Run it against a
+dedicated database: rows written by anything else during the run would
+collide with the reserved id ranges.
+
+    python -m app.jobs.generate_data --users 1000000 --products 50000 --orders 3000000 --concurrency 8
+    python -m app.jobs.generate_data --users 20000 --orders 50000 --seed 7 --domain gen7.stylino.ir
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from prisma import Prisma
+
+from ..core.hashing import pwd_context
+from ..db import prisma as default_prisma
+from ..services.ledger_service import apply_balance_deltas, balance_deltas
+from ..services.referral_analytics_service import apply_stats_deltas
+from ..services.referral_codes import allocate_sequence_block, encode_referral_code
+from ..services.referral_service import build_commissions
+from .common import Checkpoint, configure_logging, retry_on_deadlock, run_chunked
+
+logger = logging.getLogger("app.jobs.generate_data")
+
+FIRST_NAMES = ["مریم", "زهرا", "سارا", "نگار", "هستی", "الهام", "نازنین", "فاطمه", "مهسا", "پریسا", "علی", "رضا", "امیر", "حسین", "محمد"]
+LAST_NAMES = ["رضایی", "محمدی", "حسینی", "احمدی", "کریمی", "فلاح", "موسوی", "جعفری", "کاظمی", "صادقی", "رحیمی", "نوری"]
+CATEGORY_NAMES = ["پیراهن", "مانتو", "شلوار", "دامن", "ست", "کیف", "کفش", "شال و روسری", "اکسسوری", "کت", "هودی", "تیشرت"]
+BRANDS = ["Stylino", "Minimal Chic", "Urban Line", "Rose Atelier", "Noora", "Sahel"]
+COLORS = ["مشکی", "سفید", "کرم", "صورتی", "یاسی", "سبز پاستلی", "آبی آسمانی", "نخودی", "قرمز", "طوسی"]
+SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+
+# Paid orders dominate, as on the live site; the rest are abandoned or failed checkouts.
+ORDER_OUTCOMES = [
+    (0.75, {"status": "PAID", "paymentStatus": "PAID", "shippingStatus": "DELIVERED"}),
+    (0.15, {"status": "PENDING", "paymentStatus": "UNPAID", "shippingStatus": "PENDING"}),
+    (0.10, {"status": "CANCELED", "paymentStatus": "FAILED", "shippingStatus": "PENDING"}),
+]
+
+_LINK_REFERRALS_SQL = "UPDATE `User` SET `referredById` = CASE `id` {cases} END WHERE `id` IN ({ids})"
+
+
+@dataclass
+class GenerateConfig:
+    sellers: int = 500
+    customers: int = 100_000
+    categories: int = 30
+    products: int = 20_000
+    colors_per_product: int = 2
+    sizes_per_product: int = 3
+    orders: int = 300_000
+    max_items: int = 4
+    referral_rate: float = 0.6  # share of users who signed up with a referral code
+    tree_skew: float = 3.0  # >1 concentrates referrals on early users (deep, heavy-tailed trees)
+    buyer_skew: float = 1.5  # >1 makes a minority of customers place most orders
+    days: int = 365
+    end: Optional[datetime] = None
+    seed: int = 42
+    domain: str = "gen.stylino.ir"
+    password: str = "Stylino123!"
+    chunk_size: int = 5_000
+    concurrency: int = 4
+
+    @property
+    def users(self) -> int:
+        return 1 + self.sellers + self.customers  # index 0 is the admin
+
+    @property
+    def variants_per_product(self) -> int:
+        return self.colors_per_product * self.sizes_per_product
+
+
+@dataclass
+class IdBase:
+    user: int
+    category: int
+    product: int
+    variant: int
+    order: int
+
+
+def _rng(config: GenerateConfig, *scope) -> random.Random:
+    """Independent, reproducible stream per (table, chunk) so chunks can run in any order."""
+    return random.Random(":".join(str(part) for part in (config.seed, *scope)))
+
+
+def build_referral_tree(config: GenerateConfig) -> array:
+    """
+    parents[i] is the index of user i's referrer, or -1. Referrers always sign
+    up earlier; u ** tree_skew favours the oldest accounts, giving a few very
+    large downlines, a long tail of small ones and trees many levels deep.
+    """
+    rng = _rng(config, "tree")
+    parents = array("i", [-1]) * config.users
+    for i in range(2, config.users):
+        if rng.random() < config.referral_rate:
+            parents[i] = 1 + int((i - 1) * rng.random() ** config.tree_skew)
+    return parents
+
+
+def referral_counts(parents: array) -> tuple[array, array]:
+    """Direct (level 1) and second-level referral counts per user index."""
+    level1 = array("i", [0]) * len(parents)
+    level2 = array("i", [0]) * len(parents)
+    for parent in parents:
+        if parent < 0:
+            continue
+        level1[parent] += 1
+        grandparent = parents[parent]
+        if grandparent >= 0:
+            level2[grandparent] += 1
+    return level1, level2
+
+
+def _role(config: GenerateConfig, index: int) -> str:
+    if index == 0:
+        return "ADMIN"
+    return "SELLER" if index <= config.sellers else "CUSTOMER"
+
+
+def user_email(config: GenerateConfig, index: int) -> str:
+    if index == 0:
+        return f"admin@{config.domain}"
+    return f"{_role(config, index).lower()}{index}@{config.domain}"
+
+
+def _product_attributes(config: GenerateConfig, index: int) -> tuple[List[str], List[str]]:
+    colors = [COLORS[(index + k) % len(COLORS)] for k in range(config.colors_per_product)]
+    start = index % max(1, len(SIZES) - config.sizes_per_product + 1)
+    return colors, SIZES[start : start + config.sizes_per_product]
+
+
+def product_prices(config: GenerateConfig) -> array:
+    rng = _rng(config, "prices")
+    return array("d", (float(rng.randrange(150, 6000) * 1000) for _ in range(config.products)))
+
+
+async def _index_chunks(total: int, chunk_size: int) -> AsyncIterator[range]:
+    for start in range(0, total, chunk_size):
+        yield range(start, min(total, start + chunk_size))
+
+
+async def _run_phase(
+    name: str, total: int, config: GenerateConfig, handle: Callable[[range], Awaitable[None]]
+) -> None:
+    started = time.perf_counter()
+    await run_chunked(
+        _index_chunks(total, config.chunk_size),
+        handle,
+        concurrency=config.concurrency,
+        checkpoint=Checkpoint(None),
+        start_id=-1,
+        key=lambda index: index,
+        checkpoint_key=name,
+    )
+    elapsed = time.perf_counter() - started
+    logger.info("%s: %s rows in %.1fs (%.0f rows/s)", name, total, elapsed, total / elapsed if elapsed else 0)
+
+
+async def _next_id(prisma: Prisma, table: str) -> int:
+    rows = await prisma.query_raw(f"SELECT COALESCE(MAX(`id`), 0) + 1 AS `id` FROM `{table}`")
+    return int(rows[0]["id"])
+
+
+async def generate(prisma: Prisma, config: GenerateConfig) -> Dict[str, int]:
+    admin_email = user_email(config, 0)
+    if await prisma.user.find_unique(where={"email": admin_email}):
+        raise RuntimeError(f"{admin_email} already exists; pick another --domain or use a fresh database")
+
+    end = config.end or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    span_seconds = config.days * 86400
+    password_hash = pwd_context.hash(config.password)
+    base = IdBase(
+        user=await _next_id(prisma, "User"),
+        category=await _next_id(prisma, "Category"),
+        product=await _next_id(prisma, "Product"),
+        variant=await _next_id(prisma, "ProductVariant"),
+        order=await _next_id(prisma, "Order"),
+    )
+    code_start = await allocate_sequence_block(prisma, config.users)
+    counts: Dict[str, int] = {"commissions": 0}
+
+    parents = build_referral_tree(config)
+    level1, level2 = referral_counts(parents)
+    prices = product_prices(config)
+
+    def user_id(index: int) -> Optional[int]:
+        return base.user + index if index >= 0 else None
+
+    def signup_time(index: int) -> datetime:
+        # Accounts are created in index order over the window, so referrers predate referrals.
+        return end - timedelta(seconds=span_seconds * (1 - index / config.users))
+
+    async def users(chunk: range) -> None:
+        rng = _rng(config, "users", chunk.start)
+        await prisma.user.create_many(
+            data=[
+                {
+                    "id": base.user + i,
+                    "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    "email": user_email(config, i),
+                    "passwordHash": password_hash,
+                    "role": _role(config, i),
+                    "referralCode": encode_referral_code(code_start + i),
+                    "emailVerified": rng.random() < 0.9,
+                    "createdAt": signup_time(i),
+                }
+                for i in chunk
+            ]
+        )
+
+    async def referrals(chunk: range) -> None:
+        # Referrers may sit in a chunk inserted concurrently, so links are set once every user exists.
+        linked = [i for i in chunk if parents[i] >= 0]
+        if linked:
+            args: list = []
+            for i in linked:
+                args.extend([user_id(i), user_id(parents[i])])
+            args.extend(user_id(i) for i in linked)
+            await prisma.execute_raw(
+                _LINK_REFERRALS_SQL.format(
+                    cases=" ".join(["WHEN ? THEN ?"] * len(linked)), ids=", ".join(["?"] * len(linked))
+                ),
+                *args,
+            )
+        counts_by_user = {user_id(i): [level1[i], level2[i], 0.0, 0.0] for i in chunk if level1[i] or level2[i]}
+        await retry_on_deadlock(lambda: apply_stats_deltas(prisma, counts_by_user))
+
+    await _run_phase("users", config.users, config, users)
+    await _run_phase("referrals", config.users, config, referrals)
+
+    roots = max(1, config.categories // 5)
+    await prisma.category.create_many(
+        data=[
+            {"id": base.category + i, "name": CATEGORY_NAMES[i % len(CATEGORY_NAMES)], "slug": f"gen-{config.seed}-c{i}"}
+            for i in range(roots)
+        ]
+    )
+    await prisma.category.create_many(
+        data=[
+            {
+                "id": base.category + i,
+                "name": f"{CATEGORY_NAMES[i % len(CATEGORY_NAMES)]} {i}",
+                "slug": f"gen-{config.seed}-c{i}",
+                "parentId": base.category + i % roots,
+            }
+            for i in range(roots, config.categories)
+        ]
+    )
+
+    async def products(chunk: range) -> None:
+        rng = _rng(config, "products", chunk.start)
+        product_rows, variant_rows = [], []
+        for p in chunk:
+            price = prices[p]
+            colors, sizes = _product_attributes(config, p)
+            product_id = base.product + p
+            product_rows.append(
+                {
+                    "id": product_id,
+                    "sellerId": base.user + 1 + rng.randrange(config.sellers),
+                    "name": f"{CATEGORY_NAMES[p % len(CATEGORY_NAMES)]} مدل {p}",
+                    "slug": f"gen-{config.seed}-{p}",
+                    "description": "محصول تولیدشده برای تست کارایی.",
+                    "basePrice": price,
+                    "discountPrice": round(price * 0.9, -3) if rng.random() < 0.2 else None,
+                    "categoryId": base.category + rng.randrange(config.categories),
+                    "brand": rng.choice(BRANDS),
+                    "colors": json.dumps(colors, ensure_ascii=False),
+                    "sizes": json.dumps(sizes, ensure_ascii=False),
+                    "images": json.dumps([]),
+                    "isActive": rng.random() < 0.95,
+                    "stock": rng.randrange(0, 500),
+                    "createdAt": end - timedelta(seconds=rng.random() * span_seconds),
+                }
+            )
+            for j in range(config.variants_per_product):
+                variant_rows.append(
+                    {
+                        "id": base.variant + p * config.variants_per_product + j,
+                        "productId": product_id,
+                        "sku": f"GEN{config.seed}-{p}-{j}",
+                        "color": colors[j // config.sizes_per_product],
+                        "size": sizes[j % config.sizes_per_product],
+                        "price": price,
+                        "stock": rng.randrange(0, 100),
+                    }
+                )
+        await prisma.product.create_many(data=product_rows)
+        if variant_rows:
+            await prisma.productvariant.create_many(data=variant_rows)
+
+    await _run_phase("products", config.products, config, products)
+
+    async def orders(chunk: range) -> None:
+        rng = _rng(config, "orders", chunk.start)
+        order_rows, item_rows, commission_rows = [], [], []
+        stats: Dict[int, List[float]] = {}
+        for o in chunk:
+            order_id = base.order + o
+            buyer = 1 + config.sellers + int(config.customers * rng.random() ** config.buyer_skew)
+            signed_up = signup_time(buyer)
+            created_at = signed_up + (end - signed_up) * rng.random()
+            total = 0.0
+            for _ in range(rng.randint(1, config.max_items)):
+                p = rng.randrange(config.products)
+                j = rng.randrange(config.variants_per_product) if config.variants_per_product else None
+                colors, sizes = _product_attributes(config, p)
+                quantity = 1 if rng.random() < 0.8 else rng.randint(2, 3)
+                unit_price = prices[p]
+                total += unit_price * quantity
+                item_rows.append(
+                    {
+                        "orderId": order_id,
+                        "productId": base.product + p,
+                        "variantId": None if j is None else base.variant + p * config.variants_per_product + j,
+                        "quantity": quantity,
+                        "unitPrice": unit_price,
+                        "totalPrice": unit_price * quantity,
+                        "color": None if j is None else colors[j // config.sizes_per_product],
+                        "size": None if j is None else sizes[j % config.sizes_per_product],
+                    }
+                )
+            roll, outcome = rng.random(), ORDER_OUTCOMES[-1][1]
+            for share, candidate in ORDER_OUTCOMES:
+                if roll < share:
+                    outcome = candidate
+                    break
+                roll -= share
+            order_rows.append(
+                {
+                    "id": order_id,
+                    "customerId": user_id(buyer),
+                    "totalAmount": total,
+                    "paymentMethod": "ZARINPAL",
+                    "createdAt": created_at,
+                    "paidAt": created_at if outcome["paymentStatus"] == "PAID" else None,
+                    **outcome,
+                }
+            )
+            parent = parents[buyer]
+            if outcome["paymentStatus"] != "PAID" or parent < 0:
+                continue
+            grandparent = parents[parent]
+            for data in build_commissions(user_id(buyer), order_id, total, [user_id(parent), user_id(grandparent)]):
+                commission_rows.append({**data, "createdAt": created_at})
+            stats.setdefault(user_id(parent), [0, 0, 0.0, 0.0])[2] += total
+            if grandparent >= 0:
+                stats.setdefault(user_id(grandparent), [0, 0, 0.0, 0.0])[3] += total
+
+        await prisma.order.create_many(data=order_rows)
+        # Popular referrers are shared by every chunk; the upserts are sorted by
+        # userId and retried if InnoDB still picks one as a deadlock victim.
+        balances = balance_deltas(commission_rows)
+        writes = [
+            prisma.orderitem.create_many(data=item_rows),
+            retry_on_deadlock(lambda: apply_balance_deltas(prisma, balances)),
+            retry_on_deadlock(lambda: apply_stats_deltas(prisma, stats)),
+        ]
+        if commission_rows:
+            writes.append(prisma.commission.create_many(data=commission_rows))
+        await asyncio.gather(*writes)
+        counts["commissions"] += len(commission_rows)
+
+    await _run_phase("orders", config.orders, config, orders)
+
+    counts.update(
+        users=config.users,
+        referred=sum(1 for parent in parents if parent >= 0),
+        categories=config.categories,
+        products=config.products,
+        variants=config.products * config.variants_per_product,
+        orders=config.orders,
+    )
+    return counts
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = GenerateConfig()
+    parser = argparse.ArgumentParser(description="Bulk-generate a deterministic synthetic dataset")
+    parser.add_argument("--users", type=int, default=defaults.customers, help="customer accounts")
+    parser.add_argument("--sellers", type=int, default=defaults.sellers)
+    parser.add_argument("--categories", type=int, default=defaults.categories)
+    parser.add_argument("--products", type=int, default=defaults.products)
+    parser.add_argument("--colors", type=int, default=defaults.colors_per_product, help="colours per product")
+    parser.add_argument("--sizes", type=int, default=defaults.sizes_per_product, help="sizes per product")
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--referral-rate", type=float, default=defaults.referral_rate)
+    parser.add_argument("--tree-skew", type=float, default=defaults.tree_skew)
+    parser.add_argument("--days", type=int, default=defaults.days, help="history window for timestamps")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="end of the window (default: today 00:00 UTC)")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--domain", default=defaults.domain, help="email domain of generated accounts")
+    parser.add_argument("--password", default=defaults.password, help="password shared by all accounts")
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="chunks inserted in parallel")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    configure_logging(args.verbose)
+    if args.sellers < 1 or args.products < 1 or args.categories < 1:
+        raise SystemExit("--sellers, --products and --categories must be at least 1")
+    if args.sizes > len(SIZES) or args.colors > len(COLORS):
+        raise SystemExit(f"at most {len(COLORS)} colours and {len(SIZES)} sizes per product")
+    config = GenerateConfig(
+        sellers=args.sellers,
+        customers=args.users,
+        categories=args.categories,
+        products=args.products,
+        colors_per_product=args.colors,
+        sizes_per_product=args.sizes,
+        orders=args.orders,
+        referral_rate=args.referral_rate,
+        tree_skew=args.tree_skew,
+        days=args.days,
+        end=args.end,
+        seed=args.seed,
+        domain=args.domain,
+        password=args.password,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+    )
+    await default_prisma.connect()
+    started = time.perf_counter()
+    try:
+        counts = await generate(default_prisma, config)
+    finally:
+        await default_prisma.disconnect()
+    logger.info(
+        "Generated %s in %.1fs; log in as %s / %s",
+        ", ".join(f"{value} {name}" for name, value in counts.items()),
+        time.perf_counter() - started,
+        user_email(config, 0),
+        config.password,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,212 @@
+"""
+Recompute commissions for historical paid orders.
+
+Walks paid orders in id order, rebuilds the expected commissions from the
+current referral tree and COMMISSION_RATES, diffs them against the stored
+Commission rows and applies inserts/deletes (plus the matching
+CommissionBalance deltas) in one transaction per chunk.
+
+    python -m app.jobs.recompute_commissions --dry-run
+    python -m app.jobs.recompute_commissions --chunk-size 2000 --concurrency 8 --checkpoint recompute.json
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from prisma import Prisma
+from prisma.models import Commission, Order
+
+from ..db import prisma as default_prisma
+from ..services.ledger_service import apply_balance_deltas, balance_deltas
+from ..services.referral_service import build_commissions
+from .common import Checkpoint, configure_logging, keyset_chunks, retry_on_deadlock, run_chunked
+
+logger = logging.getLogger("app.jobs.recompute_commissions")
+
+CommissionKey = Tuple[int, int]  # (orderId, level)
+
+
+@dataclass
+class RecomputeStats:
+    orders: int = 0
+    unchanged: int = 0
+    inserted: int = 0
+    deleted: int = 0
+    changed_orders: List[int] = field(default_factory=list)
+
+
+def diff_commissions(
+    expected: List[Dict], existing: List[Commission]
+) -> Tuple[List[Dict], List[Commission]]:
+    """
+    Compare expected commission rows with stored ones for the same orders.
+    Returns (to_insert, to_delete); a row whose recipient or amount changed is
+    replaced, keeping the stored status so settled rows stay settled.
+    """
+    current: Dict[CommissionKey, List[Commission]] = {}
+    for c in existing:
+        current.setdefault((c.orderId, c.level), []).append(c)
+
+    to_insert: List[Dict] = []
+    to_delete: List[Commission] = []
+    for data in expected:
+        rows = current.pop((data["orderId"], data["level"]), [])
+        match = next(
+            (c for c in rows if c.toUserId == data["toUserId"] and round(c.amount, 2) == data["amount"]),
+            None,
+        )
+        if match:
+            rows.remove(match)
+        else:
+            if rows:
+                data = {**data, "status": rows[0].status}
+            to_insert.append(data)
+        to_delete.extend(rows)
+    for rows in current.values():
+        to_delete.extend(rows)
+    return to_insert, to_delete
+
+
+async def _resolve_upline(prisma: Prisma, customer_ids: List[int]) -> Dict[int, List[Optional[int]]]:
+    """Two batched lookups resolve both referral levels for a whole chunk."""
+    buyers = await prisma.user.find_many(where={"id": {"in": customer_ids}})
+    parent_of = {u.id: u.referredById for u in buyers}
+    level1_ids = list({pid for pid in parent_of.values() if pid})
+    level1_users = await prisma.user.find_many(where={"id": {"in": level1_ids}}) if level1_ids else []
+    parent_of.update({u.id: u.referredById for u in level1_users})
+    existing_ids = set(parent_of)
+
+    upline: Dict[int, List[Optional[int]]] = {}
+    for customer_id in customer_ids:
+        level1 = parent_of.get(customer_id)
+        level1 = level1 if level1 in existing_ids else None
+        level2 = parent_of.get(level1) if level1 else None
+        upline[customer_id] = [level1, level2]
+    return upline
+
+
+async def recompute_chunk(prisma: Prisma, orders: List[Order], dry_run: bool, stats: RecomputeStats) -> None:
+    order_ids = [o.id for o in orders]
+    customer_ids = list({o.customerId for o in orders if o.customerId})
+    upline = await _resolve_upline(prisma, customer_ids) if customer_ids else {}
+
+    expected: List[Dict] = []
+    for order in orders:
+        if order.customerId:
+            expected.extend(build_commissions(order.customerId, order.id, order.totalAmount, upline.get(order.customerId, [])))
+
+    existing = await prisma.commission.find_many(where={"orderId": {"in": order_ids}})
+    to_insert, to_delete = diff_commissions(expected, existing)
+
+    stats.orders += len(orders)
+    stats.unchanged += len(expected) - len(to_insert)
+    stats.inserted += len(to_insert)
+    stats.deleted += len(to_delete)
+    if (to_insert or to_delete) and len(stats.changed_orders) < 20:
+        touched = {d["orderId"] for d in to_insert} | {c.orderId for c in to_delete}
+        stats.changed_orders.extend(sorted(touched)[: 20 - len(stats.changed_orders)])
+    if dry_run or not (to_insert or to_delete):
+        return
+
+    deltas = balance_deltas(to_delete, sign=-1)
+    balance_deltas(to_insert, deltas=deltas)
+
+    async def write() -> None:
+        # Chunks run concurrently and share upline balances; a deadlock rolls
+        # the whole transaction back, so it is safe to run it again.
+        async with prisma.tx() as transaction:
+            if to_delete:
+                await transaction.commission.delete_many(where={"id": {"in": [c.id for c in to_delete]}})
+            if to_insert:
+                await transaction.commission.create_many(data=to_insert)
+            await apply_balance_deltas(transaction, deltas)
+
+    await retry_on_deadlock(write)
+
+
+async def recompute_commissions(
+    prisma: Prisma,
+    chunk_size: int = 1000,
+    concurrency: int = 4,
+    checkpoint_path: Optional[str] = None,
+    dry_run: bool = False,
+    restart: bool = False,
+) -> RecomputeStats:
+    checkpoint = Checkpoint(checkpoint_path)
+    start_id = 0 if restart else int(checkpoint.get("last_order_id", 0))
+    stats = RecomputeStats()
+
+    async def fetch(after_id: int, limit: int) -> List[Order]:
+        return await prisma.order.find_many(
+            where={"paymentStatus": "PAID", "id": {"gt": after_id}},
+            order={"id": "asc"},
+            take=limit,
+        )
+
+    async def handle(orders: List[Order]) -> None:
+        await recompute_chunk(prisma, orders, dry_run, stats)
+        logger.info(
+            "orders<=%s processed=%s inserted=%s deleted=%s",
+            orders[-1].id,
+            stats.orders,
+            stats.inserted,
+            stats.deleted,
+        )
+
+    if start_id:
+        logger.info("Resuming after order %s", start_id)
+    # A dry run must not move the checkpoint of a real run.
+    progress = Checkpoint(None) if dry_run else checkpoint
+    await run_chunked(
+        keyset_chunks(fetch, start_id, chunk_size),
+        handle,
+        concurrency=concurrency,
+        checkpoint=progress,
+        start_id=start_id,
+        checkpoint_key="last_order_id",
+    )
+    return stats
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Recompute commissions for paid orders")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--checkpoint", default="recompute_commissions.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first order")
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without writing")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    configure_logging(args.verbose)
+    await default_prisma.connect()
+    try:
+        stats = await recompute_commissions(
+            default_prisma,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            checkpoint_path=args.checkpoint,
+            dry_run=args.dry_run,
+            restart=args.restart,
+        )
+    finally:
+        await default_prisma.disconnect()
+    logger.info(
+        "Done: orders=%s unchanged=%s inserted=%s deleted=%s%s",
+        stats.orders,
+        stats.unchanged,
+        stats.inserted,
+        stats.deleted,
+        " (dry run)" if args.dry_run else "",
+    )
+    if stats.changed_orders:
+        logger.info("Sample of changed orders: %s", stats.changed_orders)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Reconcile orders stuck in UNPAID after a gateway redirect.
+
+Users who pay but never come back to /payments/zarinpal/callback leave their
+order UNPAID with an authority set. This job walks those orders in id order
+(only ones older than --min-age-minutes, so live checkouts are left alone),
+verifies each authority against Zarinpal with bounded concurrency and a
+request-rate cap, then marks captured payments paid (commissions included)
+and cancels the ones the gateway reports as failed in one batched update per
+chunk. Orders whose outcome is still unknown (gateway timeouts) are kept in
+the checkpoint and verified again first on the next run.
+
+    python -m app.jobs.reconcile_payments --dry-run
+    python -m app.jobs.reconcile_payments --concurrency 16 --rate 20 --checkpoint reconcile.checkpoint.json
+"""
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from prisma import Prisma
+from prisma.models import Order
+
+from ..core.http import create_http_client
+from ..db import prisma as default_prisma
+from ..services.order_service import mark_order_paid
+from ..services.payment_log import (
+    EVENT_VERIFY,
+    STATUS_ERROR,
+    STATUS_FAILED,
+    STATUS_OK,
+    get_payment_event_writer,
+    record_payment_event,
+)
+from ..services.zarinpal_client import ZarinpalClient, ZarinpalError, ZarinpalUnavailable, build_zarinpal_client
+from .common import Checkpoint, Throttle, configure_logging, keyset_chunks, run_chunked
+
+logger = logging.getLogger("app.jobs.reconcile_payments")
+
+
+@dataclass
+class ReconcileStats:
+    checked: int = 0
+    paid: int = 0
+    failed: int = 0
+    unknown: int = 0
+
+
+def _amount_toman(order: Order) -> int:
+    return int(round(order.paymentAmount or order.totalAmount))
+
+
+async def reconcile_payments(
+    prisma: Prisma,
+    client: ZarinpalClient,
+    min_age: timedelta = timedelta(minutes=30),
+    chunk_size: int = 200,
+    concurrency: int = 8,
+    rate: float = 20,
+    checkpoint: Optional[Checkpoint] = None,
+    restart: bool = False,
+    dry_run: bool = False,
+) -> ReconcileStats:
+    checkpoint = checkpoint or Checkpoint(None)
+    if dry_run:
+        checkpoint = Checkpoint(None)
+    start_id = 0 if restart else int(checkpoint.get("last_id", 0))
+    # The watermark moves past orders whose outcome is unknown, so they are
+    # remembered separately; a crash never loses one that was not re-checked.
+    unknown_ids = set() if restart else {int(order_id) for order_id in checkpoint.get("unknown_ids", [])}
+    cutoff = datetime.utcnow() - min_age
+    stats = ReconcileStats()
+    gateway_slots = asyncio.Semaphore(max(1, concurrency))
+    throttle = Throttle(rate)
+
+    async def fetch(after_id: int, limit: int) -> List[Order]:
+        return await prisma.order.find_many(
+            where={
+                "id": {"gt": after_id},
+                "paymentStatus": "UNPAID",
+                "authority": {"not": None},
+                "createdAt": {"lt": cutoff},
+            },
+            order={"id": "asc"},
+            take=limit,
+        )
+
+    async def verify(order: Order):
+        async with gateway_slots:
+            await throttle.take()
+            try:
+                return await client.payment_verify(
+                    authority=order.authority, amount_toman=_amount_toman(order), order_id=order.id
+                )
+            except ZarinpalUnavailable:
+                if client.breaker.state == "open":
+                    # stop rather than burn through the backlog; resume from the checkpoint later
+                    raise
+                return None
+            except ZarinpalError as exc:
+                if exc.code is None:
+                    # HTTP 4xx or an unreadable body (rate limited, merchant misconfigured):
+                    # the gateway said nothing about the payment, so keep it for the next run
+                    logger.warning("Verify gave no outcome for order %s: %s", order.id, exc)
+                    return None
+                return exc
+
+    async def handle(orders: List[Order]) -> None:
+        results = await asyncio.gather(*(verify(order) for order in orders))
+        stats.checked += len(orders)
+        failed_by_message: Dict[str, List[int]] = {}
+        for order, result in zip(orders, results):
+            unknown_ids.discard(order.id)
+            if result is None:
+                stats.unknown += 1
+                unknown_ids.add(order.id)
+                continue
+            if not dry_run:
+                if isinstance(result, ZarinpalError):
+                    record_payment_event(
+                        order.id,
+                        EVENT_VERIFY,
+                        STATUS_ERROR,
+                        _amount_toman(order),
+                        authority=order.authority,
+                        code=result.code,
+                        response={"message": str(result), "source": "reconcile"},
+                    )
+                else:
+                    record_payment_event(
+                        order.id,
+                        EVENT_VERIFY,
+                        STATUS_OK if result.success else STATUS_FAILED,
+                        _amount_toman(order),
+                        authority=order.authority,
+                        code=result.status_code,
+                        ref_id=result.ref_id,
+                        response={**result.model_dump(), "source": "reconcile"},
+                    )
+            if isinstance(result, ZarinpalError):
+                failed_by_message.setdefault(str(result), []).append(order.id)
+            elif result.success:
+                stats.paid += 1
+                if dry_run:
+                    continue
+                await mark_order_paid(
+                    prisma=prisma,
+                    order_id=order.id,
+                    requested_by=order.customerId,
+                    is_admin=True,
+                    payment_update={
+                        "refId": result.ref_id,
+                        "cardPan": result.card_pan,
+                        "feeType": result.fee_type,
+                        "fee": result.fee,
+                        "paymentMessage": result.message,
+                        "paymentGateway": "ZARINPAL",
+                        "paymentAmount": _amount_toman(order),
+                    },
+                )
+            else:
+                failed_by_message.setdefault(result.message, []).append(order.id)
+
+        for message, ids in failed_by_message.items():
+            stats.failed += len(ids)
+            if dry_run:
+                continue
+            # guarded on UNPAID so a callback that settled the order meanwhile wins
+            await prisma.order.update_many(
+                where={"id": {"in": ids}, "paymentStatus": "UNPAID"},
+                data={"paymentStatus": "FAILED", "status": "CANCELED", "paymentMessage": message},
+            )
+        if not dry_run:
+            # no background flusher in a job; persist this chunk's events now
+            await get_payment_event_writer().flush(prisma)
+        checkpoint.save(unknown_ids=sorted(unknown_ids))
+        logger.info(
+            "Through order %s: %s checked, %s paid, %s failed, %s unknown",
+            orders[-1].id,
+            stats.checked,
+            stats.paid,
+            stats.failed,
+            stats.unknown,
+        )
+
+    retry_ids = sorted(unknown_ids)
+    for offset in range(0, len(retry_ids), chunk_size):
+        ids = retry_ids[offset : offset + chunk_size]
+        orders = await prisma.order.find_many(
+            where={"id": {"in": ids}, "paymentStatus": "UNPAID", "authority": {"not": None}},
+            order={"id": "asc"},
+        )
+        # settled meanwhile (callback or an admin) -> nothing left to check
+        unknown_ids.difference_update(set(ids) - {order.id for order in orders})
+        if orders:
+            logger.info("Re-checking %s orders left unknown by the previous run", len(orders))
+            await handle(orders)
+        else:
+            checkpoint.save(unknown_ids=sorted(unknown_ids))
+
+    await run_chunked(
+        keyset_chunks(fetch, start_id, chunk_size),
+        handle,
+        concurrency=2,  # gateway parallelism is bounded by gateway_slots
+        checkpoint=checkpoint,
+        start_id=start_id,
+    )
+    return stats
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verify stuck UNPAID orders against Zarinpal")
+    parser.add_argument("--min-age-minutes", type=float, default=30, help="skip orders newer than this")
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="gateway calls in flight")
+    parser.add_argument("--rate", type=float, default=20, help="max verify calls per second (0 = unthrottled)")
+    parser.add_argument("--checkpoint", help="JSON file used to resume an interrupted run")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first order")
+    parser.add_argument("--dry-run", action="store_true", help="verify and report without updating orders")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    configure_logging(args.verbose)
+    http = create_http_client()
+    client = build_zarinpal_client(http)
+    if client is None:
+        raise SystemExit("Zarinpal is not configured (ZARINPAL_MERCHANT_ID / ZARINPAL_CALLBACK_URL)")
+    await default_prisma.connect()
+    try:
+        stats = await reconcile_payments(
+            default_prisma,
+            client,
+            min_age=timedelta(minutes=args.min_age_minutes),
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            checkpoint=Checkpoint(args.checkpoint),
+            restart=args.restart,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await default_prisma.disconnect()
+        await http.aclose()
+    logger.info(
+        "%s orders checked: %s paid, %s failed, %s unknown%s",
+        stats.checked,
+        stats.paid,
+        stats.failed,
+        stats.unknown,
+        " (dry run)" if args.dry_run else "",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
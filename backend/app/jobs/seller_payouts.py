@@ -0,0 +1,54 @@
+"""
+Compute seller payouts for a settlement period.
+
+    python -m app.jobs.seller_payouts --period-start 2026-09-01 --period-end 2026-10-01 --dry-run
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from ..db import prisma
+from ..services.payout_service import run_seller_payouts
+from .common import configure_logging
+
+logger = logging.getLogger("app.jobs.seller_payouts")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compute PENDING seller payouts for a period")
+    parser.add_argument("--period-start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--period-end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    configure_logging(args.verbose)
+    await prisma.connect()
+    try:
+        lines = await run_seller_payouts(prisma, args.period_start, args.period_end, dry_run=args.dry_run)
+    finally:
+        await prisma.disconnect()
+    for line in lines:
+        logger.debug(
+            "seller=%s gross=%s commission=%s paid=%s net=%s",
+            line.seller_id,
+            line.gross,
+            line.commission,
+            line.already_paid,
+            line.net,
+        )
+    logger.info(
+        "%s sellers, net payable %s%s",
+        len(lines),
+        round(sum(max(line.net, 0) for line in lines), 2),
+        " (dry run)" if args.dry_run else "",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
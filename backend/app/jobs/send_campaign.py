@@ -0,0 +1,219 @@
+"""
+Send a bulk email campaign (sales, order updates, ...) to users.
+
+Recipients are streamed from User in id order; the subject and bodies are
+parsed once as string.Template and filled per recipient ($name, $email,
+$referral_code, $frontend_url). Messages are pipelined over a handful of
+persistent SMTP sessions under a global send-rate cap, and progress is
+checkpointed so an interrupted run resumes where it stopped.
+
+    python -m app.jobs.send_campaign --subject "حراج پاییزه" --html-template sale.html --dry-run
+    python -m app.jobs.send_campaign --subject "حراج پاییزه" --html-template sale.html \\
+        --connections 8 --rate 400 --checkpoint sale.checkpoint.json
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from string import Template
+from typing import Dict, List, Optional
+
+from prisma import Prisma
+
+from ..core.config import get_settings
+from ..core.smtp import SmtpBatchError, SmtpPool, build_message
+from ..db import prisma as default_prisma
+from .common import Checkpoint, Throttle, configure_logging, keyset_chunks, run_chunked
+
+logger = logging.getLogger("app.jobs.send_campaign")
+
+_RECIPIENTS_SQL = (
+    "SELECT `id`, `name`, `email`, `referralCode` FROM `User` "
+    "WHERE `id` > ? AND `role` = ? AND `isBanned` = false{verified} ORDER BY `id` LIMIT ?"
+)
+
+
+@dataclass
+class CampaignStats:
+    recipients: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+class CampaignTemplate:
+    """Subject and bodies compiled once, rendered per recipient."""
+
+    def __init__(self, subject: str, html: str, text: Optional[str] = None):
+        self.subject = Template(subject)
+        self.html = Template(html)
+        self.text = Template(text) if text else None
+
+    def render(self, from_email: str, recipient: Dict) -> MIMEMultipart:
+        values = {
+            "name": recipient["name"],
+            "email": recipient["email"],
+            "referral_code": recipient["referralCode"],
+            "frontend_url": get_settings().frontend_url,
+        }
+        return build_message(
+            from_email,
+            recipient["email"],
+            self.subject.safe_substitute(values),
+            self.html.safe_substitute(values),
+            self.text.safe_substitute(values) if self.text else None,
+        )
+
+
+def _split(items: List, parts: int) -> List[List]:
+    size = max(1, -(-len(items) // max(1, parts)))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+async def _send_batch(pool: SmtpPool, messages: List[MIMEMultipart], stats: CampaignStats) -> None:
+    """
+    Pipeline the batch; when it stops part-way, count what was delivered, give
+    the failing message one retry on a fresh send and continue after it, so no
+    recipient gets the campaign twice.
+    """
+    remaining = messages
+    while remaining:
+        try:
+            await pool.send_many(remaining)
+            stats.sent += len(remaining)
+            return
+        except SmtpBatchError as exc:
+            stats.sent += exc.sent
+            failed = remaining[exc.failed_index]
+            remaining = remaining[exc.failed_index + 1 :]
+            logger.warning("Batch stopped at %s (%s); %s left", failed["To"], exc.cause, len(remaining))
+        try:
+            await pool.send(failed)
+            stats.sent += 1
+        except Exception as exc:
+            stats.failed += 1
+            logger.error("Could not send to %s: %s", failed["To"], exc)
+
+
+async def send_campaign(
+    prisma: Prisma,
+    template: CampaignTemplate,
+    role: str = "CUSTOMER",
+    verified_only: bool = True,
+    chunk_size: int = 1000,
+    connections: int = 4,
+    rate: float = 300,
+    checkpoint: Optional[Checkpoint] = None,
+    restart: bool = False,
+    dry_run: bool = False,
+) -> CampaignStats:
+    settings = get_settings()
+    checkpoint = checkpoint or Checkpoint(None)
+    start_id = 0 if restart else int(checkpoint.get("last_id", 0))
+    stats = CampaignStats()
+    throttle = Throttle(rate)
+    pool = None
+    if not dry_run:
+        if not settings.smtp_host:
+            raise RuntimeError("SMTP_HOST is not configured; use --dry-run")
+        pool = SmtpPool(
+            host=settings.smtp_host,
+            port=settings.smtp_port,
+            user=settings.smtp_user,
+            password=settings.smtp_password,
+            use_tls=settings.smtp_use_tls,
+            size=connections,
+            timeout=settings.smtp_timeout_seconds,
+        )
+    sql = _RECIPIENTS_SQL.format(verified=" AND `emailVerified` = true" if verified_only else "")
+
+    async def fetch(after_id: int, limit: int) -> List[Dict]:
+        return await prisma.query_raw(sql, after_id, role, limit)
+
+    async def handle(rows: List[Dict]) -> None:
+        messages = [template.render(settings.smtp_from_email, row) for row in rows]
+        stats.recipients += len(messages)
+        if dry_run:
+            return
+        # one sub-batch per connection, each pipelined over its own session
+        async def send_part(part: List[MIMEMultipart]) -> None:
+            await throttle.take(len(part))
+            await _send_batch(pool, part, stats)
+
+        await asyncio.gather(*(send_part(part) for part in _split(messages, connections)))
+        logger.info("Sent through id %s (%s sent, %s failed)", rows[-1]["id"], stats.sent, stats.failed)
+
+    try:
+        # chunks run one at a time; parallelism comes from the SMTP sessions
+        await run_chunked(
+            keyset_chunks(fetch, start_id, chunk_size, key=lambda row: int(row["id"])),
+            handle,
+            concurrency=1,
+            checkpoint=checkpoint if not dry_run else Checkpoint(None),
+            start_id=start_id,
+            key=lambda row: int(row["id"]),
+        )
+    finally:
+        if pool:
+            pool.close()
+    return stats
+
+
+def _read(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Send a templated email campaign to users")
+    parser.add_argument("--subject", required=True, help="subject template, e.g. '$name، حراج شروع شد'")
+    parser.add_argument("--html-template", required=True, help="path to the HTML body template")
+    parser.add_argument("--text-template", help="path to the plain-text body template")
+    parser.add_argument("--role", default="CUSTOMER")
+    parser.add_argument("--include-unverified", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=4, help="persistent SMTP sessions")
+    parser.add_argument("--rate", type=float, default=300, help="max messages per second (0 = unthrottled)")
+    parser.add_argument("--checkpoint", help="JSON file used to resume an interrupted run")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first user")
+    parser.add_argument("--dry-run", action="store_true", help="render every message without sending")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    configure_logging(args.verbose)
+    template = CampaignTemplate(args.subject, _read(args.html_template), _read(args.text_template))
+    started = time.perf_counter()
+    await default_prisma.connect()
+    try:
+        stats = await send_campaign(
+            default_prisma,
+            template,
+            role=args.role,
+            verified_only=not args.include_unverified,
+            chunk_size=args.chunk_size,
+            connections=args.connections,
+            rate=args.rate,
+            checkpoint=Checkpoint(args.checkpoint),
+            restart=args.restart,
+            dry_run=args.dry_run,
+        )
+    finally:
+        await default_prisma.disconnect()
+    logger.info(
+        "%s recipients, %s sent, %s failed in %.1fs%s",
+        stats.recipients,
+        stats.sent,
+        stats.failed,
+        time.perf_counter() - started,
+        " (dry run)" if args.dry_run else "",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,19 +1,61 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .core.auth_epochs import get_auth_epoch_table
 from .core.config import get_settings
-from .db import prisma
+from .core.hashing import get_password_hasher
+from .core.http import create_http_client
+from .core.metrics import MetricsMiddleware, get_loop_lag_monitor
+from .core.query_trace import QueryTraceMiddleware
+from .core.smtp import get_smtp_pool
+from .db import prisma, warm_up
 from .api.v1.endpoints import payments
-from .routers import auth, products, orders, seller, admin
+from .services.email_outbox import get_email_dispatcher
+from .services.payment_log import get_payment_event_writer
+from .services.token_store import run_refresh_token_sweeper
+from .services.zarinpal_client import build_zarinpal_client
+from .routers import auth, products, orders, seller, admin, referrals, metrics
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await prisma.connect()
+    await warm_up(prisma, min(get_settings().db_warmup_connections, get_settings().db_pool_size))
+    app.state.http_client = create_http_client()
+    app.state.zarinpal = build_zarinpal_client(app.state.http_client)
+    epoch_refresher = None
+    if get_settings().stateless_access_tokens:
+        epoch_refresher = asyncio.create_task(
+            get_auth_epoch_table().run(prisma, get_settings().auth_epoch_refresh_seconds)
+        )
+    token_sweeper = asyncio.create_task(run_refresh_token_sweeper(prisma))
+    email_dispatcher = asyncio.create_task(get_email_dispatcher().run(prisma))
+    payment_log_writer = asyncio.create_task(get_payment_event_writer().run(prisma))
+    loop_lag_monitor = None
+    if get_settings().metrics_enabled:
+        loop_lag_monitor = asyncio.create_task(get_loop_lag_monitor().run())
     yield
+    background = [
+        task
+        for task in (epoch_refresher, token_sweeper, email_dispatcher, payment_log_writer, loop_lag_monitor)
+        if task
+    ]
+    for task in background:
+        task.cancel()
+    for task in background:
+        with suppress(asyncio.CancelledError):
+            await task
+    with suppress(Exception):
+        await get_payment_event_writer().flush(prisma)
     await prisma.disconnect()
+    await app.state.http_client.aclose()
+    get_password_hasher().shutdown()
+    smtp_pool = get_smtp_pool()
+    if smtp_pool:
+        smtp_pool.close()
 
 
 settings = get_settings()
@@ -33,9 +75,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.query_trace_enabled:
+    app.add_middleware(QueryTraceMiddleware)
+
+if settings.metrics_enabled:
+    # Added last so it is the outermost user middleware and times CORS as well.
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(products.router, prefix="/api/products", tags=["products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
 app.include_router(seller.router, prefix="/api/seller", tags=["seller"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(referrals.router, prefix="/api/referrals", tags=["referrals"])
 app.include_router(payments.router, prefix="/api")
+if settings.metrics_enabled:
+    app.include_router(metrics.router, tags=["metrics"])
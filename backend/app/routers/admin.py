@@ -1,14 +1,28 @@
 from datetime import datetime
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from prisma import Prisma
 
+from ..api.v1.endpoints.payments import get_callback_flight
 from ..core.deps import get_db, require_roles
+from ..core.hashing import get_password_hasher
+from ..core.auth_epochs import bump_auth_epoch, get_auth_epoch_table
+from ..core.principal import get_principal_cache
+from ..core.token_cache import get_token_cache
 from ..schemas.category import CategoryCreate, CategoryOut
-from ..schemas.commission import CommissionOut
+from ..schemas.commission import CommissionBalanceOut, CommissionOut, CommissionPage, commission_out
 from ..schemas.order import AdminOrderOut, OrderItemOut
+from ..schemas.payment import PaymentTransactionOut, PaymentTransactionPage
+from ..schemas.payout import PayoutLineOut, PayoutRunOut, PayoutRunRequest, SellerPayoutOut, payout_out
+from ..schemas.referral import ReferralLeaderboardEntry
 from ..schemas.user import UserOut, UserRoleUpdate
+from ..services.email_outbox import get_email_dispatcher, outbox_depth
+from ..services.ledger_service import get_balance, list_commission_page, total_paid_commissions
+from ..services.payment_log import get_payment_event_writer, list_order_transactions, list_transactions_page
+from ..services.payout_service import list_payouts, mark_payout_paid, run_seller_payouts
+from ..services.referral_analytics_service import leaderboard
 
 
 def _iso(dt):
@@ -40,6 +54,7 @@ async def change_user_role(user_id: int, payload: UserRoleUpdate, db: Prisma = D
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="کاربر یافت نشد")
     updated = await db.user.update(where={"id": user_id}, data={"role": payload.role})
+    await bump_auth_epoch(db, user_id)
     return UserOut(
         id=updated.id,
         name=updated.name,
@@ -51,6 +66,35 @@ async def change_user_role(user_id: int, payload: UserRoleUpdate, db: Prisma = D
     )
 
 
+async def _set_banned(db: Prisma, user_id: int, banned: bool) -> UserOut:
+    user = await db.user.find_unique(where={"id": user_id})
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="کاربر یافت نشد")
+    updated = await db.user.update(where={"id": user_id}, data={"isBanned": banned})
+    await bump_auth_epoch(db, user_id)
+    return UserOut(
+        id=updated.id,
+        name=updated.name,
+        email=updated.email,
+        phone=updated.phone,
+        role=updated.role,
+        referralCode=updated.referralCode,
+        referredById=updated.referredById,
+    )
+
+
+@router.put("/users/{user_id}/ban", response_model=UserOut, summary="مسدود کردن کاربر")
+async def ban_user(user_id: int, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    if user_id == admin.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="امکان مسدود کردن حساب خودتان وجود ندارد")
+    return await _set_banned(db, user_id, True)
+
+
+@router.put("/users/{user_id}/unban", response_model=UserOut, summary="رفع مسدودیت کاربر")
+async def unban_user(user_id: int, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    return await _set_banned(db, user_id, False)
+
+
 @router.post("/categories", response_model=CategoryOut, summary="ایجاد دسته‌بندی")
 async def create_category(payload: CategoryCreate, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
     category = await db.category.create(data={"name": payload.name, "slug": payload.slug})
@@ -88,18 +132,7 @@ async def list_orders(db: Prisma = Depends(get_db), admin=Depends(require_roles(
 @router.get("/commissions", response_model=list[CommissionOut], summary="گزارش کمیسیون‌ها")
 async def list_commissions(db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
     commissions = await db.commission.find_many(order={"createdAt": "desc"})
-    return [
-        CommissionOut(
-            id=c.id,
-            orderId=c.orderId,
-            fromUserId=c.fromUserId,
-            toUserId=c.toUserId,
-            level=c.level,
-            amount=c.amount,
-            status=c.status,
-        )
-        for c in commissions
-    ]
+    return [commission_out(c) for c in commissions]
 
 
 @router.get("/stats", summary="آمار مدیریتی")
@@ -107,6 +140,166 @@ async def admin_stats(db: Prisma = Depends(get_db), admin=Depends(require_roles(
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     users_count = await db.user.count()
     orders_today = await db.order.count(where={"createdAt": {"gte": today}})
-    paid_commissions = await db.commission.find_many(where={"status": "PAID"})
-    paid_total = sum(c.amount for c in paid_commissions)
+    paid_total = await total_paid_commissions(db)
     return {"users": users_count, "ordersToday": orders_today, "paidCommission": round(paid_total, 2)}
+
+
+@router.get("/commissions/page", response_model=CommissionPage, summary="گزارش کمیسیون‌ها (صفحه‌بندی)")
+async def list_commissions_page(
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    user_id: Optional[int] = Query(None, alias="userId"),
+    commission_status: Optional[str] = Query(None, alias="status"),
+    db: Prisma = Depends(get_db),
+    admin=Depends(require_roles(["ADMIN"])),
+):
+    items, next_cursor = await list_commission_page(
+        db, user_id=user_id, status=commission_status, cursor=cursor, limit=limit
+    )
+    return CommissionPage(
+        items=[commission_out(c) for c in items],
+        nextCursor=next_cursor,
+    )
+
+
+@router.get("/users/{user_id}/earnings", response_model=CommissionBalanceOut, summary="درآمد کمیسیون کاربر")
+async def user_earnings(user_id: int, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    balance = await get_balance(db, user_id=user_id)
+    if not balance:
+        return CommissionBalanceOut(userId=user_id)
+    return CommissionBalanceOut(
+        userId=balance.userId,
+        pendingAmount=balance.pendingAmount,
+        paidAmount=balance.paidAmount,
+        lifetimeAmount=balance.lifetimeAmount,
+        commissionCount=balance.commissionCount,
+    )
+
+
+@router.get("/referrals/leaderboard", response_model=list[ReferralLeaderboardEntry], summary="برترین معرف‌ها")
+async def referral_leaderboard(
+    metric: Literal["count", "gmv"] = Query("count"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Prisma = Depends(get_db),
+    admin=Depends(require_roles(["ADMIN"])),
+):
+    rows = await leaderboard(db, metric=metric, limit=limit)
+    return [
+        ReferralLeaderboardEntry(
+            userId=r.userId,
+            name=r.user.name if r.user else "",
+            referralCode=r.user.referralCode if r.user else "",
+            downlineCount=r.downlineCount,
+            downlineGmv=r.downlineGmv,
+        )
+        for r in rows
+    ]
+
+
+@router.post("/payouts/run", response_model=PayoutRunOut, summary="محاسبه تسویه فروشندگان")
+async def run_payouts(payload: PayoutRunRequest, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    lines = await run_seller_payouts(db, payload.periodStart, payload.periodEnd, dry_run=payload.dryRun)
+    return PayoutRunOut(
+        periodStart=_iso(payload.periodStart),
+        periodEnd=_iso(payload.periodEnd),
+        dryRun=payload.dryRun,
+        sellers=len(lines),
+        totalNet=round(sum(max(line.net, 0) for line in lines), 2),
+        lines=[
+            PayoutLineOut(
+                sellerId=line.seller_id,
+                grossAmount=line.gross,
+                commissionAmount=line.commission,
+                alreadyPaid=line.already_paid,
+                netAmount=line.net,
+            )
+            for line in lines
+        ],
+    )
+
+
+@router.get("/payouts", response_model=list[SellerPayoutOut], summary="لیست تسویه‌ها")
+async def admin_list_payouts(
+    seller_id: Optional[int] = Query(None, alias="sellerId"),
+    period_start: Optional[datetime] = Query(None, alias="periodStart"),
+    period_end: Optional[datetime] = Query(None, alias="periodEnd"),
+    payout_status: Optional[str] = Query(None, alias="status"),
+    db: Prisma = Depends(get_db),
+    admin=Depends(require_roles(["ADMIN"])),
+):
+    payouts = await list_payouts(
+        db, seller_id=seller_id, period_start=period_start, period_end=period_end, payout_status=payout_status
+    )
+    return [payout_out(p) for p in payouts]
+
+
+@router.post("/payouts/{payout_id}/paid", response_model=SellerPayoutOut, summary="ثبت پرداخت تسویه")
+async def admin_mark_payout_paid(payout_id: int, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    payout = await mark_payout_paid(db, payout_id=payout_id)
+    return payout_out(payout)
+
+
+@router.get("/system/password-hasher", summary="وضعیت صف رمزنگاری")
+async def password_hasher_metrics(admin=Depends(require_roles(["ADMIN"]))):
+    return get_password_hasher().metrics()
+
+
+@router.get("/system/principal-cache", summary="وضعیت کش احراز هویت")
+async def principal_cache_metrics(admin=Depends(require_roles(["ADMIN"]))):
+    return {
+        **get_principal_cache().metrics(),
+        "authEpochs": get_auth_epoch_table().metrics(),
+        "tokenCache": get_token_cache().metrics(),
+    }
+
+
+@router.get("/system/email-outbox", summary="وضعیت صف ایمیل")
+async def email_outbox_metrics(db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    return {**get_email_dispatcher().metrics(), "queue": await outbox_depth(db)}
+
+
+@router.get("/system/payment-gateway", summary="وضعیت اتصال درگاه پرداخت")
+async def payment_gateway_metrics(request: Request, admin=Depends(require_roles(["ADMIN"]))):
+    client = getattr(request.app.state, "zarinpal", None)
+    return {
+        "configured": client is not None,
+        "breaker": client.breaker.metrics() if client else None,
+        "callbacks": get_callback_flight().metrics(),
+        "transactionLog": get_payment_event_writer().metrics(),
+    }
+
+
+def _transaction_out(t) -> PaymentTransactionOut:
+    return PaymentTransactionOut(
+        id=t.id,
+        orderId=t.orderId,
+        event=t.event,
+        status=t.status,
+        gateway=t.gateway,
+        authority=t.authority,
+        code=t.code,
+        refId=t.refId,
+        amount=t.amount,
+        gatewayResponse=t.gatewayResponse,
+        createdAt=t.createdAt,
+    )
+
+
+@router.get("/orders/{order_id}/transactions", response_model=list[PaymentTransactionOut], summary="تاریخچه تراکنش‌های سفارش")
+async def order_transactions(order_id: int, db: Prisma = Depends(get_db), admin=Depends(require_roles(["ADMIN"]))):
+    return [_transaction_out(t) for t in await list_order_transactions(db, order_id)]
+
+
+@router.get("/payment-transactions", response_model=PaymentTransactionPage, summary="گزارش تراکنش‌های پرداخت")
+async def payment_transactions(
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    transaction_status: Optional[str] = Query(None, alias="status"),
+    event: Optional[str] = Query(None),
+    db: Prisma = Depends(get_db),
+    admin=Depends(require_roles(["ADMIN"])),
+):
+    items, next_cursor = await list_transactions_page(
+        db, status=transaction_status, event=event, cursor=cursor, limit=limit
+    )
+    return PaymentTransactionPage(items=[_transaction_out(t) for t in items], nextCursor=next_cursor)
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends
 from fastapi import HTTPException, status
 
 from prisma import Prisma
-from prisma.models import User
 
+from ..core.config import get_settings
 from ..core.deps import get_db, get_current_user
+from ..core.rate_limit import body_field, rate_limit, token_subject
+from ..core.principal import Principal
 from ..schemas.auth import (
     Token,
     RefreshTokenRequest,
@@ -23,12 +25,19 @@ from ..services.auth_service import (
     reset_password,
     refresh_access_token,
     logout,
+    logout_everywhere,
 )
 
 router = APIRouter()
+settings = get_settings()
 
 
-@router.post("/register", response_model=UserOut, summary="ثبت‌نام کاربر جدید")
+@router.post(
+    "/register",
+    response_model=UserOut,
+    summary="ثبت‌نام کاربر جدید",
+    dependencies=[Depends(rate_limit("register:ip", settings.rate_limit_register_per_ip))],
+)
 async def register(payload: UserCreate, db: Prisma = Depends(get_db)):
     user = await register_user(
         prisma=db,
@@ -50,13 +59,26 @@ async def register(payload: UserCreate, db: Prisma = Depends(get_db)):
     )
 
 
-@router.post("/login", response_model=Token, summary="ورود")
+@router.post(
+    "/login",
+    response_model=Token,
+    summary="ورود",
+    dependencies=[
+        Depends(rate_limit("login:ip", settings.rate_limit_login_per_ip)),
+        Depends(rate_limit("login:email", settings.rate_limit_login_per_email, body_field("email"))),
+    ],
+)
 async def login(payload: UserLogin, db: Prisma = Depends(get_db)):
     access_token, refresh_token = await login_user(db, email=payload.email, password=payload.password)
     return Token(access_token=access_token, refresh_token=refresh_token)
 
 
-@router.post("/refresh", response_model=Token, summary="تازه‌سازی توکن")
+@router.post(
+    "/refresh",
+    response_model=Token,
+    summary="تازه‌سازی توکن",
+    dependencies=[Depends(rate_limit("refresh:user", settings.rate_limit_refresh_per_user, token_subject("refresh_token")))],
+)
 async def refresh(payload: RefreshTokenRequest, db: Prisma = Depends(get_db)):
     access_token, refresh_token = await refresh_access_token(db, payload.refresh_token)
     return Token(access_token=access_token, refresh_token=refresh_token)
@@ -68,19 +90,39 @@ async def logout_user(payload: RefreshTokenRequest, db: Prisma = Depends(get_db)
     return {"message": "با موفقیت خارج شدید"}
 
 
+@router.post("/logout-all", summary="خروج از همه دستگاه‌ها")
+async def logout_all(db: Prisma = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    await logout_everywhere(db, current_user.id)
+    return {"message": "از همه دستگاه‌ها خارج شدید"}
+
+
 @router.post("/verify-email", summary="تایید ایمیل")
 async def verify_user_email(payload: EmailVerificationRequest, db: Prisma = Depends(get_db)):
     await verify_email(db, payload.token)
     return {"message": "ایمیل با موفقیت تایید شد"}
 
 
-@router.post("/resend-verification", summary="ارسال مجدد ایمیل تایید")
+@router.post(
+    "/resend-verification",
+    summary="ارسال مجدد ایمیل تایید",
+    dependencies=[
+        Depends(rate_limit("email:ip", settings.rate_limit_email_per_ip)),
+        Depends(rate_limit("email:address", settings.rate_limit_email_per_address, body_field("email"))),
+    ],
+)
 async def resend_verification(payload: ResendVerificationRequest, db: Prisma = Depends(get_db)):
     await resend_verification_email(db, payload.email)
     return {"message": "ایمیل تایید مجددا ارسال شد"}
 
 
-@router.post("/forgot-password", summary="درخواست بازیابی رمز عبور")
+@router.post(
+    "/forgot-password",
+    summary="درخواست بازیابی رمز عبور",
+    dependencies=[
+        Depends(rate_limit("email:ip", settings.rate_limit_email_per_ip)),
+        Depends(rate_limit("email:address", settings.rate_limit_email_per_address, body_field("email"))),
+    ],
+)
 async def forgot_password(payload: PasswordResetRequest, db: Prisma = Depends(get_db)):
     await request_password_reset(db, payload.email)
     return {"message": "اگر ایمیل شما در سیستم ثبت شده باشد، لینک بازیابی رمز عبور ارسال شد"}
@@ -93,14 +135,17 @@ async def reset_user_password(payload: PasswordResetConfirm, db: Prisma = Depend
 
 
 @router.get("/me", response_model=UserOut, summary="نمایش اطلاعات کاربر")
-async def me(current_user: User = Depends(get_current_user)):
+async def me(db: Prisma = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    user = await db.user.find_unique(where={"id": current_user.id})
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="کاربر یافت نشد")
     return UserOut(
-        id=current_user.id,
-        name=current_user.name,
-        email=current_user.email,
-        phone=current_user.phone,
-        role=current_user.role,
-        referralCode=current_user.referralCode,
-        referredById=current_user.referredById,
-        emailVerified=getattr(current_user, "emailVerified", False),
+        id=user.id,
+        name=user.name,
+        email=user.email,
+        phone=user.phone,
+        role=user.role,
+        referralCode=user.referralCode,
+        referredById=user.referredById,
+        emailVerified=getattr(user, "emailVerified", False),
     )
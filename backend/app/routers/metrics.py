@@ -0,0 +1,44 @@
+import logging
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from prisma import Prisma
+
+from ..core.config import get_settings
+from ..core.deps import get_db
+from ..core.metrics import get_http_metrics, get_loop_lag_monitor
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter()
+
+
+def _require_scrape_token(request: Request) -> None:
+    token = get_settings().metrics_token
+    if not token:
+        return
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not secrets.compare_digest(supplied.encode(), token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="دسترسی به متریک‌ها مجاز نیست")
+
+
+async def _database_metrics(db: Prisma) -> str:
+    """Connection pool gauges and query histograms from the Prisma query engine."""
+    try:
+        return await db.get_metrics(format="prometheus")
+    except Exception:
+        logger.debug("Query engine metrics unavailable", exc_info=True)
+        return ""
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(_require_scrape_token)])
+async def metrics(db: Prisma = Depends(get_db)):
+    lines: list[str] = []
+    get_http_metrics().render(lines)
+    get_loop_lag_monitor().render(lines)
+    body = "\n".join(lines) + "\n" + await _database_metrics(db)
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
 
 from prisma import Prisma
-from prisma.models import User
 
 from ..core.deps import get_db, require_roles
-from ..schemas.commission import CommissionOut
+from ..core.principal import Principal
+from ..schemas.commission import CommissionBalanceOut, CommissionOut, CommissionPage, commission_out
 from ..schemas.order import OrderCreate, OrderItemOut, OrderOut
+from ..services.ledger_service import get_balance, list_commission_page
 from ..services.order_service import create_order, list_commissions_for_user, list_orders_for_customer, mark_order_paid
 
 
@@ -19,7 +22,7 @@ router = APIRouter()
 async def create_customer_order(
     payload: OrderCreate,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["CUSTOMER"])),
+    current_user: Principal = Depends(require_roles(["CUSTOMER"])),
 ):
     order, order_items = await create_order(db, customer_id=current_user.id, items=payload.items)
     return OrderOut(
@@ -45,7 +48,7 @@ async def create_customer_order(
 async def confirm_payment(
     order_id: int,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["CUSTOMER", "ADMIN"])),
+    current_user: Principal = Depends(require_roles(["CUSTOMER", "ADMIN"])),
 ):
     is_admin = current_user.role == "ADMIN"
     updated = await mark_order_paid(db, order_id=order_id, requested_by=current_user.id, is_admin=is_admin)
@@ -70,7 +73,7 @@ async def confirm_payment(
 
 
 @router.get("/my", response_model=list[OrderOut], summary="سفارش‌های من")
-async def my_orders(db: Prisma = Depends(get_db), current_user: User = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"]))):
+async def my_orders(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"]))):
     orders = await list_orders_for_customer(db, customer_id=current_user.id)
     response: list[OrderOut] = []
     for order in orders:
@@ -97,17 +100,35 @@ async def my_orders(db: Prisma = Depends(get_db), current_user: User = Depends(r
 
 
 @router.get("/my/commissions", response_model=list[CommissionOut], summary="کمیسیون‌های من")
-async def my_commissions(db: Prisma = Depends(get_db), current_user: User = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"]))):
+async def my_commissions(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"]))):
     commissions = await list_commissions_for_user(db, user_id=current_user.id)
-    return [
-        CommissionOut(
-            id=c.id,
-            orderId=c.orderId,
-            fromUserId=c.fromUserId,
-            toUserId=c.toUserId,
-            level=c.level,
-            amount=c.amount,
-            status=c.status,
-        )
-        for c in commissions
-    ]
+    return [commission_out(c) for c in commissions]
+
+
+@router.get("/my/commissions/page", response_model=CommissionPage, summary="کمیسیون‌های من (صفحه‌بندی)")
+async def my_commissions_page(
+    cursor: Optional[int] = Query(None, description="شناسه آخرین کمیسیون صفحه قبل"),
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[str] = Query(None),
+    db: Prisma = Depends(get_db),
+    current_user: Principal = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"])),
+):
+    items, next_cursor = await list_commission_page(db, user_id=current_user.id, status=status, cursor=cursor, limit=limit)
+    return CommissionPage(
+        items=[commission_out(c) for c in items],
+        nextCursor=next_cursor,
+    )
+
+
+@router.get("/my/earnings", response_model=CommissionBalanceOut, summary="درآمد من")
+async def my_earnings(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["CUSTOMER", "SELLER", "ADMIN"]))):
+    balance = await get_balance(db, user_id=current_user.id)
+    if not balance:
+        return CommissionBalanceOut(userId=current_user.id)
+    return CommissionBalanceOut(
+        userId=balance.userId,
+        pendingAmount=balance.pendingAmount,
+        paidAmount=balance.paidAmount,
+        lifetimeAmount=balance.lifetimeAmount,
+        commissionCount=balance.commissionCount,
+    )
@@ -0,0 +1,46 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from prisma import Prisma
+
+from ..core.deps import get_db, get_current_user
+from ..core.principal import Principal
+from ..schemas.referral import ReferralMemberOut, ReferralMemberPage, ReferralNetworkOut
+from ..services.referral_analytics_service import get_network_stats, list_direct_referrals
+
+
+def _iso(dt):
+    return dt.isoformat() if dt else ""
+
+router = APIRouter()
+
+
+@router.get("/me", response_model=ReferralNetworkOut, summary="آمار شبکه ارجاع من")
+async def my_network(db: Prisma = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    stats = await get_network_stats(db, user_id=current_user.id)
+    if not stats:
+        return ReferralNetworkOut(userId=current_user.id)
+    return ReferralNetworkOut(
+        userId=stats.userId,
+        level1Count=stats.level1Count,
+        level2Count=stats.level2Count,
+        downlineCount=stats.downlineCount,
+        level1Gmv=stats.level1Gmv,
+        level2Gmv=stats.level2Gmv,
+        downlineGmv=stats.downlineGmv,
+    )
+
+
+@router.get("/me/members", response_model=ReferralMemberPage, summary="زیرمجموعه‌های مستقیم من")
+async def my_direct_referrals(
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    db: Prisma = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    members, next_cursor = await list_direct_referrals(db, user_id=current_user.id, cursor=cursor, limit=limit)
+    return ReferralMemberPage(
+        items=[ReferralMemberOut(id=m.id, name=m.name, createdAt=_iso(m.createdAt)) for m in members],
+        nextCursor=next_cursor,
+    )
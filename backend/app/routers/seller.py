@@ -1,14 +1,19 @@
 import json
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
 
 from prisma import Prisma
-from prisma.models import User
 
 from ..core.deps import get_db, require_roles
-from ..schemas.commission import CommissionOut
+from ..core.principal import Principal
+from ..schemas.commission import CommissionBalanceOut, CommissionOut, CommissionPage, commission_out
 from ..schemas.order import SellerOrderOut, SellerStats
+from ..schemas.payout import SellerPayoutOut, payout_out
 from ..schemas.product import ProductCreate, ProductOut, ProductUpdate
+from ..services.ledger_service import get_balance, list_commission_page
 from ..services.order_service import list_orders_for_seller, seller_stats
+from ..services.payout_service import list_payouts
 from ..services.product_service import create_product, delete_product, update_product
 
 router = APIRouter()
@@ -31,7 +36,7 @@ def _decode_list(value):
 @router.get("/products", response_model=list[ProductOut], summary="محصولات من")
 async def list_seller_products(
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["SELLER"])),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
 ):
     products = await db.product.find_many(where={"sellerId": current_user.id}, include={"category": True}, order={"createdAt": "desc"})
     return [
@@ -58,7 +63,7 @@ async def list_seller_products(
 async def create_seller_product(
     payload: ProductCreate,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["SELLER"])),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
 ):
     product = await create_product(db, seller_id=current_user.id, data=payload)
     data = product.dict()
@@ -73,7 +78,7 @@ async def update_seller_product(
     product_id: int,
     payload: ProductUpdate,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["SELLER"])),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
 ):
     product = await update_product(db, product_id=product_id, seller_id=current_user.id, data=payload)
     data = product.dict()
@@ -87,14 +92,14 @@ async def update_seller_product(
 async def delete_seller_product(
     product_id: int,
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["SELLER"])),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
 ):
     await delete_product(db, product_id=product_id, seller_id=current_user.id)
     return {"ok": True}
 
 
 @router.get("/orders", response_model=list[SellerOrderOut], summary="سفارش‌های محصولات من")
-async def seller_orders(db: Prisma = Depends(get_db), current_user: User = Depends(require_roles(["SELLER"]))):
+async def seller_orders(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["SELLER"]))):
     grouped = await list_orders_for_seller(db, seller_id=current_user.id)
     response: list[SellerOrderOut] = []
     for order_id, payload in grouped.items():
@@ -123,7 +128,7 @@ async def seller_orders(db: Prisma = Depends(get_db), current_user: User = Depen
 
 
 @router.get("/stats", response_model=SellerStats, summary="آمار فروشنده")
-async def seller_dashboard_stats(db: Prisma = Depends(get_db), current_user: User = Depends(require_roles(["SELLER"]))):
+async def seller_dashboard_stats(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["SELLER"]))):
     stats = await seller_stats(db, seller_id=current_user.id)
     return SellerStats(**stats)
 
@@ -131,18 +136,42 @@ async def seller_dashboard_stats(db: Prisma = Depends(get_db), current_user: Use
 @router.get("/commissions", response_model=list[CommissionOut], summary="کمیسیون‌های دریافتی فروشنده")
 async def list_commissions(
     db: Prisma = Depends(get_db),
-    current_user: User = Depends(require_roles(["SELLER"])),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
 ):
     commissions = await db.commission.find_many(where={"toUserId": current_user.id}, order={"createdAt": "desc"})
-    return [
-        CommissionOut(
-            id=c.id,
-            orderId=c.orderId,
-            fromUserId=c.fromUserId,
-            toUserId=c.toUserId,
-            level=c.level,
-            amount=c.amount,
-            status=c.status,
-        )
-        for c in commissions
-    ]
+    return [commission_out(c) for c in commissions]
+
+
+@router.get("/commissions/page", response_model=CommissionPage, summary="کمیسیون‌های دریافتی فروشنده (صفحه‌بندی)")
+async def list_commissions_page(
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[str] = Query(None),
+    db: Prisma = Depends(get_db),
+    current_user: Principal = Depends(require_roles(["SELLER"])),
+):
+    items, next_cursor = await list_commission_page(db, user_id=current_user.id, status=status, cursor=cursor, limit=limit)
+    return CommissionPage(
+        items=[commission_out(c) for c in items],
+        nextCursor=next_cursor,
+    )
+
+
+@router.get("/earnings", response_model=CommissionBalanceOut, summary="درآمد کمیسیون فروشنده")
+async def seller_earnings(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["SELLER"]))):
+    balance = await get_balance(db, user_id=current_user.id)
+    if not balance:
+        return CommissionBalanceOut(userId=current_user.id)
+    return CommissionBalanceOut(
+        userId=balance.userId,
+        pendingAmount=balance.pendingAmount,
+        paidAmount=balance.paidAmount,
+        lifetimeAmount=balance.lifetimeAmount,
+        commissionCount=balance.commissionCount,
+    )
+
+
+@router.get("/payouts", response_model=list[SellerPayoutOut], summary="تسویه‌های من")
+async def seller_payouts(db: Prisma = Depends(get_db), current_user: Principal = Depends(require_roles(["SELLER"]))):
+    payouts = await list_payouts(db, seller_id=current_user.id)
+    return [payout_out(p) for p in payouts]
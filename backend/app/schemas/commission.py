@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel
 
 
@@ -12,3 +14,29 @@ class CommissionOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+def commission_out(commission) -> CommissionOut:
+    """Commission row -> API shape (shared by the customer, seller and admin routers)."""
+    return CommissionOut(
+        id=commission.id,
+        orderId=commission.orderId,
+        fromUserId=commission.fromUserId,
+        toUserId=commission.toUserId,
+        level=commission.level,
+        amount=commission.amount,
+        status=commission.status,
+    )
+
+
+class CommissionPage(BaseModel):
+    items: List[CommissionOut]
+    nextCursor: Optional[int] = None
+
+
+class CommissionBalanceOut(BaseModel):
+    userId: int
+    pendingAmount: float = 0
+    paidAmount: float = 0
+    lifetimeAmount: float = 0
+    commissionCount: int = 0
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel
 
@@ -26,3 +27,22 @@ class PaymentVerifyResponse(BaseModel):
     card_pan: Optional[str] = None
     fee_type: Optional[str] = None
     fee: Optional[int] = None
+
+
+class PaymentTransactionOut(BaseModel):
+    id: int
+    orderId: int
+    event: str
+    status: str
+    gateway: str
+    authority: Optional[str] = None
+    code: Optional[int] = None
+    refId: Optional[int] = None
+    amount: float
+    gatewayResponse: Optional[str] = None
+    createdAt: datetime
+
+
+class PaymentTransactionPage(BaseModel):
+    items: List[PaymentTransactionOut]
+    nextCursor: Optional[int] = None
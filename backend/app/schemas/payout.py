@@ -0,0 +1,60 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class PayoutRunRequest(BaseModel):
+    periodStart: datetime
+    periodEnd: datetime
+    dryRun: bool = False
+
+
+class PayoutLineOut(BaseModel):
+    sellerId: int
+    grossAmount: float
+    commissionAmount: float
+    alreadyPaid: float
+    netAmount: float
+
+
+class PayoutRunOut(BaseModel):
+    periodStart: str
+    periodEnd: str
+    dryRun: bool
+    sellers: int
+    totalNet: float
+    lines: List[PayoutLineOut]
+
+
+class SellerPayoutOut(BaseModel):
+    id: int
+    sellerId: int
+    amount: float
+    status: str
+    grossAmount: float
+    commissionAmount: float
+    periodStart: Optional[str] = None
+    periodEnd: Optional[str] = None
+    createdAt: str
+    processedAt: Optional[str] = None
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def payout_out(payout) -> SellerPayoutOut:
+    """SellerPayout row -> API shape (shared by the seller and admin routers)."""
+    return SellerPayoutOut(
+        id=payout.id,
+        sellerId=payout.sellerId,
+        amount=payout.amount,
+        status=payout.status,
+        grossAmount=payout.grossAmount,
+        commissionAmount=payout.commissionAmount,
+        periodStart=_iso(payout.periodStart),
+        periodEnd=_iso(payout.periodEnd),
+        createdAt=_iso(payout.createdAt) or "",
+        processedAt=_iso(payout.processedAt),
+    )
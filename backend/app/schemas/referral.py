@@ -0,0 +1,32 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class ReferralNetworkOut(BaseModel):
+    userId: int
+    level1Count: int = 0
+    level2Count: int = 0
+    downlineCount: int = 0
+    level1Gmv: float = 0
+    level2Gmv: float = 0
+    downlineGmv: float = 0
+
+
+class ReferralMemberOut(BaseModel):
+    id: int
+    name: str
+    createdAt: str
+
+
+class ReferralMemberPage(BaseModel):
+    items: List[ReferralMemberOut]
+    nextCursor: Optional[int] = None
+
+
+class ReferralLeaderboardEntry(BaseModel):
+    userId: int
+    name: str
+    referralCode: str
+    downlineCount: int
+    downlineGmv: float
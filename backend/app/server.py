@@ -0,0 +1,37 @@
+"""
+Production entrypoint.
+
+    python -m app.server
+
+Runs uvicorn with WEB_WORKERS processes (0 = one per core). Each worker
+imports the app and connects its own Prisma engine in the lifespan, with a
+pool of DB_CONNECTION_LIMIT connections (by default 2 * cores + 1 split
+across the workers; the split is passed down as DB_POOL_PROCESSES, so jobs
+and scripts keep the whole default). On SIGTERM the workers stop accepting
+connections and give in-flight requests WEB_GRACEFUL_SHUTDOWN_SECONDS to
+finish before the lifespan shutdown flushes background writers and
+disconnects.
+"""
+import os
+
+import uvicorn
+
+from .core.config import get_settings
+
+
+def main() -> None:
+    settings = get_settings()
+    # Inherited by the worker processes (and read again in this one if it serves).
+    os.environ.setdefault("DB_POOL_PROCESSES", str(settings.web_worker_count))
+    get_settings.cache_clear()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.web_host,
+        port=settings.web_port,
+        workers=settings.web_worker_count,
+        timeout_graceful_shutdown=settings.web_graceful_shutdown_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
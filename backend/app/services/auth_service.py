@@ -1,5 +1,4 @@
-import random
-import string
+import asyncio
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 
@@ -7,81 +6,99 @@ from prisma import Prisma
 from prisma.errors import UniqueViolationError
 from prisma.models import User
 
+from ..core.auth_epochs import bump_auth_epoch
+from ..core.principal import invalidate_principal
 from ..core.security import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     create_refresh_token,
     validate_password_strength,
     generate_verification_token,
     generate_reset_token,
     decode_token,
+    principal_claims,
 )
+from .email_outbox import wake_email_dispatcher
 from .email_service import send_verification_email, send_password_reset_email
+from .referral_analytics_service import record_signup
+from .referral_codes import next_referral_code
+from .token_store import (
+    find_live_refresh_token,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens,
+    rotate_refresh_token,
+    store_refresh_token,
+)
 
 
-def _generate_referral_code(length: int = 8) -> str:
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
+def _duplicate_detail(exc: UniqueViolationError) -> str:
+    # MySQL reports the violated index, e.g. "User_email_key"
+    message = str(exc)
+    if "phone" in message:
+        return "شماره موبایل قبلا ثبت شده است"
+    if "email" in message:
+        return "ایمیل قبلا ثبت شده است"
+    return "ایمیل یا شماره موبایل تکراری است"
 
 
-async def generate_unique_referral(prisma: Prisma) -> str:
-    for _ in range(5):
-        code = _generate_referral_code()
-        exists = await prisma.user.find_unique(where={"referralCode": code})
-        if not exists:
-            return code
-    raise HTTPException(status_code=500, detail="خطا در ایجاد کد دعوت")
+async def _find_referrer(prisma: Prisma, referral_code: str | None) -> User | None:
+    if not referral_code:
+        return None
+    return await prisma.user.find_unique(where={"referralCode": referral_code})
 
 
-async def register_user(prisma: Prisma, name: str, email: str, password: str, phone: str | None, referral_code: str | None) -> User:
+async def register_user(
+    prisma: Prisma,
+    name: str,
+    email: str,
+    password: str,
+    phone: str | None,
+    referral_code: str | None,
+) -> User:
     # Validate password strength
     is_valid, error_msg = validate_password_strength(password)
     if not is_valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
-    
-    existing = await prisma.user.find_unique(where={"email": email})
-    if existing:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ایمیل قبلا ثبت شده است")
-    if phone:
-        existing_phone = await prisma.user.find_unique(where={"phone": phone})
-        if existing_phone:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="شماره موبایل قبلا ثبت شده است")
 
-    referred_by_id = None
-    if referral_code:
-        referrer = await prisma.user.find_first(where={"referralCode": referral_code})
-        if not referrer:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="کد دعوت نامعتبر است")
-        referred_by_id = referrer.id
+    # Email/phone uniqueness is left to the unique indexes on insert; the
+    # referrer lookup, code allocation and hashing run concurrently.
+    referrer, code, password_hash = await asyncio.gather(
+        _find_referrer(prisma, referral_code),
+        next_referral_code(prisma),
+        get_password_hash_async(password),
+    )
+    if referral_code and not referrer:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="کد دعوت نامعتبر است")
 
-    code = await generate_unique_referral(prisma)
-    password_hash = get_password_hash(password)
     verification_token = generate_verification_token()
     verification_expires = datetime.utcnow() + timedelta(hours=24)
 
     try:
-        user = await prisma.user.create(
-            data={
-                "name": name,
-                "email": email,
-                "phone": phone,
-                "passwordHash": password_hash,
-                "role": "CUSTOMER",
-                "referralCode": code,
-                "referredById": referred_by_id,
-                "emailVerified": False,
-                "emailVerificationToken": verification_token,
-                "emailVerificationExpires": verification_expires,
-            }
-        )
-        
-        # Send verification email
-        await send_verification_email(email, verification_token)
-        
-        return user
+        async with prisma.tx() as transaction:
+            user = await transaction.user.create(
+                data={
+                    "name": name,
+                    "email": email,
+                    "phone": phone,
+                    "passwordHash": password_hash,
+                    "role": "CUSTOMER",
+                    "referralCode": code,
+                    "referredById": referrer.id if referrer else None,
+                    "emailVerified": False,
+                    "emailVerificationToken": verification_token,
+                    "emailVerificationExpires": verification_expires,
+                }
+            )
+            if referrer:
+                await record_signup(transaction, referrer_id=referrer.id, referrer_parent_id=referrer.referredById)
+            # queued in the same commit; delivered by the outbox dispatcher after the response
+            await send_verification_email(transaction, email, verification_token, wake=False)
     except UniqueViolationError as exc:
-        # concurrent race on email/phone unique constraints
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ایمیل یا شماره موبایل تکراری است") from exc
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=_duplicate_detail(exc)) from exc
+    wake_email_dispatcher()
+
+    return user
 
 
 async def login_user(prisma: Prisma, email: str, password: str) -> tuple[str, str]:
@@ -89,7 +106,7 @@ async def login_user(prisma: Prisma, email: str, password: str) -> tuple[str, st
     Login user and return (access_token, refresh_token)
     """
     user = await prisma.user.find_unique(where={"email": email})
-    if not user or not verify_password(password, user.passwordHash):
+    if not user or not await verify_password_async(password, user.passwordHash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="ورود ناموفق")
     
     # Check if user is banned (using getattr for backward compatibility during migration)
@@ -101,17 +118,11 @@ async def login_user(prisma: Prisma, email: str, password: str) -> tuple[str, st
     # if not user.emailVerified:
     #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="لطفا ابتدا ایمیل خود را تایید کنید")
     
-    access_token = create_access_token(str(user.id))
+    access_token = create_access_token(str(user.id), claims=principal_claims(user))
     refresh_token = create_refresh_token(str(user.id))
     
-    # Store refresh token in database
-    await prisma.refreshtoken.create(
-        data={
-            "userId": user.id,
-            "token": refresh_token,
-            "expiresAt": datetime.utcnow() + timedelta(days=7),
-        }
-    )
+    # Store refresh token digest in database
+    await store_refresh_token(prisma, user.id, refresh_token)
     
     return access_token, refresh_token
 
@@ -136,6 +147,8 @@ async def verify_email(prisma: Prisma, token: str) -> bool:
             "emailVerificationExpires": None,
         }
     )
+    # emailVerified is part of the cached principal
+    invalidate_principal(user.id)
     
     return True
 
@@ -160,7 +173,7 @@ async def resend_verification_email(prisma: Prisma, email: str) -> bool:
         }
     )
     
-    await send_verification_email(email, verification_token)
+    await send_verification_email(prisma, email, verification_token)
     return True
 
 
@@ -182,7 +195,7 @@ async def request_password_reset(prisma: Prisma, email: str) -> bool:
         }
     )
     
-    await send_password_reset_email(email, reset_token)
+    await send_password_reset_email(prisma, email, reset_token)
     return True
 
 
@@ -203,7 +216,7 @@ async def reset_password(prisma: Prisma, token: str, new_password: str) -> bool:
     if not user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="لینک بازیابی نامعتبر یا منقضی شده است")
     
-    password_hash = get_password_hash(new_password)
+    password_hash = await get_password_hash_async(new_password)
     
     await prisma.user.update(
         where={"id": user.id},
@@ -213,6 +226,8 @@ async def reset_password(prisma: Prisma, token: str, new_password: str) -> bool:
             "passwordResetExpires": None,
         }
     )
+    # Password change logs the user out of every existing session
+    await bump_auth_epoch(prisma, user.id)
     
     return True
 
@@ -229,34 +244,33 @@ async def refresh_access_token(prisma: Prisma, refresh_token: str) -> tuple[str,
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن نامعتبر است")
     
     # Check if refresh token exists in database
-    token_record = await prisma.refreshtoken.find_first(
-        where={
-            "token": refresh_token,
-            "userId": int(user_id),
-            "expiresAt": {"gt": datetime.utcnow()},
-        }
-    )
+    token_record = await find_live_refresh_token(prisma, refresh_token, int(user_id))
     
     if not token_record:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن منقضی شده یا نامعتبر است")
     
+    user = await prisma.user.find_unique(where={"id": int(user_id)})
+    if not user or getattr(user, "isBanned", False):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="توکن منقضی شده یا نامعتبر است")
+
     # Generate new tokens
-    new_access_token = create_access_token(user_id)
+    new_access_token = create_access_token(user_id, claims=principal_claims(user))
     new_refresh_token = create_refresh_token(user_id)
     
     # Update refresh token in database
-    await prisma.refreshtoken.update(
-        where={"id": token_record.id},
-        data={
-            "token": new_refresh_token,
-            "expiresAt": datetime.utcnow() + timedelta(days=7),
-        }
-    )
+    await rotate_refresh_token(prisma, token_record.id, new_refresh_token)
     
     return new_access_token, new_refresh_token
 
 
 async def logout(prisma: Prisma, refresh_token: str) -> bool:
     """Logout - invalidate refresh token"""
-    await prisma.refreshtoken.delete_many(where={"token": refresh_token})
+    await revoke_refresh_token(prisma, refresh_token)
+    return True
+
+
+async def logout_everywhere(prisma: Prisma, user_id: int) -> bool:
+    """Revoke all refresh tokens and outstanding access tokens of a user"""
+    await revoke_user_refresh_tokens(prisma, user_id)
+    await bump_auth_epoch(prisma, user_id)
     return True
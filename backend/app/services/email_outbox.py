@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional
+
+from prisma import Prisma
+from prisma.models import EmailOutbox
+
+from ..core.config import get_settings
+from ..core.smtp import build_message, get_smtp_pool
+
+logger = logging.getLogger(__name__)
+
+# SKIP LOCKED lets every worker process poll the same outbox without handing
+# one message to two dispatchers.
+_CLAIM_SQL = (
+    "SELECT `id` FROM `EmailOutbox` WHERE `status` = 'PENDING' AND `nextAttemptAt` <= ? "
+    "ORDER BY `nextAttemptAt` LIMIT ? FOR UPDATE SKIP LOCKED"
+)
+_PURGE_SQL = "DELETE FROM `EmailOutbox` WHERE `status` = 'SENT' AND `sentAt` < ? ORDER BY `sentAt` LIMIT ?"
+_DEPTH_SQL = "SELECT `status`, COUNT(*) AS `count` FROM `EmailOutbox` GROUP BY `status`"
+
+_MAX_BACKOFF = timedelta(hours=1)
+
+
+def _sql_time(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+async def enqueue_email(
+    prisma: Prisma,
+    to_email: str,
+    subject: str,
+    html_body: str,
+    text_body: Optional[str] = None,
+    wake: bool = True,
+) -> EmailOutbox:
+    """
+    Persist a message for delivery. Pass a transaction client to make the
+    email part of the same commit as the change that triggered it; then pass
+    wake=False and call wake_email_dispatcher() once the transaction has
+    committed, since the dispatcher cannot claim the row before that.
+    """
+    record = await prisma.emailoutbox.create(
+        data={
+            "toEmail": to_email,
+            "subject": subject,
+            "htmlBody": html_body,
+            "textBody": text_body,
+        }
+    )
+    if wake:
+        wake_email_dispatcher()
+    return record
+
+
+def wake_email_dispatcher() -> None:
+    get_email_dispatcher().wake()
+
+
+async def claim_due_emails(prisma: Prisma, limit: int, lease_seconds: float) -> List[EmailOutbox]:
+    """
+    Lease up to `limit` due messages by pushing their nextAttemptAt past the
+    lease. A dispatcher that dies mid-send leaves them to be retried once the
+    lease runs out.
+    """
+    now = datetime.utcnow()
+    async with prisma.tx() as transaction:
+        rows = await transaction.query_raw(_CLAIM_SQL, _sql_time(now), limit)
+        ids = [int(row["id"]) for row in rows]
+        if not ids:
+            return []
+        await transaction.emailoutbox.update_many(
+            where={"id": {"in": ids}},
+            data={"nextAttemptAt": now + timedelta(seconds=lease_seconds), "attempts": {"increment": 1}},
+        )
+    return await prisma.emailoutbox.find_many(where={"id": {"in": ids}}, order={"id": "asc"})
+
+
+def retry_delay(attempts: int, base_seconds: float) -> timedelta:
+    return min(timedelta(seconds=base_seconds * 2 ** max(attempts - 1, 0)), _MAX_BACKOFF)
+
+
+async def outbox_depth(prisma: Prisma) -> dict:
+    rows = await prisma.query_raw(_DEPTH_SQL)
+    return {row["status"]: int(row["count"]) for row in rows}
+
+
+async def purge_sent_emails(prisma: Prisma, older_than: datetime, batch_size: int = 1000) -> int:
+    removed = 0
+    while True:
+        deleted = await prisma.execute_raw(_PURGE_SQL, _sql_time(older_than), batch_size)
+        removed += deleted
+        if deleted < batch_size:
+            return removed
+        await asyncio.sleep(0)
+
+
+class EmailDispatcher:
+    """
+    Background worker pool draining the outbox over pooled SMTP sessions.
+    Failed sends are retried with exponential backoff until `max_attempts`,
+    after which the message is parked as FAILED.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        batch_size: int,
+        poll_interval: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        lease_seconds: float,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _deliver(self, prisma: Prisma, email: EmailOutbox) -> None:
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                pool = get_smtp_pool()
+                if pool is None:
+                    # Development: no SMTP configured, just log the message
+                    logger.warning("SMTP not configured; would send to %s: %s\n%s", email.toEmail, email.subject, email.htmlBody)
+                else:
+                    settings = get_settings()
+                    msg = build_message(settings.smtp_from_email, email.toEmail, email.subject, email.htmlBody, email.textBody)
+                    await pool.send(msg)
+            except Exception as exc:
+                await self._record_failure(prisma, email, exc)
+                return
+            finally:
+                self.in_flight -= 1
+        await prisma.emailoutbox.update(
+            where={"id": email.id},
+            data={"status": "SENT", "sentAt": datetime.utcnow(), "lastError": None},
+        )
+        self.sent += 1
+
+    async def _record_failure(self, prisma: Prisma, email: EmailOutbox, exc: Exception) -> None:
+        error = f"{type(exc).__name__}: {exc}"[:500]
+        self.last_error = error
+        if email.attempts >= self.max_attempts:
+            self.failed += 1
+            logger.error("Giving up on email %s to %s after %s attempts: %s", email.id, email.toEmail, email.attempts, error)
+            data = {"status": "FAILED", "lastError": error}
+        else:
+            self.retried += 1
+            logger.warning("Email %s failed (attempt %s), will retry: %s", email.id, email.attempts, error)
+            data = {
+                "nextAttemptAt": datetime.utcnow() + retry_delay(email.attempts, self.backoff_seconds),
+                "lastError": error,
+            }
+        await prisma.emailoutbox.update(where={"id": email.id}, data=data)
+
+    async def drain_once(self, prisma: Prisma) -> int:
+        batch = await claim_due_emails(prisma, self.batch_size, self.lease_seconds)
+        if batch:
+            await asyncio.gather(*(self._deliver(prisma, email) for email in batch))
+        return len(batch)
+
+    async def run(self, prisma: Prisma) -> None:
+        settings = get_settings()
+        next_purge = datetime.utcnow()
+        while True:
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain_once(prisma)
+                if datetime.utcnow() >= next_purge:
+                    cutoff = datetime.utcnow() - timedelta(days=settings.email_outbox_retention_days)
+                    await purge_sent_emails(prisma, cutoff)
+                    next_purge = datetime.utcnow() + timedelta(hours=1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email outbox poll failed")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # more is probably waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def metrics(self) -> dict:
+        pool = get_smtp_pool()
+        return {
+            "concurrency": self.concurrency,
+            "inFlight": self.in_flight,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "lastError": self.last_error,
+            "smtp": pool.metrics() if pool else None,
+        }
+
+
+@lru_cache
+def get_email_dispatcher() -> EmailDispatcher:
+    settings = get_settings()
+    return EmailDispatcher(
+        concurrency=settings.email_workers,
+        batch_size=settings.email_batch_size,
+        poll_interval=settings.email_poll_interval_seconds,
+        max_attempts=settings.email_max_attempts,
+        backoff_seconds=settings.email_retry_backoff_seconds,
+        lease_seconds=settings.email_lease_seconds,
+    )
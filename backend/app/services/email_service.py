@@ -1,49 +1,22 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from fastapi import HTTPException
+from prisma import Prisma
 
 from ..core.config import get_settings
+from .email_outbox import enqueue_email
 
 
-async def send_email(to_email: str, subject: str, html_body: str, text_body: str = None) -> bool:
+async def send_email(
+    prisma: Prisma, to_email: str, subject: str, html_body: str, text_body: str = None, wake: bool = True
+) -> bool:
     """
-    Send an email using SMTP.
-    Returns True if successful, False otherwise.
+    Queue an email in the outbox; the background dispatcher delivers it over
+    pooled SMTP connections with retries. Inside a transaction pass wake=False
+    and wake the dispatcher after commit (see enqueue_email).
     """
-    settings = get_settings()
-    
-    if not settings.smtp_host or not settings.smtp_user:
-        # In development, just log instead of actually sending
-        print(f"[EMAIL] Would send to {to_email}: {subject}")
-        print(f"[EMAIL] Body: {html_body}")
-        return True
-    
-    try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = settings.smtp_from_email
-        msg["To"] = to_email
-        
-        if text_body:
-            part1 = MIMEText(text_body, "plain", "utf-8")
-            msg.attach(part1)
-        
-        part2 = MIMEText(html_body, "html", "utf-8")
-        msg.attach(part2)
-        
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_user, settings.smtp_password)
-            server.send_message(msg)
-        
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    await enqueue_email(prisma, to_email, subject, html_body, text_body, wake=wake)
+    return True
 
 
-async def send_verification_email(email: str, token: str) -> bool:
+async def send_verification_email(prisma: Prisma, email: str, token: str, wake: bool = True) -> bool:
     """Send email verification link"""
     settings = get_settings()
     verification_url = f"{settings.frontend_url}/auth/verify?token={token}"
@@ -70,10 +43,10 @@ async def send_verification_email(email: str, token: str) -> bool:
     این لینک تا 24 ساعت معتبر است.
     """
     
-    return await send_email(email, "تایید ایمیل - استایلینو", html_body, text_body)
+    return await send_email(prisma, email, "تایید ایمیل - استایلینو", html_body, text_body, wake=wake)
 
 
-async def send_password_reset_email(email: str, token: str) -> bool:
+async def send_password_reset_email(prisma: Prisma, email: str, token: str) -> bool:
     """Send password reset link"""
     settings = get_settings()
     reset_url = f"{settings.frontend_url}/auth/reset-password?token={token}"
@@ -100,5 +73,5 @@ async def send_password_reset_email(email: str, token: str) -> bool:
     این لینک تا 1 ساعت معتبر است.
     """
     
-    return await send_email(email, "بازیابی رمز عبور - استایلینو", html_body, text_body)
+    return await send_email(prisma, email, "بازیابی رمز عبور - استایلینو", html_body, text_body)
 
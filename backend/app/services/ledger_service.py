@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+from prisma import Prisma
+from prisma.models import Commission, CommissionBalance
+
+# MySQL upsert: a single atomic statement per batch, safe against concurrent
+# first-time inserts for the same user (Prisma's upsert is find-then-create).
+_UPSERT_BALANCE_SQL = """
+INSERT INTO `CommissionBalance` (`userId`, `pendingAmount`, `paidAmount`, `lifetimeAmount`, `commissionCount`, `updatedAt`)
+VALUES {values}
+ON DUPLICATE KEY UPDATE
+    `pendingAmount` = `pendingAmount` + VALUES(`pendingAmount`),
+    `paidAmount` = `paidAmount` + VALUES(`paidAmount`),
+    `lifetimeAmount` = `lifetimeAmount` + VALUES(`lifetimeAmount`),
+    `commissionCount` = `commissionCount` + VALUES(`commissionCount`),
+    `updatedAt` = VALUES(`updatedAt`)
+"""
+
+MAX_PAGE_SIZE = 200
+
+
+def _field(commission: Union[Commission, Mapping], name: str):
+    return commission[name] if isinstance(commission, Mapping) else getattr(commission, name)
+
+
+def balance_deltas(
+    commissions: Iterable[Union[Commission, Mapping]],
+    sign: int = 1,
+    deltas: Optional[Dict[int, List[float]]] = None,
+) -> Dict[int, List[float]]:
+    """
+    Group commissions (models or create-data dicts) by recipient into
+    [pending, paid, lifetime, count] deltas, optionally accumulating into `deltas`.
+    """
+    deltas = {} if deltas is None else deltas
+    for c in commissions:
+        amount = _field(c, "amount")
+        bucket = deltas.setdefault(_field(c, "toUserId"), [0.0, 0.0, 0.0, 0])
+        if _field(c, "status") == "PAID":
+            bucket[1] += sign * amount
+        else:
+            bucket[0] += sign * amount
+        bucket[2] += sign * amount
+        bucket[3] += sign
+    return deltas
+
+
+async def apply_balance_deltas(prisma: Prisma, deltas: Dict[int, List[float]]) -> None:
+    """
+    Add per-user deltas to CommissionBalance in one round trip. Rows are
+    written in userId order so concurrent batches lock them in the same order
+    and cannot deadlock each other.
+    """
+    if not deltas:
+        return
+    values = ", ".join(["(?, ?, ?, ?, ?, CURRENT_TIMESTAMP(3))"] * len(deltas))
+    args: list = []
+    for user_id, (pending, paid, lifetime, count) in sorted(deltas.items()):
+        args.extend([user_id, round(pending, 2), round(paid, 2), round(lifetime, 2), int(count)])
+    await prisma.execute_raw(_UPSERT_BALANCE_SQL.format(values=values), *args)
+
+
+async def record_commissions(prisma: Prisma, commissions: Iterable[Commission]) -> None:
+    """
+    Credit newly created commissions to their recipients' balances.
+    Must be called with the same transaction client that created the rows.
+    """
+    await apply_balance_deltas(prisma, balance_deltas(commissions))
+
+
+async def reverse_commissions(prisma: Prisma, commissions: Iterable[Commission]) -> None:
+    """Debit commissions that are being deleted from their recipients' balances."""
+    await apply_balance_deltas(prisma, balance_deltas(commissions, sign=-1))
+
+
+async def get_balance(prisma: Prisma, user_id: int) -> Optional[CommissionBalance]:
+    return await prisma.commissionbalance.find_unique(where={"userId": user_id})
+
+
+async def list_commission_page(
+    prisma: Prisma,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+) -> tuple[List[Commission], Optional[int]]:
+    """
+    Keyset-paginated commission history, newest first.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where: dict = {}
+    if user_id is not None:
+        where["toUserId"] = user_id
+    if status:
+        where["status"] = status
+
+    query: dict = {
+        "where": where,
+        "order": [{"createdAt": "desc"}, {"id": "desc"}],
+        "take": limit + 1,
+    }
+    if cursor:
+        query["cursor"] = {"id": cursor}
+        query["skip"] = 1
+
+    rows = await prisma.commission.find_many(**query)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def total_paid_commissions(prisma: Prisma) -> float:
+    rows = await prisma.query_raw("SELECT COALESCE(SUM(`paidAmount`), 0) AS total FROM `CommissionBalance`")
+    return float(rows[0]["total"]) if rows else 0.0
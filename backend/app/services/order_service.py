@@ -245,7 +245,6 @@ async def mark_order_paid(
     # Use transaction to prevent race conditions
     try:
         async with prisma.tx() as transaction:
-            # Lock the order row by selecting it first
             order = await transaction.order.find_unique(where={"id": order_id})
             if not order:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="سفارش یافت نشد")
@@ -256,14 +255,20 @@ async def mark_order_paid(
             # Check if already paid (prevent double payment)
             if order.paymentStatus == "PAID":
                 return order
-            data = {"paymentStatus": "PAID", "status": "PAID"}
+            data = {"paymentStatus": "PAID", "status": "PAID", "paidAt": datetime.utcnow()}
             if payment_update:
                 data.update(payment_update)
 
-            updated = await transaction.order.update(
-                where={"id": order_id},
+            # The callback, the reconcile job and other workers can all get here for
+            # the same order; the conditional update takes the row lock, so only one
+            # of them flips it to PAID and credits the commissions.
+            claimed = await transaction.order.update_many(
+                where={"id": order_id, "paymentStatus": {"not": "PAID"}},
                 data=data,
             )
+            updated = await transaction.order.find_unique(where={"id": order_id})
+            if claimed != 1:
+                return updated
 
             # Create commissions (only if customer exists)
             if order.customerId:
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from prisma import Prisma
+from prisma.models import PaymentTransaction
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+
+# PaymentTransaction.event
+EVENT_REQUEST = "REQUEST"
+EVENT_VERIFY = "VERIFY"
+EVENT_CALLBACK = "CALLBACK"
+
+# PaymentTransaction.status
+STATUS_OK = "OK"
+STATUS_FAILED = "FAILED"  # gateway answered with a failure code
+STATUS_CANCELED = "CANCELED"  # user abandoned at the gateway
+STATUS_ERROR = "ERROR"  # gateway rejected the call
+STATUS_UNAVAILABLE = "UNAVAILABLE"  # outcome unknown (timeout, 5xx, breaker open)
+
+
+class PaymentEventWriter:
+    """
+    Append-only buffer for PaymentTransaction events.
+
+    `record` only appends to memory, so the request path never waits on the
+    write; a background loop flushes with one create_many per batch. A batch
+    that fails to insert, or whose insert is cancelled, is put back and retried
+    on the next flush, and the buffer is capped so a long database outage
+    cannot grow it without bound.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_buffer: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self.written = 0
+        self.dropped = 0
+        self.flush_errors = 0
+
+    def record(
+        self,
+        order_id: int,
+        event: str,
+        status: str,
+        amount: float,
+        authority: Optional[str] = None,
+        code: Optional[int] = None,
+        ref_id: Optional[int] = None,
+        response: Any = None,
+        gateway: str = "ZARINPAL",
+    ) -> None:
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            logger.error("Payment event buffer full; dropping %s %s for order %s", event, status, order_id)
+            return
+        self._buffer.append(
+            {
+                "orderId": order_id,
+                "event": event,
+                "status": status,
+                "amount": amount,
+                "gateway": gateway,
+                "authority": authority,
+                "code": code,
+                "refId": ref_id,
+                "gatewayResponse": json.dumps(response, ensure_ascii=False, default=str) if response is not None else None,
+            }
+        )
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self, prisma: Prisma) -> int:
+        written = 0
+        while self._buffer:
+            batch, self._buffer = self._buffer[: self.batch_size], self._buffer[self.batch_size :]
+            try:
+                await prisma.paymenttransaction.create_many(data=batch)
+            except Exception:
+                self.flush_errors += 1
+                self._buffer[:0] = batch
+                raise
+            except BaseException:
+                # cancelled mid-insert (shutdown): keep the batch for the final flush
+                self._buffer[:0] = batch
+                raise
+            written += len(batch)
+            self.written += len(batch)
+        return written
+
+    async def run(self, prisma: Prisma) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush(prisma)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Payment event flush failed; %s events kept for retry", len(self._buffer))
+
+    def metrics(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushErrors": self.flush_errors,
+        }
+
+
+@lru_cache
+def get_payment_event_writer() -> PaymentEventWriter:
+    settings = get_settings()
+    return PaymentEventWriter(
+        batch_size=settings.payment_log_batch_size,
+        flush_interval=settings.payment_log_flush_seconds,
+        max_buffer=settings.payment_log_max_buffer,
+    )
+
+
+def record_payment_event(order_id: int, event: str, status: str, amount: float, **details) -> None:
+    get_payment_event_writer().record(order_id, event, status, amount, **details)
+
+
+async def list_order_transactions(prisma: Prisma, order_id: int) -> List[PaymentTransaction]:
+    """Full event history of one order, oldest first (support view)."""
+    return await prisma.paymenttransaction.find_many(
+        where={"orderId": order_id},
+        order=[{"createdAt": "asc"}, {"id": "asc"}],
+    )
+
+
+async def list_transactions_page(
+    prisma: Prisma,
+    status: Optional[str] = None,
+    event: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+) -> tuple[List[PaymentTransaction], Optional[int]]:
+    """
+    Keyset-paginated events filtered by status/event, newest first.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where: dict = {}
+    if status:
+        where["status"] = status
+    if event:
+        where["event"] = event
+
+    query: dict = {
+        "where": where,
+        "order": [{"createdAt": "desc"}, {"id": "desc"}],
+        "take": limit + 1,
+    }
+    if cursor:
+        query["cursor"] = {"id": cursor}
+        query["skip"] = 1
+
+    rows = await prisma.paymenttransaction.find_many(**query)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from prisma import Prisma
+from prisma.models import SellerPayout
+
+# Per-seller revenue of orders paid within the period, in one grouped pass.
+# Keyed on paidAt so an order created in one period and paid in the next is
+# settled in the period its money actually arrived. Each order's
+# commissions are charged to its sellers pro rata to their share of the order.
+_SELLER_TOTALS_SQL = """
+WITH items AS (
+    SELECT oi.`orderId` AS orderId,
+           p.`sellerId` AS sellerId,
+           oi.`totalPrice` AS totalPrice,
+           SUM(oi.`totalPrice`) OVER (PARTITION BY oi.`orderId`) AS orderItemsTotal
+    FROM `OrderItem` oi
+    JOIN `Order` o ON o.`id` = oi.`orderId`
+    JOIN `Product` p ON p.`id` = oi.`productId`
+    WHERE o.`paymentStatus` = 'PAID' AND o.`paidAt` >= ? AND o.`paidAt` < ?
+),
+order_commissions AS (
+    SELECT c.`orderId` AS orderId, SUM(c.`amount`) AS total
+    FROM `Commission` c
+    JOIN `Order` o ON o.`id` = c.`orderId`
+    WHERE o.`paymentStatus` = 'PAID' AND o.`paidAt` >= ? AND o.`paidAt` < ?
+    GROUP BY c.`orderId`
+)
+SELECT i.sellerId AS sellerId,
+       SUM(i.totalPrice) AS gross,
+       COALESCE(SUM(i.totalPrice * oc.total / NULLIF(i.orderItemsTotal, 0)), 0) AS commission
+FROM items i
+LEFT JOIN order_commissions oc ON oc.orderId = i.orderId
+GROUP BY i.sellerId
+"""
+
+# MySQL named lock serializing runs across workers; named locks are
+# session-scoped, so it is taken and released on the transaction's connection.
+_RUN_LOCK = "stylino_seller_payout_run"
+_RUN_TIMEOUT = timedelta(seconds=60)
+
+
+@dataclass
+class PayoutLine:
+    seller_id: int
+    gross: float
+    commission: float
+    already_paid: float
+
+    @property
+    def net(self) -> float:
+        return round(self.gross - self.commission - self.already_paid, 2)
+
+
+def _sql_datetime(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _validate_period(period_start: datetime, period_end: datetime) -> None:
+    if period_end <= period_start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="بازه تسویه نامعتبر است")
+
+
+async def _reject_overlapping_paid_period(prisma: Prisma, period_start: datetime, period_end: datetime) -> None:
+    """A different period that shares any time with a paid one would pay the same orders twice."""
+    overlapping = await prisma.sellerpayout.find_first(
+        where={
+            "status": "PAID",
+            "periodStart": {"lt": period_end},
+            "periodEnd": {"gt": period_start},
+            "NOT": [{"periodStart": period_start, "periodEnd": period_end}],
+        },
+    )
+    if overlapping:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="این بازه با بازه‌ای که قبلا تسویه شده هم‌پوشانی دارد",
+        )
+
+
+async def compute_payout_lines(prisma: Prisma, period_start: datetime, period_end: datetime) -> List[PayoutLine]:
+    """Aggregate gross sales, commission share and already-paid amounts per seller."""
+    _validate_period(period_start, period_end)
+    start, end = _sql_datetime(period_start), _sql_datetime(period_end)
+    rows = await prisma.query_raw(_SELLER_TOTALS_SQL, start, end, start, end)
+
+    paid = await prisma.sellerpayout.find_many(
+        where={"periodStart": period_start, "periodEnd": period_end, "status": "PAID"},
+    )
+    already_paid: Dict[int, float] = {}
+    for payout in paid:
+        already_paid[payout.sellerId] = already_paid.get(payout.sellerId, 0.0) + payout.amount
+
+    return [
+        PayoutLine(
+            seller_id=int(row["sellerId"]),
+            gross=round(float(row["gross"] or 0), 2),
+            commission=round(float(row["commission"] or 0), 2),
+            already_paid=round(already_paid.get(int(row["sellerId"]), 0.0), 2),
+        )
+        for row in rows
+    ]
+
+
+async def run_seller_payouts(
+    prisma: Prisma,
+    period_start: datetime,
+    period_end: datetime,
+    dry_run: bool = False,
+) -> List[PayoutLine]:
+    """
+    Compute and write PENDING payouts for a settlement period.
+    Idempotent per period: PENDING rows from an earlier run are replaced,
+    PAID rows are kept and deducted from what is still owed.
+    A period overlapping a different, already paid period is rejected.
+    """
+    _validate_period(period_start, period_end)
+    if dry_run:
+        await _reject_overlapping_paid_period(prisma, period_start, period_end)
+        return await compute_payout_lines(prisma, period_start, period_end)
+
+    async with prisma.tx(timeout=_RUN_TIMEOUT) as transaction:
+        locked = await transaction.query_raw("SELECT GET_LOCK(?, 0) AS acquired", _RUN_LOCK)
+        if not locked or not locked[0].get("acquired"):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="محاسبه تسویه در حال اجراست")
+        try:
+            await _reject_overlapping_paid_period(transaction, period_start, period_end)
+            lines = await compute_payout_lines(transaction, period_start, period_end)
+            await transaction.sellerpayout.delete_many(
+                where={"periodStart": period_start, "periodEnd": period_end, "status": "PENDING"},
+            )
+            rows = [
+                {
+                    "sellerId": line.seller_id,
+                    "amount": line.net,
+                    "status": "PENDING",
+                    "periodStart": period_start,
+                    "periodEnd": period_end,
+                    "grossAmount": line.gross,
+                    "commissionAmount": line.commission,
+                }
+                for line in lines
+                if line.net > 0
+            ]
+            if rows:
+                await transaction.sellerpayout.create_many(data=rows)
+        finally:
+            await transaction.query_raw("SELECT RELEASE_LOCK(?) AS released", _RUN_LOCK)
+    return lines
+
+
+async def list_payouts(
+    prisma: Prisma,
+    seller_id: Optional[int] = None,
+    period_start: Optional[datetime] = None,
+    period_end: Optional[datetime] = None,
+    payout_status: Optional[str] = None,
+) -> List[SellerPayout]:
+    where: dict = {}
+    if seller_id is not None:
+        where["sellerId"] = seller_id
+    if period_start is not None:
+        where["periodStart"] = period_start
+    if period_end is not None:
+        where["periodEnd"] = period_end
+    if payout_status:
+        where["status"] = payout_status
+    return await prisma.sellerpayout.find_many(where=where, order={"createdAt": "desc"})
+
+
+async def mark_payout_paid(prisma: Prisma, payout_id: int) -> SellerPayout:
+    payout = await prisma.sellerpayout.find_unique(where={"id": payout_id})
+    if not payout:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="تسویه یافت نشد")
+    if payout.status == "PAID":
+        return payout
+    return await prisma.sellerpayout.update(
+        where={"id": payout_id},
+        data={"status": "PAID", "processedAt": datetime.utcnow()},
+    )
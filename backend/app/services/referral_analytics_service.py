@@ -0,0 +1,100 @@
+from typing import Dict, List, Optional, Sequence
+
+from prisma import Prisma
+from prisma.models import ReferralStats, User
+
+# Each ancestor gets its per-level counter bumped together with the totals, in a
+# single atomic upsert (MySQL), so concurrent registrations never lose updates.
+_UPSERT_STATS_SQL = """
+INSERT INTO `ReferralStats` (`userId`, `level1Count`, `level2Count`, `downlineCount`, `level1Gmv`, `level2Gmv`, `downlineGmv`, `updatedAt`)
+VALUES {values}
+ON DUPLICATE KEY UPDATE
+    `level1Count` = `level1Count` + VALUES(`level1Count`),
+    `level2Count` = `level2Count` + VALUES(`level2Count`),
+    `downlineCount` = `downlineCount` + VALUES(`downlineCount`),
+    `level1Gmv` = `level1Gmv` + VALUES(`level1Gmv`),
+    `level2Gmv` = `level2Gmv` + VALUES(`level2Gmv`),
+    `downlineGmv` = `downlineGmv` + VALUES(`downlineGmv`),
+    `updatedAt` = VALUES(`updatedAt`)
+"""
+
+LEADERBOARD_METRICS = {"count": "downlineCount", "gmv": "downlineGmv"}
+
+
+async def apply_stats_deltas(prisma: Prisma, deltas: Dict[int, List[float]]) -> None:
+    """
+    Add per-user [level1Count, level2Count, level1Gmv, level2Gmv] deltas to
+    ReferralStats in one round trip; the downline totals follow from the levels.
+    Rows are written in userId order so concurrent batches cannot deadlock.
+    """
+    if not deltas:
+        return
+    values = ", ".join(["(?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP(3))"] * len(deltas))
+    args: list = []
+    for user_id, (level1_count, level2_count, level1_gmv, level2_gmv) in sorted(deltas.items()):
+        args.extend(
+            [
+                user_id,
+                int(level1_count),
+                int(level2_count),
+                int(level1_count + level2_count),
+                round(level1_gmv, 2),
+                round(level2_gmv, 2),
+                round(level1_gmv + level2_gmv, 2),
+            ]
+        )
+    await prisma.execute_raw(_UPSERT_STATS_SQL.format(values=values), *args)
+
+
+async def _apply(prisma: Prisma, ancestors: Sequence[Optional[int]], count: int, gmv: float) -> None:
+    """ancestors[0] is the direct referrer (level 1), ancestors[1] its referrer (level 2)."""
+    deltas: Dict[int, List[float]] = {}
+    for level, user_id in enumerate(ancestors[:2], start=1):
+        if not user_id:
+            continue
+        bucket = deltas.setdefault(user_id, [0, 0, 0.0, 0.0])
+        bucket[level - 1] += count
+        bucket[level + 1] += gmv
+    await apply_stats_deltas(prisma, deltas)
+
+
+async def record_signup(prisma: Prisma, referrer_id: Optional[int], referrer_parent_id: Optional[int]) -> None:
+    """Count a newly registered user in its referrer's and grand-referrer's downline."""
+    await _apply(prisma, [referrer_id, referrer_parent_id], count=1, gmv=0.0)
+
+
+async def record_downline_order(
+    prisma: Prisma, referrer_id: Optional[int], referrer_parent_id: Optional[int], amount: float
+) -> None:
+    """Add a paid order's amount to the GMV of the buyer's two upline levels."""
+    await _apply(prisma, [referrer_id, referrer_parent_id], count=0, gmv=round(amount, 2))
+
+
+async def get_network_stats(prisma: Prisma, user_id: int) -> Optional[ReferralStats]:
+    return await prisma.referralstats.find_unique(where={"userId": user_id})
+
+
+async def list_direct_referrals(
+    prisma: Prisma, user_id: int, cursor: Optional[int] = None, limit: int = 50
+) -> tuple[List[User], Optional[int]]:
+    """Keyset page over a user's direct referrals, newest first."""
+    query: dict = {
+        "where": {"referredById": user_id},
+        "order": {"id": "desc"},
+        "take": limit + 1,
+    }
+    if cursor:
+        query["cursor"] = {"id": cursor}
+        query["skip"] = 1
+    rows = await prisma.user.find_many(**query)
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def leaderboard(prisma: Prisma, metric: str = "count", limit: int = 20) -> List[ReferralStats]:
+    field = LEADERBOARD_METRICS.get(metric, "downlineCount")
+    return await prisma.referralstats.find_many(
+        order={field: "desc"},
+        take=limit,
+        include={"user": True},
+    )
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import string
+from collections import deque
+from functools import lru_cache
+from typing import Deque, List, Optional, Tuple
+
+from prisma import Prisma
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_ALPHABET = string.ascii_uppercase + string.digits
+_CODE_LENGTH = 9  # legacy random codes are 8 characters, so the two spaces never overlap
+_SPACE = len(_ALPHABET) ** _CODE_LENGTH
+# Affine permutation of [0, _SPACE): the multiplier is coprime with 36, so every
+# sequence number maps to a distinct code while consecutive ones look unrelated.
+_MULTIPLIER = 2_654_435_761
+_OFFSET = 48_271_000_003
+_SEQUENCE_NAME = "referral_code"
+
+
+def encode_referral_code(n: int) -> str:
+    if not 0 <= n < _SPACE:
+        raise ValueError("referral sequence exhausted")
+    value = (n * _MULTIPLIER + _OFFSET) % _SPACE
+    chars = []
+    for _ in range(_CODE_LENGTH):
+        value, digit = divmod(value, len(_ALPHABET))
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+async def allocate_sequence_block(prisma: Prisma, count: int, name: str = _SEQUENCE_NAME) -> int:
+    """Reserve `count` consecutive sequence numbers; returns the first one."""
+    async with prisma.tx() as transaction:
+        rows = await transaction.query_raw("SELECT `value` FROM `IdSequence` WHERE `name` = ? FOR UPDATE", name)
+        if not rows:
+            await transaction.execute_raw(
+                "INSERT IGNORE INTO `IdSequence` (`name`, `value`, `updatedAt`) VALUES (?, 0, CURRENT_TIMESTAMP(3))",
+                name,
+            )
+            rows = await transaction.query_raw("SELECT `value` FROM `IdSequence` WHERE `name` = ? FOR UPDATE", name)
+        start = int(rows[0]["value"])
+        await transaction.execute_raw(
+            "UPDATE `IdSequence` SET `value` = `value` + ?, `updatedAt` = CURRENT_TIMESTAMP(3) WHERE `name` = ?",
+            count,
+            name,
+        )
+    return start
+
+
+class ReferralCodePool:
+    """
+    Hands out collision-free referral codes from locally reserved sequence
+    blocks. A block costs one short transaction per `block_size` codes and is
+    topped up in the background before the pool runs dry, so registrations
+    normally spend no round trips on their referral code.
+    """
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ranges: Deque[Tuple[int, int]] = deque()
+        self._lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    @property
+    def remaining(self) -> int:
+        return sum(end - start for start, end in self._ranges)
+
+    async def _refill(self, prisma: Prisma) -> None:
+        async with self._lock:
+            if self.remaining >= self.block_size // 2:
+                return
+            start = await allocate_sequence_block(prisma, self.block_size)
+            self._ranges.append((start, start + self.block_size))
+
+    def _schedule_refill(self, prisma: Prisma) -> None:
+        if self._refill_task and not self._refill_task.done():
+            return
+        self._refill_task = asyncio.create_task(self._refill(prisma))
+        self._refill_task.add_done_callback(self._log_refill_error)
+
+    @staticmethod
+    def _log_refill_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error("Referral code block refill failed", exc_info=task.exception())
+
+    def _take(self) -> Optional[int]:
+        while self._ranges:
+            start, end = self._ranges[0]
+            if start < end:
+                self._ranges[0] = (start + 1, end)
+                return start
+            self._ranges.popleft()
+        return None
+
+    async def next_code(self, prisma: Prisma) -> str:
+        n = self._take()
+        while n is None:
+            await self._refill(prisma)
+            n = self._take()
+        if self.remaining < self.block_size // 2:
+            self._schedule_refill(prisma)
+        return encode_referral_code(n)
+
+    async def reserve(self, prisma: Prisma, count: int) -> List[str]:
+        """Dedicated block for bulk user creation; one transaction for any count."""
+        if count <= 0:
+            return []
+        start = await allocate_sequence_block(prisma, count)
+        return [encode_referral_code(n) for n in range(start, start + count)]
+
+
+@lru_cache
+def get_referral_code_pool() -> ReferralCodePool:
+    return ReferralCodePool(block_size=get_settings().referral_code_block_size)
+
+
+async def next_referral_code(prisma: Prisma) -> str:
+    return await get_referral_code_pool().next_code(prisma)
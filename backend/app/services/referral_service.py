@@ -1,47 +1,65 @@
-from typing import List
+from typing import Dict, List, Optional, Sequence
 
 from prisma import Prisma
 from prisma.models import Commission, User
 
+from .ledger_service import record_commissions
+from .referral_analytics_service import record_downline_order
+
+# Commission share per referral level (level 1 = direct referrer).
+COMMISSION_RATES = {1: 0.10, 2: 0.05}
+
 
 async def _get_parent(prisma: Prisma, user_id: int) -> User | None:
     return await prisma.user.find_unique(where={"id": user_id})
 
 
-async def create_commissions(prisma: Prisma, buyer_id: int, order_id: int, amount: float) -> List[Commission]:
+def build_commissions(buyer_id: int, order_id: int, amount: float, upline: Sequence[Optional[int]]) -> List[Dict]:
+    """
+    Pure commission computation for one order.
+    `upline` lists the buyer's referrer ids, nearest first; a gap stops the chain.
+    """
     commissions_data = []
-    buyer = await prisma.user.find_unique(where={"id": buyer_id})
-    if not buyer or not buyer.referredById:
-        return []
-
-    level1_user = await _get_parent(prisma, buyer.referredById)
-    if level1_user:
+    for level, to_user_id in enumerate(upline[: len(COMMISSION_RATES)], start=1):
+        if not to_user_id:
+            break
         commissions_data.append(
             {
                 "orderId": order_id,
                 "fromUserId": buyer_id,
-                "toUserId": level1_user.id,
-                "level": 1,
-                "amount": round(amount * 0.10, 2),
+                "toUserId": to_user_id,
+                "level": level,
+                "amount": round(amount * COMMISSION_RATES[level], 2),
                 "status": "PAID",
             }
         )
-        if level1_user.referredById:
-            level2_user = await _get_parent(prisma, level1_user.referredById)
-            if level2_user:
-                commissions_data.append(
-                    {
-                        "orderId": order_id,
-                        "fromUserId": buyer_id,
-                        "toUserId": level2_user.id,
-                        "level": 2,
-                        "amount": round(amount * 0.05, 2),
-                        "status": "PAID",
-                    }
-                )
+    return commissions_data
+
+
+async def create_commissions(prisma: Prisma, buyer_id: int, order_id: int, amount: float) -> List[Commission]:
+    buyer = await prisma.user.find_unique(where={"id": buyer_id})
+    if not buyer or not buyer.referredById:
+        return []
+
+    level1_user = await _get_parent(prisma, buyer.referredById)
+    level2_user = None
+    if level1_user and level1_user.referredById:
+        level2_user = await _get_parent(prisma, level1_user.referredById)
+
+    upline = [level1_user.id if level1_user else None, level2_user.id if level2_user else None]
+    commissions_data = build_commissions(buyer_id, order_id, amount, upline)
+
+    if level1_user:
+        await record_downline_order(
+            prisma,
+            referrer_id=level1_user.id,
+            referrer_parent_id=level2_user.id if level2_user else None,
+            amount=amount,
+        )
 
     created: List[Commission] = []
     for data in commissions_data:
         commission = await prisma.commission.create(data=data)
         created.append(commission)
+    await record_commissions(prisma, created)
     return created
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from prisma import Prisma
+from prisma.models import RefreshToken
+
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Single-table DELETE with ORDER BY/LIMIT keeps each sweep batch short so it
+# never holds long locks on the table.
+_SWEEP_SQL = "DELETE FROM `RefreshToken` WHERE `expiresAt` < ? ORDER BY `expiresAt` LIMIT ?"
+
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _expires_at() -> datetime:
+    return datetime.utcnow() + timedelta(days=get_settings().refresh_token_expire_days)
+
+
+async def store_refresh_token(prisma: Prisma, user_id: int, token: str) -> RefreshToken:
+    record = await prisma.refreshtoken.create(
+        data={
+            "userId": user_id,
+            "tokenHash": hash_refresh_token(token),
+            "expiresAt": _expires_at(),
+        }
+    )
+    await enforce_token_cap(prisma, user_id)
+    return record
+
+
+async def enforce_token_cap(prisma: Prisma, user_id: int) -> int:
+    """Keep only a user's newest `refresh_tokens_per_user` tokens; older sessions are dropped."""
+    cap = get_settings().refresh_tokens_per_user
+    if cap <= 0:
+        return 0
+    surplus = await prisma.refreshtoken.find_many(
+        where={"userId": user_id},
+        order={"expiresAt": "desc"},
+        skip=cap,
+        take=100,
+    )
+    if not surplus:
+        return 0
+    return await prisma.refreshtoken.delete_many(where={"id": {"in": [t.id for t in surplus]}})
+
+
+async def find_live_refresh_token(prisma: Prisma, token: str, user_id: int) -> Optional[RefreshToken]:
+    record = await prisma.refreshtoken.find_unique(where={"tokenHash": hash_refresh_token(token)})
+    if not record or record.userId != user_id or record.expiresAt.replace(tzinfo=None) <= datetime.utcnow():
+        return None
+    return record
+
+
+async def rotate_refresh_token(prisma: Prisma, record_id: int, new_token: str) -> RefreshToken:
+    return await prisma.refreshtoken.update(
+        where={"id": record_id},
+        data={"tokenHash": hash_refresh_token(new_token), "expiresAt": _expires_at()},
+    )
+
+
+async def revoke_refresh_token(prisma: Prisma, token: str) -> int:
+    return await prisma.refreshtoken.delete_many(where={"tokenHash": hash_refresh_token(token)})
+
+
+async def revoke_user_refresh_tokens(prisma: Prisma, user_id: int) -> int:
+    return await prisma.refreshtoken.delete_many(where={"userId": user_id})
+
+
+async def sweep_expired_refresh_tokens(prisma: Prisma, batch_size: int, max_batches: int = 1000) -> int:
+    """Delete expired tokens in bounded batches; returns the number removed."""
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    removed = 0
+    for _ in range(max_batches):
+        deleted = await prisma.execute_raw(_SWEEP_SQL, now, batch_size)
+        removed += deleted
+        if deleted < batch_size:
+            break
+        # yield between batches so request traffic is not starved
+        await asyncio.sleep(0)
+    return removed
+
+
+async def run_refresh_token_sweeper(prisma: Prisma) -> None:
+    settings = get_settings()
+    while True:
+        try:
+            removed = await sweep_expired_refresh_tokens(prisma, settings.refresh_token_sweep_batch)
+            if removed:
+                logger.info("Swept %s expired refresh tokens", removed)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Refresh token sweep failed")
+        await asyncio.sleep(settings.refresh_token_sweep_interval_seconds)
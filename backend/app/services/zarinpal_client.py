@@ -1,9 +1,13 @@
+import asyncio
 import logging
 from typing import Optional
 
 import httpx
 from pydantic import BaseModel
 
+from ..core.config import get_settings
+from ..core.resilience import CircuitBreaker, CircuitOpenError, retry_async
+
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +20,21 @@ class ZarinpalError(Exception):
         super().__init__(message)
 
 
+class ZarinpalUnavailable(ZarinpalError):
+    """
+    The gateway could not be reached in time (timeout, connection error, 5xx)
+    or the circuit breaker is open. The payment outcome is unknown, not failed.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0):
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class _TransientGatewayError(Exception):
+    """Internal: a failure worth retrying and counted by the circuit breaker."""
+
+
 class PaymentRequestResult(BaseModel):
     authority: str
     payment_url: str
@@ -39,11 +58,69 @@ class ZarinpalClient:
     Keeps URLs/config isolated and normalizes responses for the application layer.
     """
 
-    def __init__(self, merchant_id: str, sandbox: bool, callback_url: str):
+    def __init__(
+        self,
+        merchant_id: str,
+        sandbox: bool,
+        callback_url: str,
+        http: Optional[httpx.AsyncClient] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        api_base_url: Optional[str] = None,
+        gateway_base_url: Optional[str] = None,
+        request_budget: float = 8,
+        verify_budget: float = 10,
+        verify_attempts: int = 3,
+        retry_base_delay: float = 0.2,
+    ):
         self.merchant_id = merchant_id
         self.callback_url = callback_url
-        self.base_api_url = f"https://{'sandbox' if sandbox else 'api'}.zarinpal.com"
-        self.gateway_base_url = f"https://{'sandbox' if sandbox else 'www'}.zarinpal.com"
+        # Overridable so tests/load tests can point at a local simulator
+        self.base_api_url = (api_base_url or f"https://{'sandbox' if sandbox else 'api'}.zarinpal.com").rstrip("/")
+        self.gateway_base_url = (gateway_base_url or f"https://{'sandbox' if sandbox else 'www'}.zarinpal.com").rstrip("/")
+        # Shared pooled client (owned by the app lifespan); without one each call opens its own
+        self.http = http
+        self.breaker = breaker or CircuitBreaker("zarinpal")
+        self.request_budget = request_budget
+        self.verify_budget = verify_budget
+        self.verify_attempts = verify_attempts
+        self.retry_base_delay = retry_base_delay
+
+    async def _post(self, path: str, payload: dict) -> httpx.Response:
+        url = f"{self.base_api_url}{path}"
+        if self.http is not None:
+            return await self.http.post(url, json=payload)
+        async with httpx.AsyncClient(timeout=15) as client:
+            return await client.post(url, json=payload)
+
+    async def _attempt(self, path: str, payload: dict, timeout: float) -> httpx.Response:
+        async def send() -> httpx.Response:
+            try:
+                response = await asyncio.wait_for(self._post(path, payload), timeout)
+            except (asyncio.TimeoutError, httpx.RequestError) as exc:
+                raise _TransientGatewayError(str(exc) or type(exc).__name__) from exc
+            if response.status_code >= 500:
+                raise _TransientGatewayError(f"HTTP {response.status_code}")
+            return response
+
+        return await self.breaker.call(send, failure_on=(_TransientGatewayError,))
+
+    async def _call(self, path: str, payload: dict, budget: float, attempts: int) -> httpx.Response:
+        """
+        One logical gateway call: at most `attempts` tries within `budget`
+        seconds, failing fast while the breaker is open.
+        """
+        try:
+            return await retry_async(
+                lambda timeout: self._attempt(path, payload, timeout),
+                attempts=attempts,
+                budget=budget,
+                base_delay=self.retry_base_delay,
+                retry_on=(_TransientGatewayError,),
+            )
+        except CircuitOpenError as exc:
+            raise ZarinpalUnavailable("درگاه پرداخت موقتا در دسترس نیست، لطفا کمی بعد تلاش کنید", retry_after=exc.retry_after) from exc
+        except (_TransientGatewayError, asyncio.TimeoutError) as exc:
+            raise ZarinpalUnavailable(f"خطا در اتصال به زرین‌پال: {exc}") from exc
 
     async def payment_request(
         self,
@@ -70,12 +147,12 @@ class ZarinpalClient:
         if metadata:
             payload["metadata"] = metadata
 
+        # Not retried: a repeated request would open a second authority
         try:
-            async with httpx.AsyncClient(base_url=self.base_api_url, timeout=15) as client:
-                response = await client.post("/pg/v4/payment/request.json", json=payload)
-        except httpx.RequestError as exc:
+            response = await self._call("/pg/v4/payment/request.json", payload, self.request_budget, attempts=1)
+        except ZarinpalUnavailable:
             logger.exception("Zarinpal request error for order %s", order_id)
-            raise ZarinpalError(f"خطا در اتصال به زرین‌پال: {exc}") from exc
+            raise
 
         data = self._parse_response(response)
         code = data.get("code")
@@ -99,12 +176,12 @@ class ZarinpalClient:
             "amount": amount_rial,
             "authority": authority,
         }
+        # Verify is idempotent on the gateway side (code 101 = already verified), so retry it
         try:
-            async with httpx.AsyncClient(base_url=self.base_api_url, timeout=15) as client:
-                response = await client.post("/pg/v4/payment/verify.json", json=payload)
-        except httpx.RequestError as exc:
+            response = await self._call("/pg/v4/payment/verify.json", payload, self.verify_budget, self.verify_attempts)
+        except ZarinpalUnavailable:
             logger.exception("Zarinpal verify error for order %s", order_id)
-            raise ZarinpalError(f"خطا در تایید تراکنش: {exc}") from exc
+            raise
 
         data = self._parse_response(response)
         code = int(data.get("code") or -1)
@@ -154,3 +231,27 @@ class ZarinpalClient:
         if isinstance(data, dict):
             return data.get("message")
         return None
+
+
+def build_zarinpal_client(http: Optional[httpx.AsyncClient] = None) -> Optional[ZarinpalClient]:
+    """Client from settings, or None when the gateway is not configured."""
+    settings = get_settings()
+    if not settings.zarinpal_merchant_id or not settings.zarinpal_callback_url:
+        return None
+    return ZarinpalClient(
+        merchant_id=settings.zarinpal_merchant_id,
+        sandbox=settings.zarinpal_sandbox,
+        callback_url=settings.zarinpal_callback_url,
+        http=http,
+        api_base_url=settings.zarinpal_api_base_url or None,
+        gateway_base_url=settings.zarinpal_gateway_base_url or settings.zarinpal_api_base_url or None,
+        breaker=CircuitBreaker(
+            "zarinpal",
+            failure_threshold=settings.zarinpal_breaker_failure_threshold,
+            reset_timeout=settings.zarinpal_breaker_reset_seconds,
+        ),
+        request_budget=settings.zarinpal_request_budget_seconds,
+        verify_budget=settings.zarinpal_verify_budget_seconds,
+        verify_attempts=settings.zarinpal_verify_attempts,
+        retry_base_delay=settings.zarinpal_retry_base_delay_seconds,
+    )
@@ -0,0 +1 @@
+# Benchmarks for the استایلینو backend (run from backend/: python -m benchmarks.<name>)
@@ -0,0 +1,43 @@
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LatencyRecorder:
+    """Collects per-step latencies (seconds) and error counts for a load run."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def measure(self, step: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.errors[step] += 1
+            raise
+        self.samples[step].append(time.perf_counter() - started)
+
+    def report(self, elapsed: float, steps: Iterable[str] = ()) -> str:
+        names = list(steps) or list(self.samples)
+        lines = [f"{'step':<16}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name in names:
+            values = sorted(self.samples.get(name, []))
+            lines.append(
+                f"{name:<16}{len(values):>8}{self.errors.get(name, 0):>8}{len(values) / elapsed if elapsed else 0:>10.1f}"
+                f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 90) * 1000:>10.1f}"
+                f"{percentile(values, 99) * 1000:>10.1f}{(values[-1] if values else 0) * 1000:>10.1f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark of get_current_user throughput with and without the
+decoded-JWT verification cache.
+
+The principal cache is pre-warmed so no database is needed and the numbers
+isolate token verification cost.
+
+    JWT_SECRET=bench DATABASE_URL=mysql://unused python -m benchmarks.current_user --iterations 50000
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.deps import get_current_user
+from app.core.principal import Principal, get_principal_cache
+from app.core.security import create_access_token
+from app.core.token_cache import get_token_cache
+
+
+async def _run(tokens: list[str], iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        await get_current_user(tokens[i % len(tokens)])
+    return iterations / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=100, help="distinct tokens in rotation")
+    args = parser.parse_args()
+
+    principals = get_principal_cache()
+    tokens = []
+    for user_id in range(1, args.users + 1):
+        principals.put(Principal(id=user_id, role="CUSTOMER"))
+        tokens.append(create_access_token(str(user_id)))
+
+    cache = get_token_cache()
+    configured = cache.max_entries
+
+    cache.max_entries = 0
+    cache.clear()
+    uncached = await _run(tokens, args.iterations)
+
+    cache.max_entries = max(configured, args.users)
+    cache.clear()
+    cached = await _run(tokens, args.iterations)
+
+    print(f"tokens in rotation : {args.users}")
+    print(f"without cache      : {uncached:,.0f} calls/s")
+    print(f"with cache         : {cached:,.0f} calls/s ({cached / uncached:.1f}x)")
+    print(f"cache stats        : {cache.metrics()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
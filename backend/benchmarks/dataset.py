@@ -0,0 +1,174 @@
+"""
+Deterministic benchmark datasets.
+
+Each size seeds a fixed population (same seed -> same rows) with bulk
+create_many calls and one precomputed password hash, so the HTTP suite
+measures the application rather than the seeding. A dataset is seeded once
+per database; rerunning finds the marker admin and reuses it.
+"""
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List
+
+from prisma import Prisma
+
+from app.core.hashing import pwd_context
+from app.services.referral_codes import get_referral_code_pool
+
+BENCH_PASSWORD = "Bench123!"
+BENCH_DOMAIN = "bench.stylino.ir"  # ".local" is rejected by EmailStr
+ADMIN_EMAIL = f"admin@{BENCH_DOMAIN}"
+
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"sellers": 5, "customers": 200, "categories": 5, "products": 100, "orders": 500},
+    "medium": {"sellers": 50, "customers": 5_000, "categories": 20, "products": 2_000, "orders": 20_000},
+    "large": {"sellers": 200, "customers": 50_000, "categories": 40, "products": 20_000, "orders": 200_000},
+}
+
+_INSERT_BATCH = 1000
+
+
+@dataclass
+class BenchDataset:
+    size: str
+    admin_email: str
+    seller_emails: List[str]
+    customer_emails: List[str]
+    product_ids: List[int]
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def seller_email(i: int) -> str:
+    return f"seller{i}@{BENCH_DOMAIN}"
+
+
+def customer_email(i: int) -> str:
+    return f"customer{i}@{BENCH_DOMAIN}"
+
+
+async def _create_many(delegate, rows: List[dict]) -> None:
+    for start in range(0, len(rows), _INSERT_BATCH):
+        await delegate.create_many(data=rows[start : start + _INSERT_BATCH])
+
+
+async def _ids_after(prisma: Prisma, table: str, after_id: int) -> List[int]:
+    rows = await prisma.query_raw(f"SELECT `id` FROM `{table}` WHERE `id` > ? ORDER BY `id`", after_id)
+    return [int(row["id"]) for row in rows]
+
+
+async def _max_id(prisma: Prisma, table: str) -> int:
+    rows = await prisma.query_raw(f"SELECT COALESCE(MAX(`id`), 0) AS `id` FROM `{table}`")
+    return int(rows[0]["id"])
+
+
+async def seed_dataset(prisma: Prisma, size: str = "small", seed: int = 42) -> BenchDataset:
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    sellers = [seller_email(i) for i in range(spec["sellers"])]
+    customers = [customer_email(i) for i in range(spec["customers"])]
+
+    marker = f"bench:{size}:{seed}"
+    admin = await prisma.user.find_unique(where={"email": ADMIN_EMAIL})
+    if admin:
+        if admin.name != marker:
+            raise RuntimeError(f"database already holds dataset {admin.name!r}; use a fresh database for {marker!r}")
+        product_rows = await prisma.query_raw(
+            "SELECT p.`id` FROM `Product` p JOIN `User` u ON u.`id` = p.`sellerId` WHERE u.`email` LIKE ? ORDER BY p.`id`",
+            f"%@{BENCH_DOMAIN}",
+        )
+        return BenchDataset(size, ADMIN_EMAIL, sellers, customers, [int(r["id"]) for r in product_rows])
+
+    password_hash = pwd_context.hash(BENCH_PASSWORD)
+    emails = [ADMIN_EMAIL, *sellers, *customers]
+    codes = await get_referral_code_pool().reserve(prisma, len(emails))
+    roles = ["ADMIN"] + ["SELLER"] * len(sellers) + ["CUSTOMER"] * len(customers)
+    users_before = await _max_id(prisma, "User")
+    await _create_many(
+        prisma.user,
+        [
+            {
+                "name": marker if email == ADMIN_EMAIL else email.split("@")[0],
+                "email": email,
+                "passwordHash": password_hash,
+                "role": role,
+                "referralCode": code,
+                "emailVerified": True,
+            }
+            for email, role, code in zip(emails, roles, codes)
+        ],
+    )
+    user_ids = await _ids_after(prisma, "User", users_before)
+    seller_ids = user_ids[1 : 1 + len(sellers)]
+    customer_ids = user_ids[1 + len(sellers) :]
+
+    categories_before = await _max_id(prisma, "Category")
+    await _create_many(
+        prisma.category,
+        [{"name": f"دسته {i}", "slug": f"bench-{seed}-{i}"} for i in range(spec["categories"])],
+    )
+    category_ids = await _ids_after(prisma, "Category", categories_before)
+
+    products_before = await _max_id(prisma, "Product")
+    await _create_many(
+        prisma.product,
+        [
+            {
+                "sellerId": rng.choice(seller_ids),
+                "name": f"محصول {i}",
+                "slug": f"bench-{seed}-{i}",
+                "description": "محصول آزمایشی برای بنچمارک",
+                "basePrice": float(rng.randrange(200, 5000) * 1000),
+                "discountPrice": None,
+                "categoryId": rng.choice(category_ids),
+                "brand": "Bench",
+                "colors": json.dumps(["مشکی", "سفید"], ensure_ascii=False),
+                "sizes": json.dumps(["S", "M", "L"]),
+                "images": json.dumps([]),
+                "isActive": True,
+                "stock": 1_000_000,
+            }
+            for i in range(spec["products"])
+        ],
+    )
+    products = await prisma.product.find_many(where={"id": {"gt": products_before}}, order={"id": "asc"})
+    product_ids = [p.id for p in products]
+
+    orders_before = await _max_id(prisma, "Order")
+    paid_at = datetime.utcnow()
+    planned = []
+    for _ in range(spec["orders"]):
+        product = rng.choice(products)
+        quantity = rng.randint(1, 3)
+        planned.append((product, quantity))
+    await _create_many(
+        prisma.order,
+        [
+            {
+                "customerId": rng.choice(customer_ids),
+                "totalAmount": product.basePrice * quantity,
+                "status": "PAID",
+                "paymentStatus": "PAID",
+                "paidAt": paid_at,
+            }
+            for product, quantity in planned
+        ],
+    )
+    order_ids = await _ids_after(prisma, "Order", orders_before)
+    await _create_many(
+        prisma.orderitem,
+        [
+            {
+                "orderId": order_id,
+                "productId": product.id,
+                "quantity": quantity,
+                "unitPrice": product.basePrice,
+                "totalPrice": product.basePrice * quantity,
+            }
+            for order_id, (product, quantity) in zip(order_ids, planned)
+        ],
+    )
+
+    counts = {"users": len(user_ids), "products": len(product_ids), "orders": len(order_ids)}
+    return BenchDataset(size, ADMIN_EMAIL, sellers, customers, product_ids, counts)
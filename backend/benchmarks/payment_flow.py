@@ -0,0 +1,96 @@
+"""
+End-to-end checkout load test: create order -> payment create -> callback.
+
+Drives a running API whose gateway points at the local simulator, so no
+real money moves and gateway latency/errors are under your control:
+
+    python -m benchmarks.zarinpal_simulator --port 9000 --latency-ms 120 &
+    ZARINPAL_MERCHANT_ID=sim ZARINPAL_API_BASE_URL=http://127.0.0.1:9000 uvicorn app.main:app --port 8000 &
+    python -m benchmarks.payment_flow --email buyer@example.com --password '...' --product-id 1 --flows 500 --concurrency 20
+
+The buyer must be a CUSTOMER and the product needs stock for --flows units.
+Each flow calls the callback endpoint directly (as the gateway redirect
+would) and expects a success redirect; anything else counts as an error.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from .common import LatencyRecorder
+
+STEPS = ("order", "payment", "callback", "flow")
+
+
+async def _login(http: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await http.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _flow(http: httpx.AsyncClient, token: str, product_id: int, recorder: LatencyRecorder) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    with recorder.measure("flow"):
+        with recorder.measure("order"):
+            response = await http.post(
+                "/api/orders/", json={"items": [{"productId": product_id, "quantity": 1}]}, headers=headers
+            )
+            response.raise_for_status()
+            order = response.json()
+
+        with recorder.measure("payment"):
+            response = await http.post(
+                "/api/payments/zarinpal/create",
+                json={"order_id": order["id"], "amount_toman": 0, "description": "load test"},
+                headers=headers,
+            )
+            response.raise_for_status()
+            authority = response.json()["authority"]
+
+        with recorder.measure("callback"):
+            response = await http.get(
+                "/api/payments/zarinpal/callback", params={"Authority": authority, "Status": "OK"}
+            )
+            location = response.headers.get("location", "")
+            if response.status_code not in (302, 303, 307) or parse_qs(urlparse(location).query).get("status") != ["success"]:
+                raise RuntimeError(f"callback did not succeed: {response.status_code} {location}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--product-id", type=int, required=True)
+    parser.add_argument("--flows", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    recorder = LatencyRecorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60, trust_env=False) as http:
+        token = await _login(http, args.email, args.password)
+        slots = asyncio.Semaphore(args.concurrency)
+
+        async def one() -> None:
+            async with slots:
+                try:
+                    await _flow(http, token, args.product_id, recorder)
+                except Exception:
+                    pass  # counted by the recorder
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.flows)))
+        elapsed = time.perf_counter() - started
+
+    completed = len(recorder.samples["flow"])
+    print(f"flows              : {args.flows} ({completed} ok, {recorder.errors['flow']} failed)")
+    print(f"concurrency        : {args.concurrency}")
+    print(f"elapsed            : {elapsed:.1f}s, {completed / elapsed:.1f} checkouts/s")
+    print(recorder.report(elapsed, STEPS))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""
+Local stand-in for the Zarinpal REST v4 gateway, for load tests and manual
+end-to-end runs without touching the sandbox.
+
+Implements POST /pg/v4/payment/request.json, POST /pg/v4/payment/verify.json
+and GET /pg/StartPay/{authority} (redirects to the callback with Status=OK).
+Latency, HTTP 5xx rate, hangs and gateway failure codes are configurable.
+
+    python -m benchmarks.zarinpal_simulator --port 9000 --latency-ms 120 --jitter-ms 40 --error-rate 0.01
+    ZARINPAL_MERCHANT_ID=sim ZARINPAL_API_BASE_URL=http://127.0.0.1:9000 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import random
+import secrets
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+
+@dataclass
+class SimulatorConfig:
+    latency_ms: float = 50
+    jitter_ms: float = 20
+    error_rate: float = 0.0  # HTTP 500
+    hang_rate: float = 0.0  # never answer within the client's budget
+    hang_seconds: float = 30
+    request_code: int = 100
+    verify_fail_rate: float = 0.0  # gateway answers -51 (payment not completed)
+
+
+config = SimulatorConfig()
+_payments: Dict[str, dict] = {}
+stats: Counter = Counter()
+
+app = FastAPI(title="Zarinpal simulator")
+
+
+async def _delay() -> Optional[JSONResponse]:
+    """Apply configured latency; returns an error response when one is injected."""
+    if config.hang_rate and random.random() < config.hang_rate:
+        stats["hung"] += 1
+        await asyncio.sleep(config.hang_seconds)
+    latency = max(0.0, random.gauss(config.latency_ms, config.jitter_ms)) / 1000
+    await asyncio.sleep(latency)
+    if config.error_rate and random.random() < config.error_rate:
+        stats["http_500"] += 1
+        return JSONResponse(status_code=500, content={"errors": {"message": "simulated outage"}})
+    return None
+
+
+def _failure(code: int, message: str) -> JSONResponse:
+    return JSONResponse(content={"data": [], "errors": {"code": code, "message": message}})
+
+
+@app.post("/pg/v4/payment/request.json")
+async def payment_request(request: Request):
+    stats["request"] += 1
+    error = await _delay()
+    if error:
+        return error
+    body = await request.json()
+    if config.request_code != 100:
+        return _failure(config.request_code, "simulated request failure")
+    authority = "S" + secrets.token_hex(18)[:35]
+    _payments[authority] = {
+        "amount": body.get("amount"),
+        "callback_url": body.get("callback_url"),
+        "verified": False,
+    }
+    return {"data": {"code": 100, "message": "Success", "authority": authority, "fee_type": "Merchant", "fee": 0}, "errors": []}
+
+
+@app.post("/pg/v4/payment/verify.json")
+async def payment_verify(request: Request):
+    stats["verify"] += 1
+    error = await _delay()
+    if error:
+        return error
+    body = await request.json()
+    payment = _payments.get(body.get("authority"))
+    if payment is None:
+        return _failure(-54, "Invalid authority.")
+    if body.get("amount") != payment["amount"]:
+        return _failure(-50, "Session is not valid, amounts values is not the same.")
+    if not payment["verified"] and config.verify_fail_rate and random.random() < config.verify_fail_rate:
+        stats["verify_failed"] += 1
+        return _failure(-51, "Session is not valid, session is not active paid try.")
+    code = 101 if payment["verified"] else 100
+    payment["verified"] = True
+    payment.setdefault("ref_id", random.randint(10**9, 10**10 - 1))
+    return {
+        "data": {
+            "code": code,
+            "message": "Verified" if code == 100 else "Already verified",
+            "ref_id": payment["ref_id"],
+            "card_pan": "502229******5995",
+            "card_hash": secrets.token_hex(32),
+            "fee_type": "Merchant",
+            "fee": 0,
+        },
+        "errors": [],
+    }
+
+
+@app.get("/pg/StartPay/{authority}")
+async def start_pay(authority: str, status: str = "OK"):
+    payment = _payments.get(authority)
+    if payment is None or not payment.get("callback_url"):
+        return JSONResponse(status_code=404, content={"message": "unknown authority"})
+    separator = "&" if "?" in payment["callback_url"] else "?"
+    return RedirectResponse(url=f"{payment['callback_url']}{separator}Authority={authority}&Status={status}")
+
+
+@app.get("/stats")
+async def simulator_stats():
+    return {**stats, "payments": len(_payments)}
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=config.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=config.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="fraction answered with HTTP 500")
+    parser.add_argument("--hang-rate", type=float, default=config.hang_rate, help="fraction that hang for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=config.hang_seconds)
+    parser.add_argument("--request-code", type=int, default=config.request_code, help="code returned by request.json")
+    parser.add_argument("--verify-fail-rate", type=float, default=config.verify_fail_rate, help="fraction verified as -51")
+    args = parser.parse_args()
+
+    config.latency_ms = args.latency_ms
+    config.jitter_ms = args.jitter_ms
+    config.error_rate = args.error_rate
+    config.hang_rate = args.hang_rate
+    config.hang_seconds = args.hang_seconds
+    config.request_code = args.request_code
+    config.verify_fail_rate = args.verify_fail_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
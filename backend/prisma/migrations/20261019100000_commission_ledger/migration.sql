@@ -0,0 +1,38 @@
+-- CreateIndex
+CREATE INDEX `Commission_toUserId_createdAt_idx` ON `Commission`(`toUserId`, `createdAt`);
+
+-- CreateIndex
+CREATE INDEX `Commission_toUserId_status_createdAt_idx` ON `Commission`(`toUserId`, `status`, `createdAt`);
+
+-- CreateIndex
+CREATE INDEX `Commission_status_createdAt_idx` ON `Commission`(`status`, `createdAt`);
+
+-- CreateIndex
+CREATE INDEX `Commission_orderId_idx` ON `Commission`(`orderId`);
+
+-- CreateTable
+CREATE TABLE `CommissionBalance` (
+    `userId` INTEGER NOT NULL,
+    `pendingAmount` DOUBLE NOT NULL DEFAULT 0,
+    `paidAmount` DOUBLE NOT NULL DEFAULT 0,
+    `lifetimeAmount` DOUBLE NOT NULL DEFAULT 0,
+    `commissionCount` INTEGER NOT NULL DEFAULT 0,
+    `updatedAt` DATETIME(3) NOT NULL,
+
+    PRIMARY KEY (`userId`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- AddForeignKey
+ALTER TABLE `CommissionBalance` ADD CONSTRAINT `CommissionBalance_userId_fkey` FOREIGN KEY (`userId`) REFERENCES `User`(`id`) ON DELETE NO ACTION ON UPDATE NO ACTION;
+
+-- Backfill balances from the existing commission history
+INSERT INTO `CommissionBalance` (`userId`, `pendingAmount`, `paidAmount`, `lifetimeAmount`, `commissionCount`, `updatedAt`)
+SELECT
+    `toUserId`,
+    COALESCE(SUM(CASE WHEN `status` = 'PENDING' THEN `amount` ELSE 0 END), 0),
+    COALESCE(SUM(CASE WHEN `status` = 'PAID' THEN `amount` ELSE 0 END), 0),
+    COALESCE(SUM(`amount`), 0),
+    COUNT(*),
+    CURRENT_TIMESTAMP(3)
+FROM `Commission`
+GROUP BY `toUserId`;
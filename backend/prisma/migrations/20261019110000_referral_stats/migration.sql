@@ -0,0 +1,57 @@
+-- CreateTable
+CREATE TABLE `ReferralStats` (
+    `userId` INTEGER NOT NULL,
+    `level1Count` INTEGER NOT NULL DEFAULT 0,
+    `level2Count` INTEGER NOT NULL DEFAULT 0,
+    `downlineCount` INTEGER NOT NULL DEFAULT 0,
+    `level1Gmv` DOUBLE NOT NULL DEFAULT 0,
+    `level2Gmv` DOUBLE NOT NULL DEFAULT 0,
+    `downlineGmv` DOUBLE NOT NULL DEFAULT 0,
+    `updatedAt` DATETIME(3) NOT NULL,
+
+    INDEX `ReferralStats_downlineCount_idx`(`downlineCount`),
+    INDEX `ReferralStats_downlineGmv_idx`(`downlineGmv`),
+    PRIMARY KEY (`userId`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- AddForeignKey
+ALTER TABLE `ReferralStats` ADD CONSTRAINT `ReferralStats_userId_fkey` FOREIGN KEY (`userId`) REFERENCES `User`(`id`) ON DELETE NO ACTION ON UPDATE NO ACTION;
+
+-- Backfill: direct referrals
+INSERT INTO `ReferralStats` (`userId`, `level1Count`, `updatedAt`)
+SELECT `referredById`, COUNT(*), CURRENT_TIMESTAMP(3)
+FROM `User`
+WHERE `referredById` IS NOT NULL
+GROUP BY `referredById`;
+
+-- Backfill: second-level referrals
+INSERT INTO `ReferralStats` (`userId`, `level2Count`, `updatedAt`)
+SELECT p.`referredById`, COUNT(*), CURRENT_TIMESTAMP(3)
+FROM `User` c
+JOIN `User` p ON c.`referredById` = p.`id`
+WHERE p.`referredById` IS NOT NULL
+GROUP BY p.`referredById`
+ON DUPLICATE KEY UPDATE `level2Count` = VALUES(`level2Count`);
+
+-- Backfill: GMV of paid orders placed by direct referrals
+INSERT INTO `ReferralStats` (`userId`, `level1Gmv`, `updatedAt`)
+SELECT u.`referredById`, SUM(o.`totalAmount`), CURRENT_TIMESTAMP(3)
+FROM `Order` o
+JOIN `User` u ON o.`customerId` = u.`id`
+WHERE o.`paymentStatus` = 'PAID' AND u.`referredById` IS NOT NULL
+GROUP BY u.`referredById`
+ON DUPLICATE KEY UPDATE `level1Gmv` = VALUES(`level1Gmv`);
+
+-- Backfill: GMV of paid orders placed by second-level referrals
+INSERT INTO `ReferralStats` (`userId`, `level2Gmv`, `updatedAt`)
+SELECT p.`referredById`, SUM(o.`totalAmount`), CURRENT_TIMESTAMP(3)
+FROM `Order` o
+JOIN `User` u ON o.`customerId` = u.`id`
+JOIN `User` p ON u.`referredById` = p.`id`
+WHERE o.`paymentStatus` = 'PAID' AND p.`referredById` IS NOT NULL
+GROUP BY p.`referredById`
+ON DUPLICATE KEY UPDATE `level2Gmv` = VALUES(`level2Gmv`);
+
+UPDATE `ReferralStats`
+SET `downlineCount` = `level1Count` + `level2Count`,
+    `downlineGmv` = `level1Gmv` + `level2Gmv`;
@@ -0,0 +1,11 @@
+-- AlterTable
+ALTER TABLE `SellerPayout` ADD COLUMN `periodStart` DATETIME(3) NULL,
+    ADD COLUMN `periodEnd` DATETIME(3) NULL,
+    ADD COLUMN `grossAmount` DOUBLE NOT NULL DEFAULT 0,
+    ADD COLUMN `commissionAmount` DOUBLE NOT NULL DEFAULT 0;
+
+-- CreateIndex
+CREATE INDEX `SellerPayout_periodStart_periodEnd_status_idx` ON `SellerPayout`(`periodStart`, `periodEnd`, `status`);
+
+-- CreateIndex
+CREATE INDEX `Order_paymentStatus_createdAt_idx` ON `Order`(`paymentStatus`, `createdAt`);
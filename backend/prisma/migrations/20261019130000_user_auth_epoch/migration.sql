@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE `User` ADD COLUMN `authEpoch` INTEGER NOT NULL DEFAULT 0;
+
+-- CreateIndex
+CREATE INDEX `User_updatedAt_idx` ON `User`(`updatedAt`);
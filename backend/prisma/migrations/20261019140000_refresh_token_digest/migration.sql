@@ -0,0 +1,24 @@
+-- AlterTable: store a fixed-length digest instead of the raw refresh JWT
+ALTER TABLE `RefreshToken` ADD COLUMN `tokenHash` CHAR(64) NULL;
+
+UPDATE `RefreshToken` SET `tokenHash` = SHA2(`token`, 256);
+
+ALTER TABLE `RefreshToken` MODIFY `tokenHash` CHAR(64) NOT NULL;
+
+-- CreateIndex
+CREATE UNIQUE INDEX `RefreshToken_tokenHash_key` ON `RefreshToken`(`tokenHash`);
+
+-- CreateIndex
+CREATE INDEX `RefreshToken_userId_expiresAt_idx` ON `RefreshToken`(`userId`, `expiresAt`);
+
+-- DropIndex
+DROP INDEX `RefreshToken_userId_idx` ON `RefreshToken`;
+
+-- DropIndex
+DROP INDEX `RefreshToken_token_idx` ON `RefreshToken`;
+
+-- DropIndex
+DROP INDEX `RefreshToken_token_key` ON `RefreshToken`;
+
+-- AlterTable
+ALTER TABLE `RefreshToken` DROP COLUMN `token`;
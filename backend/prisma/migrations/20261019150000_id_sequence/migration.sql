@@ -0,0 +1,10 @@
+-- CreateTable
+CREATE TABLE `IdSequence` (
+    `name` VARCHAR(64) NOT NULL,
+    `value` BIGINT NOT NULL DEFAULT 0,
+    `updatedAt` DATETIME(3) NOT NULL,
+
+    PRIMARY KEY (`name`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+INSERT INTO `IdSequence` (`name`, `value`, `updatedAt`) VALUES ('referral_code', 0, CURRENT_TIMESTAMP(3));
@@ -0,0 +1,18 @@
+-- CreateTable
+CREATE TABLE `EmailOutbox` (
+    `id` INTEGER NOT NULL AUTO_INCREMENT,
+    `toEmail` VARCHAR(191) NOT NULL,
+    `subject` VARCHAR(191) NOT NULL,
+    `htmlBody` MEDIUMTEXT NOT NULL,
+    `textBody` TEXT NULL,
+    `status` VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    `attempts` INTEGER NOT NULL DEFAULT 0,
+    `nextAttemptAt` DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    `lastError` VARCHAR(500) NULL,
+    `createdAt` DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    `sentAt` DATETIME(3) NULL,
+
+    INDEX `EmailOutbox_status_nextAttemptAt_idx`(`status`, `nextAttemptAt`),
+    INDEX `EmailOutbox_status_sentAt_idx`(`status`, `sentAt`),
+    PRIMARY KEY (`id`)
+) DEFAULT CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
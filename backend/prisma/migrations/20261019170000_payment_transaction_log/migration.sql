@@ -0,0 +1,20 @@
+-- AlterTable
+ALTER TABLE `PaymentTransaction` ADD COLUMN `event` VARCHAR(20) NOT NULL DEFAULT 'VERIFY',
+    ADD COLUMN `authority` VARCHAR(64) NULL,
+    ADD COLUMN `code` INTEGER NULL,
+    ADD COLUMN `refId` BIGINT NULL;
+
+-- CreateIndex
+CREATE INDEX `PaymentTransaction_orderId_createdAt_idx` ON `PaymentTransaction`(`orderId`, `createdAt`);
+
+-- CreateIndex
+CREATE INDEX `PaymentTransaction_status_createdAt_idx` ON `PaymentTransaction`(`status`, `createdAt`);
+
+-- CreateIndex
+CREATE INDEX `PaymentTransaction_authority_idx` ON `PaymentTransaction`(`authority`);
+
+-- DropIndex (superseded by the composite indexes above, which also back the foreign key)
+DROP INDEX `PaymentTransaction_orderId_idx` ON `PaymentTransaction`;
+
+-- DropIndex
+DROP INDEX `PaymentTransaction_status_idx` ON `PaymentTransaction`;
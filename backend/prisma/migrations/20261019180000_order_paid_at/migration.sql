@@ -0,0 +1,15 @@
+-- AlterTable
+ALTER TABLE `Order` ADD COLUMN `paidAt` DATETIME(3) NULL;
+
+-- Backfill: first successful verify, else the commissions written on payment, else the last update
+UPDATE `Order` o
+SET o.`paidAt` = COALESCE(
+    (SELECT MIN(t.`createdAt`) FROM `PaymentTransaction` t
+     WHERE t.`orderId` = o.`id` AND t.`event` = 'VERIFY' AND t.`status` = 'OK'),
+    (SELECT MIN(c.`createdAt`) FROM `Commission` c WHERE c.`orderId` = o.`id`),
+    o.`updatedAt`
+)
+WHERE o.`paymentStatus` = 'PAID';
+
+-- CreateIndex
+CREATE INDEX `Order_paymentStatus_paidAt_idx` ON `Order`(`paymentStatus`, `paidAt`);
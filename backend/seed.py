@@ -1,10 +1,16 @@
+"""
+Small demo fixture: a handful of named accounts, products and two paid orders.
+For production-sized data (millions of users, referral trees, variants,
+orders and commissions) use `python -m app.jobs.generate_data`.
+"""
 import asyncio
 import json
 
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.db import prisma
-from app.services.auth_service import generate_unique_referral
+from app.services.referral_codes import next_referral_code
 from app.services.order_service import create_order, mark_order_paid
+from app.services.referral_analytics_service import record_signup
 from app.schemas.order import OrderItemCreate
 
 
@@ -12,9 +18,9 @@ async def ensure_user(name: str, email: str, role: str, phone: str | None = None
     existing = await prisma.user.find_unique(where={"email": email})
     if existing:
         return existing
-    referral_code = await generate_unique_referral(prisma)
-    password_hash = get_password_hash("Stylino123!")
-    return await prisma.user.create(
+    referral_code = await next_referral_code(prisma)
+    password_hash = await get_password_hash_async("Stylino123!")
+    user = await prisma.user.create(
         data={
             "name": name,
             "email": email,
@@ -25,6 +31,10 @@ async def ensure_user(name: str, email: str, role: str, phone: str | None = None
             "referredById": referred_by_id,
         }
     )
+    if referred_by_id:
+        referrer = await prisma.user.find_unique(where={"id": referred_by_id})
+        await record_signup(prisma, referrer_id=referred_by_id, referrer_parent_id=referrer.referredById if referrer else None)
+    return user
 
 
 async def ensure_category(name: str, slug: str):
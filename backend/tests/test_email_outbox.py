@@ -0,0 +1,253 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("prisma.models")
+
+from app.core.smtp import SmtpBatchError, SmtpPool, build_message
+from app.services import email_outbox
+from app.services.email_outbox import EmailDispatcher, claim_due_emails, purge_sent_emails, retry_delay
+
+
+def _parse_sql_time(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+
+
+class FakeOutboxDelegate:
+    def __init__(self, rows: dict):
+        self.rows = rows
+
+    async def update_many(self, where, data):
+        for row_id in where["id"]["in"]:
+            row = self.rows[row_id]
+            for key, value in data.items():
+                if isinstance(value, dict) and "increment" in value:
+                    value = getattr(row, key) + value["increment"]
+                setattr(row, key, value)
+        return len(where["id"]["in"])
+
+    async def update(self, where, data):
+        row = self.rows[where["id"]]
+        for key, value in data.items():
+            setattr(row, key, value)
+        return row
+
+    async def find_many(self, where, order=None):
+        return [SimpleNamespace(**vars(self.rows[row_id])) for row_id in sorted(where["id"]["in"])]
+
+
+class FakePrisma:
+    """
+    In-memory EmailOutbox table answering the outbox's raw SQL, so claim,
+    lease and purge logic can run without MySQL.
+    """
+
+    def __init__(self):
+        self.rows: dict = {}
+        self.emailoutbox = FakeOutboxDelegate(self.rows)
+        self.purge_calls = 0
+
+    def add(self, **fields) -> SimpleNamespace:
+        row_id = len(self.rows) + 1
+        row = SimpleNamespace(
+            id=row_id,
+            toEmail=f"user{row_id}@example.com",
+            subject="سلام",
+            htmlBody="<p>hi</p>",
+            textBody=None,
+            status="PENDING",
+            attempts=0,
+            nextAttemptAt=datetime.utcnow() - timedelta(seconds=1),
+            sentAt=None,
+            lastError=None,
+        )
+        for key, value in fields.items():
+            setattr(row, key, value)
+        self.rows[row_id] = row
+        return row
+
+    @asynccontextmanager
+    async def tx(self):
+        yield self
+
+    async def query_raw(self, sql, now, limit):
+        assert sql == email_outbox._CLAIM_SQL
+        now = _parse_sql_time(now)
+        due = sorted(
+            (row for row in self.rows.values() if row.status == "PENDING" and row.nextAttemptAt <= now),
+            key=lambda row: row.nextAttemptAt,
+        )
+        return [{"id": row.id} for row in due[:limit]]
+
+    async def execute_raw(self, sql, older_than, limit):
+        assert sql == email_outbox._PURGE_SQL
+        self.purge_calls += 1
+        cutoff = _parse_sql_time(older_than)
+        doomed = sorted(
+            (row for row in self.rows.values() if row.status == "SENT" and row.sentAt < cutoff),
+            key=lambda row: row.sentAt,
+        )[:limit]
+        for row in doomed:
+            del self.rows[row.id]
+        return len(doomed)
+
+
+def _dispatcher(**overrides) -> EmailDispatcher:
+    options = dict(concurrency=2, batch_size=10, poll_interval=0.1, max_attempts=3, backoff_seconds=30, lease_seconds=300)
+    options.update(overrides)
+    return EmailDispatcher(**options)
+
+
+def _pool(port: int) -> SmtpPool:
+    return SmtpPool(host="127.0.0.1", port=port, use_tls=False, size=2, timeout=5)
+
+
+def _message(to_email: str):
+    return build_message("noreply@stylino.com", to_email, "سلام", "<p>hi</p>", "hi")
+
+
+def test_claim_leases_due_messages_and_increments_attempts():
+    prisma = FakePrisma()
+    first = prisma.add()
+    second = prisma.add()
+    prisma.add(nextAttemptAt=datetime.utcnow() + timedelta(minutes=5))
+
+    claimed = asyncio.run(claim_due_emails(prisma, limit=10, lease_seconds=300))
+
+    assert [email.id for email in claimed] == [first.id, second.id]
+    assert all(email.attempts == 1 for email in claimed)
+    assert first.nextAttemptAt > datetime.utcnow() + timedelta(seconds=290)
+
+
+def test_leased_messages_are_not_claimed_again_until_the_lease_expires():
+    prisma = FakePrisma()
+    row = prisma.add()
+
+    assert len(asyncio.run(claim_due_emails(prisma, limit=10, lease_seconds=300))) == 1
+    assert asyncio.run(claim_due_emails(prisma, limit=10, lease_seconds=300)) == []
+
+    # the dispatcher holding the lease died; once it runs out the message is due again
+    row.nextAttemptAt = datetime.utcnow() - timedelta(seconds=1)
+    reclaimed = asyncio.run(claim_due_emails(prisma, limit=10, lease_seconds=300))
+    assert [email.id for email in reclaimed] == [row.id]
+    assert reclaimed[0].attempts == 2
+
+
+def test_claim_respects_the_limit_oldest_first():
+    prisma = FakePrisma()
+    now = datetime.utcnow()
+    rows = [prisma.add(nextAttemptAt=now - timedelta(minutes=minutes)) for minutes in (1, 3, 2)]
+
+    claimed = asyncio.run(claim_due_emails(prisma, limit=2, lease_seconds=300))
+
+    assert sorted(email.id for email in claimed) == [rows[1].id, rows[2].id]
+    assert rows[0].attempts == 0
+
+
+def test_retry_delay_doubles_per_attempt_and_is_capped():
+    assert retry_delay(0, 30) == timedelta(seconds=30)
+    assert retry_delay(1, 30) == timedelta(seconds=30)
+    assert retry_delay(2, 30) == timedelta(seconds=60)
+    assert retry_delay(4, 30) == timedelta(seconds=240)
+    assert retry_delay(20, 30) == timedelta(hours=1)
+
+
+def test_dispatcher_delivers_and_marks_sent(smtp_server, monkeypatch):
+    handler, port = smtp_server
+    pool = _pool(port)
+    monkeypatch.setattr(email_outbox, "get_smtp_pool", lambda: pool)
+    prisma = FakePrisma()
+    row = prisma.add()
+    dispatcher = _dispatcher()
+
+    try:
+        assert asyncio.run(dispatcher.drain_once(prisma)) == 1
+    finally:
+        pool.close()
+
+    assert row.status == "SENT" and row.sentAt is not None
+    assert [rcpts for rcpts, _ in handler.messages] == [[row.toEmail]]
+    assert dispatcher.sent == 1
+
+
+def test_failed_delivery_is_retried_with_backoff_then_parked(smtp_server, monkeypatch):
+    handler, port = smtp_server
+    pool = _pool(port)
+    monkeypatch.setattr(email_outbox, "get_smtp_pool", lambda: pool)
+    prisma = FakePrisma()
+    row = prisma.add()
+    handler.refuse.add(row.toEmail)
+    dispatcher = _dispatcher(max_attempts=2, backoff_seconds=30)
+
+    try:
+        before = datetime.utcnow()
+        asyncio.run(dispatcher.drain_once(prisma))
+        assert row.status == "PENDING" and row.attempts == 1
+        assert "SMTPRecipientsRefused" in row.lastError
+        assert before + timedelta(seconds=29) <= row.nextAttemptAt <= datetime.utcnow() + timedelta(seconds=31)
+        assert dispatcher.retried == 1
+
+        # not due yet: the backoff keeps it out of the next poll
+        assert asyncio.run(dispatcher.drain_once(prisma)) == 0
+
+        row.nextAttemptAt = datetime.utcnow() - timedelta(seconds=1)
+        asyncio.run(dispatcher.drain_once(prisma))
+    finally:
+        pool.close()
+
+    assert row.status == "FAILED" and row.attempts == 2
+    assert dispatcher.failed == 1
+    assert handler.messages == []
+
+
+def test_send_many_reuses_one_session(smtp_server):
+    handler, port = smtp_server
+    pool = _pool(port)
+
+    async def scenario():
+        await pool.send_many([_message(f"a{i}@example.com") for i in range(3)])
+        await pool.send_many([_message("b@example.com")])
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.close()
+
+    assert len(handler.messages) == 4
+    assert pool.connects == 1
+    assert pool.sent == 4 and pool.errors == 0
+
+
+def test_send_many_reports_how_far_a_failed_batch_got(smtp_server):
+    handler, port = smtp_server
+    handler.refuse.add("refused@example.com")
+    pool = _pool(port)
+    batch = [_message("ok@example.com"), _message("refused@example.com"), _message("after@example.com")]
+
+    try:
+        with pytest.raises(SmtpBatchError) as caught:
+            asyncio.run(pool.send_many(batch))
+    finally:
+        pool.close()
+
+    assert caught.value.failed_index == 1 and caught.value.sent == 1
+    assert [rcpts for rcpts, _ in handler.messages] == [["ok@example.com"]]
+    assert pool.sent == 1 and pool.errors == 1
+
+
+def test_purge_removes_old_sent_messages_in_batches():
+    prisma = FakePrisma()
+    now = datetime.utcnow()
+    for days in range(5):
+        prisma.add(status="SENT", sentAt=now - timedelta(days=30 + days))
+    recent = prisma.add(status="SENT", sentAt=now - timedelta(days=1))
+    pending = prisma.add(nextAttemptAt=now - timedelta(days=60))
+
+    removed = asyncio.run(purge_sent_emails(prisma, now - timedelta(days=14), batch_size=2))
+
+    assert removed == 5
+    assert set(prisma.rows) == {recent.id, pending.id}
+    assert prisma.purge_calls == 3
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from starlette.requests import Request
+
+from app.core import rate_limit
+from app.core.config import get_settings
+
+
+def _request(headers: dict, peer: str = "172.17.0.1") -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/auth/login",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+            "client": (peer, 40000),
+        }
+    )
+
+
+@pytest.fixture
+def trust_proxy(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_TRUST_PROXY", "true")
+    get_settings.cache_clear()
+
+
+def test_client_ip_is_the_peer_unless_the_proxy_is_trusted():
+    request = _request({"X-Real-IP": "203.0.113.7", "X-Forwarded-For": "203.0.113.7"})
+    assert asyncio.run(rate_limit.client_ip(request)) == "172.17.0.1"
+
+
+def test_client_ip_prefers_x_real_ip(trust_proxy):
+    request = _request({"X-Real-IP": "203.0.113.7", "X-Forwarded-For": "6.6.6.6, 203.0.113.7"})
+    assert asyncio.run(rate_limit.client_ip(request)) == "203.0.113.7"
+
+
+def test_client_ip_ignores_client_supplied_forwarded_hops(trust_proxy):
+    request = _request({"X-Forwarded-For": "6.6.6.6, 203.0.113.7"})
+    assert asyncio.run(rate_limit.client_ip(request)) == "203.0.113.7"
+
+
+def test_backend_failure_falls_back_to_in_process_limits(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_REDIS_URL", "redis://127.0.0.1:1/0")
+    get_settings.cache_clear()
+
+    def unavailable():
+        raise RuntimeError("redis down")
+
+    monkeypatch.setattr(rate_limit, "get_rate_limit_backend", unavailable)
+    rate_limit._fallback_backend.cache_clear()
+
+    waits = [asyncio.run(rate_limit._hit("login:203.0.113.7", 2, 60)) for _ in range(3)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, CircuitOpenError, retry_async
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # only the breaker's view of time; asyncio keeps the real clock
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # a success resets the streak
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opened == 1
+
+
+def test_open_breaker_fails_fast_until_the_reset_timeout(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as caught:
+        breaker.before_call()
+    assert caught.value.retry_after == pytest.approx(20)
+    assert breaker.rejected == 1 and breaker.calls == 1
+
+    clock.now += 20
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_half_open_admits_one_trial_and_closes_on_success(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # the trial is still in flight
+    breaker.record_success()
+
+    assert breaker.state == "closed" and breaker.consecutive_failures == 0
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open" and breaker.opened == 2
+    with pytest.raises(CircuitOpenError) as caught:
+        breaker.before_call()
+    assert caught.value.retry_after == pytest.approx(30)
+
+
+def test_call_counts_only_dependency_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+
+    async def business_error():
+        raise KeyError("not a dependency failure")
+
+    with pytest.raises(KeyError):
+        asyncio.run(breaker.call(business_error, failure_on=(ConnectionError,)))
+    assert breaker.state == "closed" and breaker.failures == 0
+
+    async def outage():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(breaker.call(outage, failure_on=(ConnectionError,)))
+    assert breaker.state == "open"
+
+
+def test_call_releases_a_half_open_trial_on_other_errors(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 30
+
+    async def business_error():
+        raise KeyError("rejected by the gateway")
+
+    with pytest.raises(KeyError):
+        asyncio.run(breaker.call(business_error, failure_on=(ConnectionError,)))
+    breaker.before_call()  # a new trial is admitted
+    assert breaker.state == "half_open"
+
+
+def _failing(calls: list, exc: BaseException, delay: float = 0):
+    async def fn(timeout: float):
+        calls.append(timeout)
+        if delay:
+            await asyncio.sleep(delay)
+        raise exc
+
+    return fn
+
+
+def test_retry_stops_after_the_attempt_limit():
+    calls: list = []
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            retry_async(_failing(calls, ConnectionError()), attempts=3, budget=5, base_delay=0.001, retry_on=(ConnectionError,))
+        )
+    assert len(calls) == 3
+
+
+def test_retry_returns_the_first_success():
+    calls: list = []
+
+    async def flaky(timeout: float):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise ConnectionError()
+        return "ok"
+
+    result = asyncio.run(retry_async(flaky, attempts=5, budget=5, base_delay=0.001, retry_on=(ConnectionError,)))
+
+    assert result == "ok" and len(calls) == 3
+
+
+def test_retry_passes_the_remaining_budget_as_timeout():
+    calls: list = []
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            retry_async(
+                _failing(calls, ConnectionError(), delay=0.02),
+                attempts=3,
+                budget=5,
+                base_delay=0.001,
+                retry_on=(ConnectionError,),
+            )
+        )
+    assert calls[0] <= 5
+    assert calls[0] > calls[1] > calls[2]
+
+
+def test_retry_stays_within_the_budget():
+    calls: list = []
+    started = time.monotonic()
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            retry_async(
+                _failing(calls, ConnectionError(), delay=0.05),
+                attempts=50,
+                budget=0.12,
+                base_delay=0.001,
+                max_delay=0.001,
+                retry_on=(ConnectionError,),
+            )
+        )
+    assert len(calls) <= 3
+    assert time.monotonic() - started < 0.3
+
+
+def test_retry_skips_a_wait_that_would_overrun_the_budget(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt, base, cap: 10)
+    calls: list = []
+    with pytest.raises(ConnectionError):
+        asyncio.run(retry_async(_failing(calls, ConnectionError()), attempts=3, budget=1, base_delay=1, retry_on=(ConnectionError,)))
+    assert len(calls) == 1
+
+
+def test_retry_does_not_retry_other_errors():
+    calls: list = []
+    with pytest.raises(ValueError):
+        asyncio.run(retry_async(_failing(calls, ValueError()), attempts=3, budget=5, base_delay=0.001, retry_on=(ConnectionError,)))
+    assert len(calls) == 1
+
+
+def test_backoff_delay_is_jittered_below_the_cap():
+    for attempt in range(1, 10):
+        assert 0 <= resilience.backoff_delay(attempt, 0.2, 2.0) <= min(2.0, 0.2 * 2 ** (attempt - 1))
@@ -0,0 +1,123 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from app.core.resilience import CircuitBreaker
+from app.services.zarinpal_client import ZarinpalClient, ZarinpalError, ZarinpalUnavailable
+
+REQUEST_PATH = "/pg/v4/payment/request.json"
+VERIFY_PATH = "/pg/v4/payment/verify.json"
+
+
+class Gateway:
+    """MockTransport handler replaying a scripted list of outcomes per path."""
+
+    def __init__(self, **scripts):
+        self.scripts = {REQUEST_PATH: list(scripts.get("request", [])), VERIFY_PATH: list(scripts.get("verify", []))}
+        self.calls: Counter = Counter()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls[path] += 1
+        script = self.scripts[path]
+        outcome = script.pop(0) if len(script) > 1 else script[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            return httpx.Response(outcome, json={"errors": {"message": "gateway error"}})
+        return httpx.Response(200, json={"data": outcome})
+
+
+def _client(gateway: Gateway, **options) -> ZarinpalClient:
+    settings = dict(verify_attempts=3, retry_base_delay=0.001, request_budget=2, verify_budget=2)
+    settings.update(options)
+    return ZarinpalClient(
+        merchant_id="merchant",
+        sandbox=True,
+        callback_url="http://localhost:3000/orders/callback",
+        http=httpx.AsyncClient(transport=httpx.MockTransport(gateway)),
+        api_base_url="http://zarinpal.test",
+        **settings,
+    )
+
+
+def _request(client: ZarinpalClient):
+    return client.payment_request(1, 100_000, "سفارش ۱", None, None)
+
+
+def test_payment_request_is_sent_once_on_a_server_error():
+    gateway = Gateway(request=[503, {"code": 100, "authority": "A1"}])
+
+    with pytest.raises(ZarinpalUnavailable):
+        asyncio.run(_request(_client(gateway)))
+
+    assert gateway.calls[REQUEST_PATH] == 1
+
+
+def test_payment_request_is_sent_once_on_a_connection_error():
+    gateway = Gateway(request=[httpx.ConnectError("refused"), {"code": 100, "authority": "A1"}])
+
+    with pytest.raises(ZarinpalUnavailable):
+        asyncio.run(_request(_client(gateway)))
+
+    assert gateway.calls[REQUEST_PATH] == 1
+
+
+def test_payment_request_success():
+    gateway = Gateway(request=[{"code": 100, "authority": "A1", "message": "Success"}])
+
+    result = asyncio.run(_request(_client(gateway)))
+
+    assert result.authority == "A1"
+    assert result.payment_url == "https://sandbox.zarinpal.com/pg/StartPay/A1"
+
+
+def test_payment_verify_is_retried_until_it_succeeds():
+    gateway = Gateway(verify=[503, httpx.ReadTimeout("slow"), {"code": 101, "ref_id": 42}])
+
+    result = asyncio.run(_client(gateway).payment_verify("A1", 100_000, 1))
+
+    assert result.success and result.ref_id == 42
+    assert gateway.calls[VERIFY_PATH] == 3
+
+
+def test_payment_verify_gives_up_after_the_attempt_limit():
+    gateway = Gateway(verify=[502])
+
+    with pytest.raises(ZarinpalUnavailable):
+        asyncio.run(_client(gateway, verify_attempts=3).payment_verify("A1", 100_000, 1))
+
+    assert gateway.calls[VERIFY_PATH] == 3
+
+
+def test_gateway_rejection_is_not_retried_or_counted_by_the_breaker():
+    gateway = Gateway(verify=[400])
+    client = _client(gateway)
+
+    with pytest.raises(ZarinpalError) as caught:
+        asyncio.run(client.payment_verify("A1", 100_000, 1))
+
+    assert not isinstance(caught.value, ZarinpalUnavailable)
+    assert gateway.calls[VERIFY_PATH] == 1
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+
+
+def test_open_breaker_fails_fast_without_calling_the_gateway():
+    gateway = Gateway(verify=[503], request=[{"code": 100, "authority": "A1"}])
+    client = _client(gateway, verify_attempts=1, breaker=CircuitBreaker("zarinpal", failure_threshold=2, reset_timeout=30))
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ZarinpalUnavailable):
+                await client.payment_verify("A1", 100_000, 1)
+        with pytest.raises(ZarinpalUnavailable) as caught:
+            await _request(client)
+        return caught.value
+
+    error = asyncio.run(scenario())
+
+    assert client.breaker.state == "open"
+    assert error.retry_after > 0
+    assert gateway.calls[VERIFY_PATH] == 2 and gateway.calls[REQUEST_PATH] == 0